@@ -0,0 +1,195 @@
+#!/usr/local/bin/python3
+# alternatives.py : K-shortest and via-node alternative routes for dispatch
+#
+# k_shortest_routes() is Yen's algorithm.  Every spur search is an A* search whose
+# heuristic is the exact cost to the target from one reverse shortest-path tree, computed
+# once and shared by all k iterations: banning cities and segments only makes routes
+# longer, so the tree stays a consistent lower bound and each spur search walks almost
+# straight to the target.
+#
+# via_routes() is the via-node (plateau) method: one tree from the start and one from the
+# end give the best route through every city at once, and routes are accepted in order
+# of cost while they stay within a stretch of the best one and do not overlap the routes
+# already chosen too much.
+#
+
+import heapq
+import math
+
+import numpy as np
+
+from road_graph import get_graph
+from search import check_cost, dijkstra, path_edges, route_summary
+
+# References:
+'''
+https://en.wikipedia.org/wiki/Yen%27s_algorithm
+https://doi.org/10.1145/1498698.1498701 (alternative routes via plateaus and via nodes)
+'''
+
+# Costs whose route cost is a sum of per-segment weights.
+ADDITIVE_COSTS = ("segments", "distance", "time")
+
+
+def _check_additive(cost):
+    check_cost(cost)
+    if cost not in ADDITIVE_COSTS:
+        raise ValueError("Error: alternative routes need an additive cost, not %r" % (cost,))
+
+
+def _edge_costs(graph, cost, edges):
+    if cost == "segments":
+        return [1] * len(edges)
+    weight = graph.lists()[2 if cost == "distance" else 3]
+    return [weight[i] for i in edges]
+
+
+def _cities(graph, source, edges):
+    indices = graph.lists()[1]
+    return [source] + [indices[i] for i in edges]
+
+
+def _spur_search(graph, source, target, cost, to_target, banned_cities, banned_edges):
+    """A* from source to target avoiding cities and segment positions.
+
+    Returns:
+        tuple: (cost, edges) of the cheapest such route, or None.
+    """
+    indptr, indices, miles, hours = graph.lists()[:4]
+    weight = {"distance": miles, "time": hours}.get(cost)
+    dist = {source: 0}
+    parent = {}
+    closed = set()
+    fringe = [(to_target[source], 0, source)]
+    while fringe:
+        _, d, city = heapq.heappop(fringe)
+        if city in closed:
+            continue
+        closed.add(city)
+        if city == target:
+            edges = []
+            while city != source:
+                city, i = parent[city]
+                edges.append(i)
+            edges.reverse()
+            return d, edges
+        for i in range(indptr[city], indptr[city + 1]):
+            neighbor = indices[i]
+            if neighbor in banned_cities or neighbor in closed or i in banned_edges:
+                continue
+            new = d + (1 if weight is None else weight[i])
+            if new < dist.get(neighbor, math.inf) and to_target[neighbor] < math.inf:
+                dist[neighbor] = new
+                parent[neighbor] = (city, i)
+                heapq.heappush(fringe, (new + to_target[neighbor], new, neighbor))
+    return None
+
+
+def k_shortest_routes(start, end, cost, k=3, graph=None, stats=None):
+    """The ``k`` cheapest routes without repeated cities, cheapest first (Yen's algorithm).
+
+    Args:
+        start (str): start city.
+        end (str): end city.
+        cost (str): "segments", "distance" or "time".
+        k (int): number of routes wanted; fewer are returned when fewer exist.
+        graph (RoadGraph): road network, the shared one from get_graph() by default.
+        stats (dict): when given, receives "spur_searches".
+
+    Returns:
+        list: get_route() result dictionaries.
+    """
+    _check_additive(cost)
+    graph = graph or get_graph()
+    source, target = graph.city_id(start), graph.city_id(end)
+    # Roads are two-way at equal cost, so a tree from the target gives the cost to it.
+    to_target = dijkstra(graph, target, cost)[0]
+    if to_target[source] == math.inf:
+        return []
+    found = [_spur_search(graph, source, target, cost, to_target, set(), set())]
+    candidates = []
+    seen = {tuple(found[0][1])}
+    searches = 1
+    while len(found) < k:
+        _, previous = found[-1]
+        cities = _cities(graph, source, previous)
+        costs = _edge_costs(graph, cost, previous)
+        root_cost = 0
+        for i in range(len(previous)):
+            root = previous[:i]
+            # Leave the root path through a segment that no route with the same root used.
+            banned_edges = {edges[i] for _, edges in found if len(edges) > i and edges[:i] == root}
+            spur = _spur_search(graph, cities[i], target, cost, to_target, set(cities[:i]), banned_edges)
+            searches += 1
+            if spur is not None:
+                edges = tuple(root + spur[1])
+                if edges not in seen:
+                    seen.add(edges)
+                    heapq.heappush(candidates, (root_cost + spur[0], edges))
+            root_cost += costs[i]
+        if not candidates:
+            break
+        total, edges = heapq.heappop(candidates)
+        found.append((total, list(edges)))
+    if stats is not None:
+        stats["spur_searches"] = searches
+    return [route_summary(graph, edges) for _, edges in found]
+
+
+def via_routes(start, end, cost, k=3, max_stretch=1.3, max_overlap=0.7, graph=None):
+    """Up to ``k`` alternative routes through via cities, the optimal route first.
+
+    Each candidate is the best route from start to a via city followed by the best route
+    from there to end.  Candidates are taken in order of cost and accepted when they
+    repeat no city, cost at most ``max_stretch`` times the optimum and share at most
+    ``max_overlap`` of their cost with every route accepted before.
+
+    Args:
+        start (str): start city.
+        end (str): end city.
+        cost (str): "segments", "distance" or "time".
+        k (int): most routes returned.
+        max_stretch (float): cost limit relative to the optimal route.
+        max_overlap (float): largest shared fraction of a route's cost.
+        graph (RoadGraph): road network, the shared one from get_graph() by default.
+
+    Returns:
+        list: get_route() result dictionaries.
+    """
+    _check_additive(cost)
+    graph = graph or get_graph()
+    source, target = graph.city_id(start), graph.city_id(end)
+    from_source, parent_s, edge_s = dijkstra(graph, source, cost)
+    to_target, parent_t, edge_t = dijkstra(graph, target, cost)
+    best = from_source[target]
+    if best == math.inf:
+        return []
+    total = np.asarray(from_source) + np.asarray(to_target)
+    order = np.argsort(total, kind="stable")
+    order = order[:np.searchsorted(total[order], best * max_stretch, side="right")]
+
+    accepted = []  # (edges, {undirected segment: cost})
+    covered = np.zeros(graph.num_cities, dtype=bool)
+    for via in order.tolist():
+        # Every city of a route already looked at gives that same route again.
+        if covered[via]:
+            continue
+        edges = path_edges(parent_s, edge_s, source, via)
+        city = via
+        while city != target:
+            previous = parent_t[city]
+            edges.append(graph.find_segment(city, previous))
+            city = previous
+        cities = _cities(graph, source, edges)
+        covered[cities] = True
+        if len(set(cities)) != len(cities):
+            continue
+        pieces = dict(zip((frozenset(pair) for pair in zip(cities[:-1], cities[1:])),
+                          _edge_costs(graph, cost, edges)))
+        length = sum(pieces.values())
+        if all(sum(c for segment, c in pieces.items() if segment in other) <= max_overlap * length
+               for _, other in accepted):
+            accepted.append((edges, pieces))
+            if len(accepted) == k:
+                break
+    return [route_summary(graph, edges) for edges, _ in accepted]
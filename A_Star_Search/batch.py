@@ -0,0 +1,128 @@
+#!/usr/local/bin/python3
+# batch.py : Many-to-many route queries and origin x destination cost matrices
+#
+# Queries are grouped by start city so a single search tree answers every target of that
+# city, and the groups are spread over a process pool.  Workers reuse the road graph that
+# is already loaded: under fork they inherit the parent's copy, and with a compiled graph
+# (python3 road_graph.py) every worker memory-maps the same pages.
+#
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import json
+import math
+import os
+import sys
+
+import numpy as np
+
+from road_graph import DATA_DIR, get_graph
+from search import check_cost, dijkstra, empty_route, path_edges, route_summary
+
+
+def _init_worker(data_dir):
+    get_graph(data_dir)
+
+
+def _group_by_source(pairs):
+    groups = {}
+    for start, end in pairs:
+        groups.setdefault(start, []).append(end)
+    return groups
+
+
+def _routes_from_source(data_dir, start, ends, cost):
+    """One search from ``start`` answering every city in ``ends``."""
+    graph = get_graph(data_dir)
+    source = graph.city_id(start)
+    targets = [graph.city_id(end) for end in ends]
+    _, parent, parent_edge = dijkstra(graph, source, cost, targets)
+    results = []
+    for end, target in zip(ends, targets):
+        edges = path_edges(parent, parent_edge, source, target)
+        results.append((start, end, empty_route() if edges is None else route_summary(graph, edges)))
+    return results
+
+
+def _cost_row(data_dir, row, origin, destinations, cost):
+    graph = get_graph(data_dir)
+    targets = [graph.city_id(city) for city in destinations]
+    dist, _, _ = dijkstra(graph, graph.city_id(origin), cost, targets)
+    return row, np.array([dist[t] for t in targets], dtype=np.float64)
+
+
+def run_tasks(tasks, workers, data_dir):
+    """Run (function, args) tasks and yield their results in completion order.
+
+    Each task calls ``function(data_dir, *args)``; the function must be importable by the
+    worker processes (defined at module level).  ``workers`` of 0 or 1 runs the tasks in
+    this process; None uses one worker per CPU.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or len(tasks) <= 1:
+        for function, args in tasks:
+            yield function(data_dir, *args)
+        return
+    # Load (or memory-map) the graph before forking so the workers share it.
+    get_graph(data_dir)
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), initializer=_init_worker,
+                             initargs=(data_dir,)) as pool:
+        futures = [pool.submit(function, data_dir, *args) for function, args in tasks]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def get_routes(pairs, cost, workers=None, data_dir=DATA_DIR):
+    """Find the route for every (start, end) pair, streaming results as they finish.
+
+    Args:
+        pairs (iterable): (start city, end city) name pairs.
+        cost (str): "segments", "distance", "time" or "delivery".
+        workers (int): process count; 0 or 1 runs in this process, None uses every CPU.
+        data_dir (str): directory holding the dataset (and optionally its compiled copy).
+
+    Yields:
+        tuple: (start, end, result) where result is the get_route() dictionary.
+    """
+    check_cost(cost)
+    tasks = [(_routes_from_source, (start, ends, cost)) for start, ends in _group_by_source(pairs).items()]
+    for results in run_tasks(tasks, workers, data_dir):
+        yield from results
+
+
+def cost_rows(origins, destinations, cost, workers=None, data_dir=DATA_DIR):
+    """Rows of the origin x destination cost matrix, in completion order.
+
+    Yields:
+        tuple: (row index into origins, array of costs to every destination); unreachable
+        destinations cost inf.
+    """
+    check_cost(cost)
+    destinations = list(destinations)
+    tasks = [(_cost_row, (row, origin, destinations, cost)) for row, origin in enumerate(origins)]
+    yield from run_tasks(tasks, workers, data_dir)
+
+
+def cost_matrix(origins, destinations, cost, workers=None, data_dir=DATA_DIR):
+    """Origin x destination matrix of the chosen cost.
+
+    Entries hold the value reported under COST_KEYS[cost] by get_route() for the optimal
+    route of that cost, e.g. total miles for "distance".
+
+    Returns:
+        np.ndarray: float matrix of shape (len(origins), len(destinations)).
+    """
+    origins, destinations = list(origins), list(destinations)
+    matrix = np.full((len(origins), len(destinations)), math.inf)
+    for row, values in cost_rows(origins, destinations, cost, workers, data_dir):
+        matrix[row] = values
+    return matrix
+
+
+if __name__ == "__main__":
+    # python3 batch.py cost < pairs.txt : one "start end" pair per line, JSON lines out.
+    if len(sys.argv) != 2:
+        raise(Exception("Error: expected the cost function as the only argument"))
+    pairs = [line.split()[:2] for line in sys.stdin if len(line.split()) >= 2]
+    for start, end, result in get_routes(pairs, sys.argv[1]):
+        print(json.dumps({"start": start, "end": end, **result}), flush=True)
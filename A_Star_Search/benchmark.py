@@ -0,0 +1,237 @@
+#!/usr/local/bin/python3
+# benchmark.py : Route-planner benchmark suite and query-log replayer
+#
+# python3 benchmark.py [--pairs N] [--seed S] [--min-miles M] [--engines astar,alt,...]
+#                      [--costs ...] [--replay queries.log] [--output report.json]
+#                      [--compare old.json]
+#
+# A workload is either a reproducible set of random city pairs drawn from city-gps.txt
+# (optionally only pairs at least M great-circle miles apart, for long-haul queries) or a
+# recorded query log, with one query per line: "start end cost" (the route.py arguments)
+# or a JSON object with "start", "end" and "cost".  Every engine runs every query and the
+# report gives latency percentiles, throughput, nodes expanded, peak fringe size and RSS
+# per engine and cost function as JSON, so two versions can be compared with --compare.
+#
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import sys
+import time
+
+import route
+from contraction import METRICS
+from instrumentation import Probe, percentile
+from road_graph import CITY_GPS_FILE, DATA_DIR, get_graph
+from search import COSTS
+
+REPORT_VERSION = 1
+
+
+def _find_route(engine):
+    def run(start, end, cost, stats):
+        return route.find_route(start, end, cost, engine=engine, stats=stats)
+    return run
+
+
+def _get_route(start, end, cost, stats):
+    return route.get_route(start, end, cost)
+
+
+def _get_route_counters(start, end, cost, stats):
+    """get_route() takes no stats argument: run it again under a probe, outside the timed
+    call (a probe slows the search down), to read its search counters."""
+    with Probe().activate() as probe:
+        route.get_route(start, end, cost)
+    stats.update(probe.queries[-1]["stats"])
+
+
+# Engine name -> (callable(start, end, cost, stats), costs it supports).
+ENGINES = {
+    "get_route": (_get_route, COSTS),
+    "astar": (_find_route("astar"), COSTS),
+    "dijkstra": (_find_route("dijkstra"), COSTS),
+    "alt": (_find_route("alt"), COSTS),
+    "bidirectional": (_find_route("bidirectional"), ("segments", "distance", "time")),
+    "bidijkstra": (_find_route("bidijkstra"), ("segments", "distance", "time")),
+    "ch": (_find_route("ch"), tuple(METRICS)),
+}
+
+# Engine name -> callable(start, end, cost, stats) filling the counters of engines whose
+# timed callable cannot.
+COUNTERS = {"get_route": _get_route_counters}
+
+
+def random_pairs(count, seed, data_dir=DATA_DIR, min_miles=0):
+    """Reproducible (start, end) pairs of distinct cities listed in city-gps.txt.
+
+    With ``min_miles`` only pairs at least that many great-circle miles apart are drawn.
+    """
+    with open(os.path.join(data_dir, CITY_GPS_FILE), "r") as f:
+        cities = [line.split()[:3] for line in f if len(line.split()) >= 3]
+    rng = random.Random(seed)
+    pairs = []
+    while len(pairs) < count:
+        (a, lat1, long1), (b, lat2, long2) = rng.sample(cities, 2)
+        if min_miles and route.haversine(float(lat1), float(long1), float(lat2), float(long2)) < min_miles:
+            continue
+        pairs.append((a, b))
+    return pairs
+
+
+def random_workload(count, seed, costs=COSTS, min_miles=0):
+    pairs = random_pairs(count, seed, min_miles=min_miles)
+    return [(start, end, cost) for cost in costs for start, end in pairs]
+
+
+def read_query_log(path):
+    """(start, end, cost) queries from a log; blank lines and # comments are skipped."""
+    queries = []
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("{"):
+                record = json.loads(line)
+                queries.append((record["start"], record["end"], record["cost"]))
+            else:
+                start, end, cost = line.split()[:3]
+                queries.append((start, end, cost))
+    return queries
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KiB elsewhere.
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+def rss_mb():
+    """Current resident set size in MiB (peak size where /proc is not available)."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        return peak_rss_mb()
+
+
+def run_engine(engine, queries):
+    """Run one engine over the queries it supports and summarise them per cost function."""
+    function, supported = ENGINES[engine]
+    report = {}
+    for cost in COSTS:
+        selected = [(start, end) for start, end, c in queries if c == cost]
+        if not selected or cost not in supported:
+            continue
+        # Let the engine build or load whatever it precomputes before timing starts.
+        function(selected[0][0], selected[0][1], cost, {})
+        latencies, expanded, fringe = [], [], []
+        for start, end in selected:
+            stats = {}
+            tick = time.perf_counter()
+            function(start, end, cost, stats)
+            latencies.append(time.perf_counter() - tick)
+            if engine in COUNTERS:
+                COUNTERS[engine](start, end, cost, stats)
+            expanded.append(stats.get("expanded", 0))
+            fringe.append(stats.get("peak_fringe", 0))
+        elapsed = sum(latencies)
+        latencies.sort()
+        report[cost] = {
+            "queries": len(selected),
+            "p50_ms": 1000 * percentile(latencies, 50),
+            "p95_ms": 1000 * percentile(latencies, 95),
+            "p99_ms": 1000 * percentile(latencies, 99),
+            "mean_ms": 1000 * statistics.mean(latencies),
+            "throughput_qps": len(selected) / elapsed if elapsed > 0 else 0.0,
+            "mean_expanded": statistics.mean(expanded),
+            "mean_peak_fringe": statistics.mean(fringe),
+            "max_peak_fringe": max(fringe),
+            "rss_mb": rss_mb(),
+        }
+    return report
+
+
+def run_benchmark(queries, engines, workload=None):
+    """Benchmark every engine on the queries and return the JSON-ready report."""
+    load_begin = time.perf_counter()
+    get_graph()
+    report = {
+        "version": REPORT_VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "workload": dict(workload or {}, queries=len(queries)),
+        "graph_load_ms": 1000 * (time.perf_counter() - load_begin),
+        "engines": {},
+    }
+    for engine in engines:
+        report["engines"][engine] = run_engine(engine, queries)
+    report["peak_rss_mb"] = peak_rss_mb()
+    return report
+
+
+def compare(old, new, metric="p50_ms"):
+    """Lines comparing one metric between two reports, as new/old ratios."""
+    lines = []
+    for engine, costs in new["engines"].items():
+        for cost, values in costs.items():
+            before = old.get("engines", {}).get(engine, {}).get(cost)
+            if before is None or not before.get(metric):
+                continue
+            lines.append("%-13s %-9s %s %10.3f -> %10.3f  (x%.2f)" % (
+                engine, cost, metric, before[metric], values[metric], values[metric] / before[metric]))
+    return lines
+
+
+# Values of an engine and cost printed by print_table, in order.
+TABLE_COLUMNS = ("p50_ms", "p95_ms", "p99_ms", "throughput_qps", "mean_expanded",
+                 "mean_peak_fringe")
+
+
+def print_table(report):
+    for engine, costs in report["engines"].items():
+        for cost, values in costs.items():
+            row = (engine, cost) + tuple(values[key] for key in TABLE_COLUMNS)
+            print("%-13s %-9s p50 %8.2f ms  p95 %8.2f ms  p99 %8.2f ms  %8.1f q/s  "
+                  "expanded %8.1f  fringe %6.1f" % row, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark route queries.")
+    parser.add_argument("--pairs", type=int, default=200, help="random city pairs per cost function")
+    parser.add_argument("--seed", type=int, default=551)
+    parser.add_argument("--min-miles", type=float, default=0, help="only random pairs this far apart")
+    parser.add_argument("--engines", default="astar", help="comma separated, from: " + ", ".join(ENGINES))
+    parser.add_argument("--costs", default=",".join(COSTS), help="cost functions of the random workload")
+    parser.add_argument("--replay", help="query log to replay instead of random pairs")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="earlier JSON report to compare p50/p99 latency against")
+    args = parser.parse_args()
+
+    engines = args.engines.split(",")
+    unknown = [name for name in engines if name not in ENGINES]
+    if unknown:
+        parser.error("unknown engine(s): %s" % ", ".join(unknown))
+    if args.replay:
+        workload = read_query_log(args.replay)
+        description = {"replay": args.replay}
+    else:
+        workload = random_workload(args.pairs, args.seed, args.costs.split(","), args.min_miles)
+        description = {"pairs": args.pairs, "seed": args.seed, "min_miles": args.min_miles}
+    result = run_benchmark(workload, engines, description)
+    print_table(result)
+    if args.output:
+        with open(args.output, "w") as out:
+            json.dump(result, out, indent=2)
+    else:
+        print(json.dumps(result, indent=2))
+    if args.compare:
+        with open(args.compare, "r") as previous:
+            earlier = json.load(previous)
+        for row in compare(earlier, result, "p50_ms") + compare(earlier, result, "p99_ms"):
+            print(row, file=sys.stderr)
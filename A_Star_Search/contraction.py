@@ -0,0 +1,292 @@
+#!/usr/local/bin/python3
+# contraction.py : Contraction Hierarchies over the road graph
+#
+# Preprocessing contracts the cities one by one in order of importance, adding shortcut
+# segments wherever a shortest path ran through the contracted city.  A query is then two
+# small Dijkstra searches that only move "up" the hierarchy, one from each end, and the
+# shortcuts on the meeting path are unpacked back into road segments.  One hierarchy is
+# built per metric: miles for the "distance" cost and hours for the "time" cost.
+#
+
+import heapq
+import math
+import os
+import sys
+
+import numpy as np
+
+from road_graph import DATA_DIR, get_graph
+from search import empty_route, route_summary
+
+# References:
+'''
+https://en.wikipedia.org/wiki/Contraction_hierarchies
+https://algo2.iti.kit.edu/schultes/hwy/contract.pdf
+'''
+
+# Cost function -> metric the hierarchy is built over.
+METRICS = {"distance": "miles", "time": "hours"}
+FORMAT_VERSION = 1
+
+# Settled-node budget of a witness search; a missed witness only costs an extra shortcut.
+WITNESS_SETTLE_LIMIT = 200
+
+
+def check_metric(cost):
+    if cost not in METRICS:
+        raise ValueError("Contraction hierarchies support the %s costs, not %r" % (
+            " and ".join(METRICS), cost))
+
+
+def _witness_search(adj, source, skip, targets, limit):
+    """Distances from source to targets in the remaining graph, avoiding ``skip``."""
+    dist = {source: 0}
+    fringe = [(0, source)]
+    settled = 0
+    remaining = set(targets)
+    while fringe and remaining and settled < WITNESS_SETTLE_LIMIT:
+        d, city = heapq.heappop(fringe)
+        if d > dist[city]:
+            continue
+        if d > limit:
+            break
+        settled += 1
+        remaining.discard(city)
+        for neighbor, (w, _) in adj[city].items():
+            if neighbor == skip:
+                continue
+            new = d + w
+            if new < dist.get(neighbor, math.inf):
+                dist[neighbor] = new
+                heapq.heappush(fringe, (new, neighbor))
+    return dist
+
+
+def _shortcuts(adj, city):
+    """Shortcuts needed to contract ``city``: (u, x, weight) with u < x."""
+    neighbors = list(adj[city].items())
+    shortcuts = []
+    for i, (u, (w_u, _)) in enumerate(neighbors):
+        others = neighbors[i + 1:]
+        if not others:
+            continue
+        limit = w_u + max(w for _, (w, _) in others)
+        dist = _witness_search(adj, u, city, [x for x, _ in others], limit)
+        for x, (w_x, _) in others:
+            weight = w_u + w_x
+            if dist.get(x, math.inf) > weight:
+                shortcuts.append((u, x, weight))
+    return shortcuts
+
+
+class ContractionHierarchy(object):
+    def __init__(self, metric, rank, indptr, indices, weight, middle, fingerprint=None) -> None:
+        """Upward graph of a contraction hierarchy.
+
+        Every city lists the segments and shortcuts to cities contracted after it.  Because
+        roads are bidirectional the same upward graph serves both query directions.
+
+        Args:
+            metric (str): "miles" or "hours".
+            rank (np.ndarray): contraction order of every city.
+            indptr, indices, weight (np.ndarray): upward graph in CSR form.
+            middle (np.ndarray): contracted city a shortcut skips, -1 for original segments.
+            fingerprint (list): RoadGraph.fingerprint() of the graph it was built from.
+        """
+        self.metric = metric
+        self.rank = rank
+        self.indptr = indptr
+        self.indices = indices
+        self.weight = weight
+        self.middle = middle
+        self.fingerprint = fingerprint
+        self._lists = (indptr.tolist(), indices.tolist(), weight.tolist())
+        sources = np.repeat(np.arange(len(rank)), np.diff(indptr))
+        self._middle_of = dict(zip(zip(sources.tolist(), self._lists[1]), middle.tolist()))
+
+    @property
+    def num_shortcuts(self):
+        return int(np.count_nonzero(self.middle >= 0))
+
+    @classmethod
+    def build(cls, graph, cost):
+        """Contract every city of ``graph`` for the metric of ``cost``."""
+        check_metric(cost)
+        metric = METRICS[cost]
+        n = graph.num_cities
+        indptr, indices = graph.indptr.tolist(), graph.indices.tolist()
+        weights = getattr(graph, metric).tolist()
+        adj = [dict() for _ in range(n)]
+        for u in range(n):
+            for i in range(indptr[u], indptr[u + 1]):
+                v = indices[i]
+                if v != u and weights[i] < adj[u].get(v, (math.inf, -1))[0]:
+                    adj[u][v] = (weights[i], -1)
+
+        deleted = [0] * n
+        contracted = [False] * n
+
+        def priority(city):
+            # Edge difference weighted over the count of already contracted neighbours.
+            return 2 * (len(_shortcuts(adj, city)) - len(adj[city])) + deleted[city]
+
+        queue = [(priority(city), city) for city in range(n)]
+        heapq.heapify(queue)
+        rank = np.empty(n, dtype=np.int64)
+        upward = [None] * n
+        order = 0
+        while queue:
+            _, city = heapq.heappop(queue)
+            if contracted[city]:
+                continue
+            # Lazy update: re-evaluate and put back when no longer the least important.
+            current = priority(city)
+            if queue and current > queue[0][0]:
+                heapq.heappush(queue, (current, city))
+                continue
+            for u, x, w in _shortcuts(adj, city):
+                if w < adj[u].get(x, (math.inf, -1))[0]:
+                    adj[u][x] = (w, city)
+                    adj[x][u] = (w, city)
+            upward[city] = [(neighbor, w, middle) for neighbor, (w, middle) in adj[city].items()]
+            for neighbor in adj[city]:
+                del adj[neighbor][city]
+                deleted[neighbor] += 1
+            adj[city] = {}
+            contracted[city] = True
+            rank[city] = order
+            order += 1
+
+        up_indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum([len(edges) for edges in upward], out=up_indptr[1:])
+        flat = [edge for edges in upward for edge in edges]
+        return cls(metric, rank, up_indptr,
+                   np.array([e[0] for e in flat], dtype=np.int64),
+                   np.array([e[1] for e in flat], dtype=np.float64),
+                   np.array([e[2] for e in flat], dtype=np.int64),
+                   graph.fingerprint())
+
+    def save(self, path):
+        np.savez(path, version=FORMAT_VERSION, metric=self.metric, rank=self.rank, indptr=self.indptr,
+                 indices=self.indices, weight=self.weight, middle=self.middle,
+                 fingerprint=np.array(self.fingerprint, dtype=np.float64))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            if int(data["version"]) != FORMAT_VERSION:
+                raise ValueError("Unsupported hierarchy version: %s" % data["version"])
+            return cls(str(data["metric"]), data["rank"], data["indptr"], data["indices"],
+                       data["weight"], data["middle"], data["fingerprint"].tolist())
+
+    def matches(self, graph):
+        return self.fingerprint == graph.fingerprint()
+
+    def query(self, source, target, stats=None):
+        """Bidirectional upward search.
+
+        Args:
+            source (int): start city id.
+            target (int): end city id.
+            stats (dict): when given, receives the "expanded" and "peak_fringe" counts.
+
+        Returns:
+            tuple: (cost, list of city ids from source to target), or (inf, None) when
+            the target cannot be reached.
+        """
+        if source == target:
+            return 0.0, [source]
+        indptr, indices, weight = self._lists
+        dist = ({source: 0.0}, {target: 0.0})
+        parent = ({source: -1}, {target: -1})
+        fringe = ([(0.0, source)], [(0.0, target)])
+        best, meet = math.inf, -1
+        expanded = peak = 0
+        while fringe[0] or fringe[1]:
+            peak = max(peak, len(fringe[0]) + len(fringe[1]))
+            for side in (0, 1):
+                if not fringe[side]:
+                    continue
+                d, city = heapq.heappop(fringe[side])
+                if d > dist[side][city]:
+                    continue
+                if d >= best:
+                    # Nothing cheaper can come from this side any more.
+                    fringe[side].clear()
+                    continue
+                expanded += 1
+                other = dist[1 - side].get(city)
+                if other is not None and d + other < best:
+                    best, meet = d + other, city
+                for i in range(indptr[city], indptr[city + 1]):
+                    neighbor = indices[i]
+                    new = d + weight[i]
+                    if new < dist[side].get(neighbor, math.inf):
+                        dist[side][neighbor] = new
+                        parent[side][neighbor] = city
+                        heapq.heappush(fringe[side], (new, neighbor))
+        if stats is not None:
+            stats["expanded"] = expanded
+            stats["peak_fringe"] = peak
+        if meet < 0:
+            return math.inf, None
+        up = [meet]
+        while parent[0][up[-1]] >= 0:
+            up.append(parent[0][up[-1]])
+        up.reverse()
+        down = [meet]
+        while parent[1][down[-1]] >= 0:
+            down.append(parent[1][down[-1]])
+        return best, self._unpack(up + down[1:])
+
+    def _unpack(self, cities):
+        """Replace every shortcut between consecutive cities by the cities it skips."""
+        path = [cities[0]]
+        stack = list(zip(cities[:-1], cities[1:]))
+        stack.reverse()
+        while stack:
+            a, b = stack.pop()
+            key = (a, b) if (a, b) in self._middle_of else (b, a)
+            middle = self._middle_of[key]
+            if middle < 0:
+                path.append(b)
+            else:
+                stack.append((middle, b))
+                stack.append((a, middle))
+        return path
+
+    def route(self, graph, source, target, stats=None):
+        """get_route() result dictionary for the optimal route between two city ids."""
+        _, cities = self.query(source, target, stats)
+        if cities is None:
+            return empty_route()
+        return route_summary(graph, [graph.find_segment(a, b) for a, b in zip(cities[:-1], cities[1:])])
+
+
+def hierarchy_path(cost, data_dir=DATA_DIR):
+    check_metric(cost)
+    return os.path.join(data_dir, "contraction-%s.npz" % METRICS[cost])
+
+
+def get_hierarchy(cost, graph=None, data_dir=DATA_DIR, save=True):
+    """Load the saved hierarchy for ``cost``, building (and saving) it when missing or stale."""
+    graph = graph or get_graph(data_dir)
+    path = hierarchy_path(cost, data_dir)
+    if os.path.exists(path):
+        hierarchy = ContractionHierarchy.load(path)
+        if hierarchy.matches(graph):
+            return hierarchy
+    hierarchy = ContractionHierarchy.build(graph, cost)
+    if save:
+        hierarchy.save(path)
+    return hierarchy
+
+
+if __name__ == "__main__":
+    # python3 contraction.py [data_dir] -> contraction-miles.npz and contraction-hours.npz
+    directory = sys.argv[1] if len(sys.argv) > 1 else DATA_DIR
+    road_graph = get_graph(directory)
+    for cost_function in METRICS:
+        built = ContractionHierarchy.build(road_graph, cost_function)
+        built.save(hierarchy_path(cost_function, directory))
+        print("%s: %d shortcuts" % (built.metric, built.num_shortcuts))
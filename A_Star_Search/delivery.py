@@ -0,0 +1,102 @@
+#!/usr/local/bin/python3
+# delivery.py : Label-setting search for the path-dependent delivery cost
+#
+# The delivery hours added by a segment depend on the delivery hours accumulated so far:
+#     t_road + 2 * p * (t_road + t_trip)
+# so the cost of a segment is not fixed and the usual "mark visited when pushed" search
+# gives wrong answers.  This engine keeps labels (delivery hours, hours, miles)
+# with parent links instead.  Driving a segment is strictly increasing in the accumulated
+# delivery hours, so a label whose delivery hours (then hours, then miles) are no better than
+# another label at the same city can never lead to a better route and is pruned.  At most
+# one label per city is ever expanded, which bounds the work by the size of the graph.
+#
+
+import heapq
+import math
+import time
+
+from search import delivery_step
+
+# References:
+'''
+https://en.wikipedia.org/wiki/Shortest_path_problem#Time-dependent_shortest_path
+https://doi.org/10.1016/j.ejor.2004.01.033 (label-setting with dominance)
+'''
+
+
+def delivery_search(graph, source, target, heuristic=None, stats=None, on_expand=None):
+    """Minimum delivery-hours route from source to target.
+
+    Args:
+        graph (RoadGraph): road network.
+        source (int): start city id.
+        target (int): end city id.
+        heuristic (sequence): optional lower bound on the remaining driving hours from
+            every city (e.g. Landmarks.heuristic(target, "delivery")); delivery hours are
+            never below driving hours, so it keeps the search exact.
+        stats (dict): when given, receives "labels" (created), "dominated" (pruned when
+            created), "stale" (superseded before expansion), "expanded", "peak_fringe"
+            and "wall_time" in seconds.
+        on_expand (callable): called as ``on_expand(city, delivery_hours)`` for every
+            expanded label.
+
+    Returns:
+        list: CSR segment positions of the route, or None when target is unreachable.
+    """
+    begin = time.perf_counter()
+    indptr, indices, miles, hours, _, probability = graph.lists()
+    # Best label per city, compared as (delivery hours, hours, miles).
+    best = [None] * graph.num_cities
+    # Label pool: parallel lists indexed by label id.
+    label_city, label_parent, label_edge = [source], [-1], [-1]
+    best[source] = (0.0, 0.0, 0.0)
+    fringe = [((heuristic[source] if heuristic is not None else 0.0), 0.0, 0.0, 0.0, 0)]
+    created = dominated = stale = expanded = peak = 0
+    found = -1
+    while fringe:
+        peak = max(peak, len(fringe))
+        _, d, h, m, label = heapq.heappop(fringe)
+        city = label_city[label]
+        if best[city] != (d, h, m):
+            stale += 1
+            continue
+        # Mark this label as expanded so equal labels pushed later are dropped.
+        best[city] = (d, h, m, label)
+        expanded += 1
+        if on_expand is not None:
+            on_expand(city, d)
+        if city == target:
+            found = label
+            break
+        for i in range(indptr[city], indptr[city + 1]):
+            neighbor = indices[i]
+            candidate = (delivery_step(d, hours[i], probability[i]), h + hours[i], m + miles[i])
+            current = best[neighbor]
+            if current is not None and current[:3] <= candidate:
+                dominated += 1
+                continue
+            bound = 0.0
+            if heuristic is not None:
+                bound = heuristic[neighbor]
+                if bound == math.inf:
+                    continue
+            best[neighbor] = candidate
+            label_city.append(neighbor)
+            label_parent.append(label)
+            label_edge.append(i)
+            created += 1
+            heapq.heappush(fringe, (candidate[0] + bound, candidate[0], candidate[1], candidate[2],
+                                    len(label_city) - 1))
+
+    if stats is not None:
+        stats.update({"labels": created, "dominated": dominated, "stale": stale, "expanded": expanded,
+                      "peak_fringe": peak, "wall_time": time.perf_counter() - begin})
+    if found < 0:
+        return None
+    edges = []
+    label = found
+    while label_parent[label] >= 0:
+        edges.append(label_edge[label])
+        label = label_parent[label]
+    edges.reverse()
+    return edges
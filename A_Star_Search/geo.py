@@ -0,0 +1,114 @@
+#!/usr/local/bin/python3
+# geo.py : Precomputed city coordinates and vectorized great-circle heuristics
+#
+# Latitudes and longitudes are converted to radians, together with cos(latitude), once
+# per graph.  A query then gets the haversine distance from every city to its target in
+# one NumPy expression instead of a trigonometric call per pushed city.
+#
+# Cities without a record in city-gps.txt are imputed once: each one is anchored to the
+# GPS city closest to it by road miles, and that road distance is kept as its slack.
+# Driving from v to t needs at least hav(anchor(v), anchor(t)) - slack(v) - slack(t)
+# miles by the triangle inequality, so the bound stays admissible wherever the haversine
+# distance itself is.  This dataset has segments shorter than the straight line between
+# their cities, so that is not everywhere: given landmark tables, the bound is capped by
+# the landmark lower bound, which never exceeds the road distance.
+#
+
+import heapq
+import math
+
+import numpy as np
+
+# References:
+'''
+https://en.wikipedia.org/wiki/Haversine_formula
+https://en.wikipedia.org/wiki/Triangle_inequality
+'''
+
+EARTH_RADIUS_MILES = 3961
+
+
+def haversine_miles(lat1, cos_lat1, long1, lat2, cos_lat2, long2):
+    """Great-circle miles between points given in radians; works on scalars and arrays."""
+    a = np.sin((lat1 - lat2) / 2) ** 2 + cos_lat1 * cos_lat2 * np.sin((long1 - long2) / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def nearest_gps_city(graph):
+    """Anchor and slack of every city: the closest GPS city by road miles and those miles.
+
+    One multi-source Dijkstra from all GPS cities at once.  GPS cities are their own
+    anchor with slack 0; cities that reach no GPS city get anchor -1 and slack inf.
+    """
+    indptr, indices, miles = graph.lists()[:3]
+    n = graph.num_cities
+    known = np.isfinite(graph.latitude) & np.isfinite(graph.longitude)
+    slack = [math.inf] * n
+    anchor = [-1] * n
+    fringe = []
+    for city in np.flatnonzero(known).tolist():
+        slack[city] = 0.0
+        anchor[city] = city
+        fringe.append((0.0, city))
+    heapq.heapify(fringe)
+    while fringe:
+        d, city = heapq.heappop(fringe)
+        if d > slack[city]:
+            continue
+        for i in range(indptr[city], indptr[city + 1]):
+            neighbor = indices[i]
+            new = d + miles[i]
+            if new < slack[neighbor]:
+                slack[neighbor] = new
+                anchor[neighbor] = anchor[city]
+                heapq.heappush(fringe, (new, neighbor))
+    return np.array(anchor, dtype=np.int64), np.array(slack, dtype=np.float64)
+
+
+class GeoTable(object):
+    def __init__(self, graph) -> None:
+        """Radian coordinates, cos(latitude) and GPS imputation for every city of ``graph``.
+
+        Imputed cities take the coordinates of their anchor; ``slack`` holds the road
+        miles to it (0 for GPS cities) and ``imputed`` marks them.
+        """
+        self.anchor, self.slack = nearest_gps_city(graph)
+        self.imputed = self.anchor != np.arange(graph.num_cities)
+        source = np.where(self.anchor >= 0, self.anchor, 0)
+        reached = self.anchor >= 0
+        self.latitude = np.where(reached, np.radians(np.asarray(graph.latitude, dtype=np.float64))[source], np.nan)
+        self.longitude = np.where(reached, np.radians(np.asarray(graph.longitude, dtype=np.float64))[source], np.nan)
+        self.cos_latitude = np.cos(self.latitude)
+        self.max_speed_limit = graph.max_speed_limit
+
+    def miles_to(self, target):
+        """Great-circle lower bound on the road miles from every city to ``target``.
+
+        Cities (or a target) that no GPS city can reach get 0.  Only admissible where the
+        roads are no shorter than the great circle; see heuristic() for the capped bound.
+        """
+        lat, cos_lat, long = self.latitude[target], self.cos_latitude[target], self.longitude[target]
+        if math.isnan(lat):
+            return np.zeros(len(self.latitude))
+        with np.errstate(invalid="ignore"):
+            bound = haversine_miles(self.latitude, self.cos_latitude, self.longitude, lat, cos_lat, long)
+            bound -= self.slack + self.slack[target]
+        bound[~(bound > 0)] = 0.0
+        return bound
+
+    def heuristic(self, target, cost, landmarks=None):
+        """Heuristic to ``target`` for all cities as a list for the search loop.
+
+        "distance" gets miles_to(); "time" and "delivery" divide it by the highest speed
+        limit (delivery hours are never below driving hours).  With ``landmarks`` every
+        bound is capped by the landmark lower bound for the cost, so it never exceeds the
+        true road cost and A* stays exact.
+        """
+        if cost not in ("distance", "time", "delivery"):
+            raise ValueError("Error: no great-circle heuristic for the %r cost" % (cost,))
+        bound = self.miles_to(target)
+        if cost != "distance":
+            bound /= self.max_speed_limit
+        if landmarks is not None:
+            np.minimum(bound, landmarks.bounds(target, cost), out=bound)
+        return bound.tolist()
@@ -0,0 +1,293 @@
+#!/usr/local/bin/python3
+# ingest.py : Streaming, fault-tolerant parser for the road-network text dataset
+#
+# python3 ingest.py [data_dir]  -> prints the validation report of the dataset as JSON
+#
+# Both files are read in chunks of lines and parsed into typed arrays (array.array), so the
+# text is never held in memory and every city or segment costs a few machine words rather
+# than a dictionary of Python objects.  Rows that cannot be used are skipped, rows with a
+# missing or impossible speed limit get DEFAULT_SPEED_LIMIT, and both are recorded in a
+# ValidationReport.  Zero-length segments are valid.  Parallel segments are removed afterwards in one vectorized pass; the
+# first segment between two cities wins in each direction.
+#
+
+from array import array
+from collections import Counter
+import json
+import math
+import os
+import sys
+
+import numpy as np
+
+# References:
+'''
+https://docs.python.org/3/library/array.html
+https://numpy.org/doc/stable/reference/generated/numpy.unique.html
+'''
+
+CITY_GPS_FILE = "city-gps.txt"
+ROAD_SEGMENTS_FILE = "road-segments.txt"
+DEFAULT_SPEED_LIMIT = 40.0
+
+# Bytes of text parsed per chunk.
+CHUNK_BYTES = 1 << 20
+
+# Problems found in the dataset and what is done with the affected row.
+ISSUES = {
+    "too_few_fields": "skipped",
+    "bad_coordinates": "skipped",
+    "duplicate_city": "coordinates replaced",
+    "bad_length": "skipped",
+    "self_loop": "skipped",
+    "parallel_segment": "skipped",
+    "missing_speed": "default speed",
+    "bad_speed": "default speed",
+}
+
+
+class ValidationReport(object):
+    def __init__(self, max_samples=20) -> None:
+        """Problems found while parsing a dataset.
+
+        Args:
+            max_samples (int): offending rows kept as examples for each file and issue.
+        """
+        self.max_samples = max_samples
+        self.rows = Counter()  # file -> rows read
+        self.counts = Counter()  # (file, issue) -> rows
+        self.samples = {}  # (file, issue) -> [(line number, text)]
+
+    def add(self, file, line_number, issue, text=None):
+        key = (file, issue)
+        self.counts[key] += 1
+        examples = self.samples.setdefault(key, [])
+        if len(examples) < self.max_samples:
+            examples.append((line_number, text.rstrip("\n") if text is not None else None))
+
+    @property
+    def clean(self):
+        return not self.counts
+
+    def issues(self, file=None):
+        """Rows per issue, for one file or summed over both."""
+        totals = Counter()
+        for (name, issue), count in self.counts.items():
+            if file is None or name == file:
+                totals[issue] += count
+        return dict(totals)
+
+    def to_dict(self):
+        files = {}
+        for name, rows in self.rows.items():
+            files[name] = {"rows": rows, "issues": {}}
+        for (name, issue), count in sorted(self.counts.items()):
+            files.setdefault(name, {"rows": 0, "issues": {}})["issues"][issue] = {
+                "rows": count,
+                "action": ISSUES[issue],
+                "samples": [{"line": line, "text": text} for line, text in self.samples[(name, issue)]],
+            }
+        return {"files": files}
+
+    def summary(self):
+        """One line per file and issue, for printing."""
+        lines = []
+        for name, rows in sorted(self.rows.items()):
+            lines.append("%s: %d rows" % (name, rows))
+            for (file, issue), count in sorted(self.counts.items()):
+                if file == name:
+                    lines.append("  %-16s %8d (%s), e.g. line %s" % (
+                        issue, count, ISSUES[issue], self.samples[(file, issue)][0][0]))
+        return lines
+
+
+def _chunks(f, chunk_bytes):
+    """Lines of an open file in lists of roughly ``chunk_bytes``."""
+    while True:
+        lines = f.readlines(chunk_bytes)
+        if not lines:
+            return
+        yield lines
+
+
+def _number(text):
+    value = float(text)
+    if not math.isfinite(value):
+        raise ValueError(text)
+    return value
+
+
+def read_cities(path, report, chunk_bytes=CHUNK_BYTES):
+    """Parse city-gps.txt.
+
+    A city listed twice keeps the id of its first row and the coordinates of its last
+    usable row, as when the rows were read into a dictionary; the repeat is reported as
+    duplicate_city.
+
+    Returns:
+        tuple: (names, index, latitude, longitude) with ``index`` mapping names to ids and
+        the coordinates as array("d").
+    """
+    file = os.path.basename(path)
+    names, index = [], {}
+    latitude, longitude = array("d"), array("d")
+    line_number = 0
+    with open(path, "r") as f:
+        for lines in _chunks(f, chunk_bytes):
+            for line in lines:
+                line_number += 1
+                fields = line.split()
+                if not fields:
+                    continue
+                report.rows[file] += 1
+                if len(fields) < 3:
+                    report.add(file, line_number, "too_few_fields", line)
+                    continue
+                try:
+                    lat, lon = _number(fields[1]), _number(fields[2])
+                except ValueError:
+                    lat = lon = math.nan
+                if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+                    report.add(file, line_number, "bad_coordinates", line)
+                    continue
+                if fields[0] in index:
+                    report.add(file, line_number, "duplicate_city", line)
+                    latitude[index[fields[0]]], longitude[index[fields[0]]] = lat, lon
+                    continue
+                index[fields[0]] = len(names)
+                names.append(fields[0])
+                latitude.append(lat)
+                longitude.append(lon)
+    return names, index, latitude, longitude
+
+
+def read_segments(path, names, index, latitude, longitude, report, chunk_bytes=CHUNK_BYTES):
+    """Parse road-segments.txt, one row per segment.
+
+    Cities missing from city-gps.txt are appended to ``names`` / ``index`` with NaN
+    coordinates.
+
+    Returns:
+        tuple: (highways, rows) with the highway names and a dict of typed arrays
+        "src", "dst", "miles", "speed", "highway" and "line".
+    """
+    file = os.path.basename(path)
+    highways, highway_index = [], {}
+    rows = {"src": array("i"), "dst": array("i"), "miles": array("d"), "speed": array("d"),
+            "highway": array("i"), "line": array("q")}
+    src, dst, miles, speed, highway, lines_kept = (rows[key] for key in
+                                                   ("src", "dst", "miles", "speed", "highway", "line"))
+    line_number = 0
+    with open(path, "r") as f:
+        for lines in _chunks(f, chunk_bytes):
+            for line in lines:
+                line_number += 1
+                fields = line.split()
+                if not fields:
+                    continue
+                report.rows[file] += 1
+                if len(fields) < 4:
+                    report.add(file, line_number, "too_few_fields", line)
+                    continue
+                a, b = fields[0], fields[1]
+                try:
+                    length = _number(fields[2])
+                except ValueError:
+                    length = -1.0
+                if length < 0:
+                    report.add(file, line_number, "bad_length", line)
+                    continue
+                if a == b:
+                    report.add(file, line_number, "self_loop", line)
+                    continue
+                if len(fields) == 4:
+                    # The speed limit is the field that goes missing.
+                    report.add(file, line_number, "missing_speed", line)
+                    speed_limit, name = DEFAULT_SPEED_LIMIT, fields[3]
+                else:
+                    try:
+                        speed_limit = _number(fields[3])
+                    except ValueError:
+                        speed_limit = 0.0
+                    if speed_limit <= 0:
+                        report.add(file, line_number, "bad_speed", line)
+                        speed_limit = DEFAULT_SPEED_LIMIT
+                    name = "_".join(fields[4:])
+                for city in (a, b):
+                    if city not in index:
+                        index[city] = len(names)
+                        names.append(city)
+                        latitude.append(math.nan)
+                        longitude.append(math.nan)
+                h = highway_index.get(name)
+                if h is None:
+                    h = highway_index[name] = len(highways)
+                    highways.append(name)
+                src.append(index[a])
+                dst.append(index[b])
+                miles.append(length)
+                speed.append(speed_limit)
+                highway.append(h)
+                lines_kept.append(line_number)
+    return highways, rows
+
+
+def directed_edges(rows, num_cities, report=None, file=ROAD_SEGMENTS_FILE):
+    """Both directions of every segment row, without parallel duplicates.
+
+    Directions keep row order, the forward one first; of several segments between the
+    same two cities the first one wins in each direction.  Rows that lose in both
+    directions are reported as "parallel_segment".
+
+    Returns:
+        dict: int64 / float64 arrays "src", "dst", "miles", "speed", "highway".
+    """
+    src = np.frombuffer(rows["src"], dtype=np.int32).astype(np.int64)
+    dst = np.frombuffer(rows["dst"], dtype=np.int32).astype(np.int64)
+    # Interleave forward and backward directions: position 2 * row + direction.
+    x = np.stack([src, dst], axis=1).ravel()
+    y = np.stack([dst, src], axis=1).ravel()
+    _, first = np.unique(x * num_cities + y, return_index=True)
+    keep = np.sort(first)
+    if report is not None:
+        kept_rows = np.zeros(len(src), dtype=bool)
+        kept_rows[keep // 2] = True
+        line = np.frombuffer(rows["line"], dtype=np.int64)
+        for number in line[~kept_rows].tolist():
+            report.add(file, number, "parallel_segment")
+    row = keep // 2
+    return {
+        "src": x[keep],
+        "dst": y[keep],
+        "miles": np.frombuffer(rows["miles"], dtype=np.float64)[row],
+        "speed": np.frombuffer(rows["speed"], dtype=np.float64)[row],
+        "highway": np.frombuffer(rows["highway"], dtype=np.int32)[row],
+    }
+
+
+def read_dataset(data_dir, report=None, chunk_bytes=CHUNK_BYTES):
+    """Parse both text files of a dataset directory.
+
+    City ids are assigned in file order: first every city in city-gps.txt, then the
+    cities that only appear in road-segments.txt.
+
+    Returns:
+        tuple: (names, highways, latitude, longitude, edges) with the coordinates as
+        float64 arrays and ``edges`` as returned by directed_edges().
+    """
+    report = report if report is not None else ValidationReport()
+    names, index, latitude, longitude = read_cities(os.path.join(data_dir, CITY_GPS_FILE), report, chunk_bytes)
+    highways, rows = read_segments(os.path.join(data_dir, ROAD_SEGMENTS_FILE), names, index,
+                                   latitude, longitude, report, chunk_bytes)
+    del index
+    edges = directed_edges(rows, len(names), report)
+    return (names, highways, np.frombuffer(latitude, dtype=np.float64).copy(),
+            np.frombuffer(longitude, dtype=np.float64).copy(), edges)
+
+
+if __name__ == "__main__":
+    directory = sys.argv[1] if len(sys.argv) > 1 else os.path.dirname(os.path.abspath(__file__))
+    validation = ValidationReport()
+    read_dataset(directory, validation)
+    print("\n".join(validation.summary()), file=sys.stderr)
+    print(json.dumps(validation.to_dict(), indent=2))
@@ -0,0 +1,192 @@
+#!/usr/local/bin/python3
+# instrumentation.py : Optional per-query instrumentation for route searches
+#
+# A Probe passed to route.find_route() collects search counters, phase timers (graph load,
+# cache lookup, heuristic setup, search, route building, and "query" spanning the last
+# three), a histogram of heuristic lookups and node
+# expansion events.  Without a probe the engines only pay for one "is None" test per
+# expansion.  A probe exports structured log records and Chrome trace files that open in
+# chrome://tracing or https://ui.perfetto.dev.
+#
+# get_route() takes no extra arguments, so it reports to the probe made active with
+#     with Probe().activate() as probe:
+#         get_route(start, end, cost)
+#     probe.write_chrome_trace("route.trace.json")
+#
+
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+import contextvars
+import json
+import logging
+import math
+import os
+import threading
+import time
+
+# References:
+'''
+https://docs.google.com/document/d/1CvAClvFfyA5R-PhYUmn5OOQtYMH4h6I0nSsKchNAySU (Trace Event Format)
+'''
+
+logger = logging.getLogger("route.instrumentation")
+
+# Counters that are combined with max() instead of summed across queries.
+PEAK_COUNTERS = ("peak_fringe",)
+
+_active = contextvars.ContextVar("route_probe", default=None)
+_NO_PHASE = nullcontext()
+
+
+def current_probe():
+    """The probe activated in this thread or task, or None."""
+    return _active.get()
+
+
+def no_phase(name, **args):
+    """Stand-in for Probe.phase when no probe is attached."""
+    return _NO_PHASE
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100.0 * len(values)))
+    return values[min(rank, len(values)) - 1]
+
+
+def _bucket(value):
+    """Power-of-two histogram bucket label for a heuristic value."""
+    if value == math.inf:
+        return "inf"
+    if value <= 0:
+        return "0"
+    return "2^%d" % math.floor(math.log2(value))
+
+
+class _ProbedHeuristic(object):
+    def __init__(self, heuristic, probe) -> None:
+        self.heuristic = heuristic
+        self.probe = probe
+
+    def __getitem__(self, city):
+        begin = time.perf_counter()
+        value = self.heuristic[city]
+        self.probe.heuristic_seconds += time.perf_counter() - begin
+        self.probe.heuristic_histogram[_bucket(value)] += 1
+        return value
+
+
+class Probe(object):
+    def __init__(self, on_expand=None, trace_expansions=False, max_events=100000) -> None:
+        """Instrumentation for one or more route queries.
+
+        Args:
+            on_expand (callable): called as ``on_expand(city_id, cost_so_far)`` for every
+                expanded city.
+            trace_expansions (bool): also record every expansion as an instant event of
+                the Chrome trace.
+            max_events (int): cap on recorded trace events.
+        """
+        self.counters = {}
+        self.queries = []
+        self.phases = Counter()
+        self.heuristic_histogram = Counter()
+        self.heuristic_seconds = 0.0
+        self.events = []
+        self.max_events = max_events
+        self.trace_expansions = trace_expansions
+        self.listeners = [on_expand] if on_expand is not None else []
+        self.origin = time.perf_counter()
+
+    def add_listener(self, on_expand):
+        self.listeners.append(on_expand)
+
+    @contextmanager
+    def activate(self):
+        """Make this the probe get_route() reports to inside the with block."""
+        token = _active.set(self)
+        try:
+            yield self
+        finally:
+            _active.reset(token)
+
+    def _timestamp(self):
+        return (time.perf_counter() - self.origin) * 1e6
+
+    def _record(self, event):
+        if len(self.events) < self.max_events:
+            event.setdefault("pid", os.getpid())
+            event.setdefault("tid", threading.get_ident())
+            self.events.append(event)
+
+    @contextmanager
+    def phase(self, name, **args):
+        """Time a block as a named phase (and a complete event in the trace)."""
+        begin = time.perf_counter()
+        start = self._timestamp()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - begin
+            self.phases[name] += elapsed
+            self._record({"name": name, "ph": "X", "ts": start, "dur": elapsed * 1e6, "args": args})
+
+    def expansion_callback(self):
+        """The callback handed to the engines, or None when nothing listens to expansions."""
+        if not self.listeners and not self.trace_expansions:
+            return None
+
+        def expand(city, cost):
+            for listener in self.listeners:
+                listener(city, cost)
+            if self.trace_expansions:
+                self._record({"name": "expand", "ph": "i", "s": "t", "ts": self._timestamp(),
+                              "args": {"city": city, "cost": cost}})
+        return expand
+
+    def wrap_heuristic(self, heuristic):
+        """Heuristic sequence that counts, times and histograms every lookup."""
+        return _ProbedHeuristic(heuristic, self)
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def end_query(self, stats, **fields):
+        """Keep the search counters of one query and add them to the totals."""
+        self.queries.append(dict(fields, stats=dict(stats)))
+        for name, value in stats.items():
+            if not isinstance(value, (int, float)) or not math.isfinite(value):
+                continue
+            if name in PEAK_COUNTERS:
+                self.counters[name] = max(self.counters.get(name, 0), value)
+            else:
+                self.count(name, value)
+        self.count("queries")
+
+    def record(self, **fields):
+        """Structured log record of everything collected so far."""
+        record = dict(fields)
+        record.update({
+            "counters": dict(self.counters),
+            "queries": list(self.queries),
+            "phases_ms": {name: 1000 * seconds for name, seconds in self.phases.items()},
+            "heuristic_calls": sum(self.heuristic_histogram.values()),
+            "heuristic_ms": 1000 * self.heuristic_seconds,
+            "heuristic_histogram": dict(self.heuristic_histogram),
+        })
+        return record
+
+    def log(self, level=logging.INFO, **fields):
+        """Emit record() as one JSON log line."""
+        logger.log(level, json.dumps(self.record(**fields), sort_keys=True))
+
+    def chrome_trace(self):
+        counters = {"name": "counters", "ph": "C", "ts": self._timestamp(), "pid": os.getpid(),
+                    "args": dict(self.counters)}
+        return {"traceEvents": self.events + [counters], "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path):
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f)
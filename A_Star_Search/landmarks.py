@@ -0,0 +1,154 @@
+#!/usr/local/bin/python3
+# landmarks.py : ALT (A*, Landmarks, Triangle inequality) heuristic for route queries
+#
+# Exact road distances, travel times and segment counts from a few landmark cities are
+# computed once.  By the triangle inequality |d(L, t) - d(L, v)| never overestimates
+# d(v, t), so the largest of these differences over all landmarks is an admissible and
+# consistent A* heuristic.  It only needs the road graph, so it also covers the cities
+# that have no record in city-gps.txt.
+#
+
+import os
+import random
+import sys
+
+import numpy as np
+
+from road_graph import DATA_DIR, get_graph
+from search import astar, check_cost, dijkstra, empty_route, path_edges, route_summary
+
+# References:
+'''
+https://www.microsoft.com/en-us/research/publication/computing-the-shortest-path-a-search-meets-graph-theory/
+https://en.wikipedia.org/wiki/Admissible_heuristic
+'''
+
+DEFAULT_LANDMARKS = 16
+FORMAT_VERSION = 1
+
+# Distance table used for each cost function.  Delivery hours are never less than the
+# plain driving hours of the same route, so the hours table bounds them as well.
+TABLES = {"distance": "miles", "time": "hours", "delivery": "hours", "segments": "segments"}
+
+
+class Landmarks(object):
+    def __init__(self, cities, miles, hours, segments, fingerprint=None) -> None:
+        """Landmark distance tables.
+
+        Args:
+            cities (np.ndarray): landmark city ids.
+            miles, hours, segments (np.ndarray): (landmarks x cities) shortest-path costs
+                from every landmark, inf where a city is not reachable.
+            fingerprint (list): identity of the graph the tables were computed on.
+        """
+        self.cities = cities
+        self.miles = miles
+        self.hours = hours
+        self.segments = segments
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def build(cls, graph, count=DEFAULT_LANDMARKS, seed=0):
+        """Pick landmarks by farthest selection on miles and fill the tables.
+
+        The first landmark is the city farthest from a random start in the largest
+        connected component; every next one is the city whose miles to its closest
+        landmark are largest, which spreads the landmarks around the edge of the map.
+        """
+        component = graph.components()
+        largest = np.flatnonzero(component == np.argmax(np.bincount(component)))
+        start = int(largest[random.Random(seed).randrange(len(largest))])
+
+        closest = np.asarray(dijkstra(graph, start, "distance")[0])
+        cities, tables = [], {"miles": [], "hours": [], "segments": []}
+        for k in range(min(count, len(largest))):
+            candidate = int(np.argmax(np.where(np.isfinite(closest), closest, -1)))
+            cities.append(candidate)
+            for table, cost in (("miles", "distance"), ("hours", "time"), ("segments", "segments")):
+                tables[table].append(dijkstra(graph, candidate, cost)[0])
+            row = np.asarray(tables["miles"][-1])
+            closest = row if k == 0 else np.minimum(closest, row)
+        return cls(np.array(cities, dtype=np.int64),
+                   *(np.array(tables[table], dtype=np.float64) for table in ("miles", "hours", "segments")),
+                   fingerprint=graph.fingerprint())
+
+    def bounds(self, target, cost):
+        """Lower bound on the cost from every city to ``target`` as an array."""
+        check_cost(cost)
+        table = getattr(self, TABLES[cost])
+        to_target = table[:, target][:, None]
+        with np.errstate(invalid="ignore"):
+            bounds = np.abs(to_target - table)
+        # inf - inf: neither the city nor the target is reachable from that landmark.
+        bounds[np.isnan(bounds)] = 0
+        return bounds.max(axis=0)
+
+    def heuristic(self, target, cost):
+        """Lower bound on the cost from every city to ``target``, as a list for the search loop.
+
+        Cities in a different component from the target get inf, so the search never
+        pushes them.
+        """
+        return self.bounds(target, cost).tolist()
+
+    def potential(self, source, target, cost):
+        """Average potential ``(h_target - h_source) / 2`` for bidirectional A*.
+
+        The forward search uses it as is and the backward search negated; both then run
+        on the same consistent reduced costs (see search.bidirectional).  Cities outside
+        the component of source and target get 0, they are never reached.
+        """
+        with np.errstate(invalid="ignore"):
+            potential = (self.bounds(target, cost) - self.bounds(source, cost)) / 2
+        potential[~np.isfinite(potential)] = 0
+        return potential.tolist()
+
+    def search(self, graph, source, target, cost, stats=None):
+        return astar(graph, source, target, cost, self.heuristic(target, cost), stats)
+
+    def route(self, graph, source, target, cost, stats=None):
+        """get_route() result dictionary for the optimal route between two city ids."""
+        _, parent, parent_edge = self.search(graph, source, target, cost, stats)
+        edges = path_edges(parent, parent_edge, source, target)
+        return empty_route() if edges is None else route_summary(graph, edges)
+
+    def save(self, path):
+        np.savez(path, version=FORMAT_VERSION, cities=self.cities, miles=self.miles, hours=self.hours,
+                 segments=self.segments, fingerprint=np.array(self.fingerprint, dtype=np.float64))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            if int(data["version"]) != FORMAT_VERSION:
+                raise ValueError("Unsupported landmark table version: %s" % data["version"])
+            return cls(data["cities"], data["miles"], data["hours"], data["segments"],
+                       data["fingerprint"].tolist())
+
+    def matches(self, graph):
+        return self.fingerprint == graph.fingerprint()
+
+
+def landmarks_path(data_dir=DATA_DIR):
+    return os.path.join(data_dir, "landmarks.npz")
+
+
+def get_landmarks(graph=None, data_dir=DATA_DIR, count=DEFAULT_LANDMARKS, save=True):
+    """Load the saved landmark tables, computing (and saving) them when missing or stale."""
+    graph = graph or get_graph(data_dir)
+    path = landmarks_path(data_dir)
+    if os.path.exists(path):
+        landmarks = Landmarks.load(path)
+        if landmarks.matches(graph) and len(landmarks.cities) == count:
+            return landmarks
+    landmarks = Landmarks.build(graph, count)
+    if save:
+        landmarks.save(path)
+    return landmarks
+
+
+if __name__ == "__main__":
+    # python3 landmarks.py [count] -> landmarks.npz next to the dataset
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_LANDMARKS
+    built = Landmarks.build(get_graph(), number)
+    built.save(landmarks_path())
+    print("Landmarks: %s" % ", ".join(get_graph().names[city] for city in built.cities))
@@ -0,0 +1,221 @@
+#!/usr/local/bin/python3
+# live.py : Road closures and live speed updates applied to a loaded road graph
+#
+# A LiveGraph keeps the dataset graph as its base and the current speed limit and
+# open/closed state of every base segment.  Each update builds a new immutable Snapshot
+# (copy-on-write: city data is shared, segment arrays are rebuilt in one vectorized pass)
+# and swaps it in, so queries that already hold a snapshot finish against a consistent
+# graph while updates are applied.
+#
+# Derived structures are repaired per cost function instead of rebuilt:
+#   - cached routes through a changed segment are dropped; when some segment got cheaper
+#     for a cost, every cached route for that cost is dropped;
+#   - landmark tables stay valid lower bounds while weights only increase (a closure is an
+#     increase to infinity) and are rebuilt on demand otherwise;
+#   - a contraction hierarchy is kept while its own metric is unchanged (speed updates
+#     leave the distance hierarchy alone) and is rebuilt on demand otherwise.
+#
+
+import threading
+
+import numpy as np
+
+from contraction import ContractionHierarchy, check_metric
+from geo import GeoTable
+from spatial import SpatialIndex
+from landmarks import Landmarks
+from road_graph import get_graph
+from route_cache import RouteCache
+from search import COSTS
+import route
+
+# References:
+'''
+https://en.wikipedia.org/wiki/Copy-on-write
+https://doi.org/10.1145/2886843 (customizable route planning in road networks)
+'''
+
+
+class Snapshot(object):
+    def __init__(self, graph, version, cache, landmarks=None, hierarchies=None, geo=None, spatial=None) -> None:
+        """One consistent version of a live road graph and its derived structures.
+
+        Derived structures are built on first use.  ``landmarks``, ``geo``, ``spatial`` and the values
+        of ``hierarchies`` (keyed by cost) are optional callables returning a structure
+        that is still valid for this graph, typically taken from the previous snapshot.
+
+        Args:
+            graph (RoadGraph): road network of this version.
+            version (int): number of updates applied to the base graph.
+            cache (RouteCache): route cache of this version.
+        """
+        self.graph = graph
+        self.version = version
+        self.cache = cache
+        self.changed_costs = frozenset()
+        self.decreased_costs = frozenset()
+        self._sources = {"landmarks": landmarks, "geo": geo, "spatial": spatial}
+        for cost, source in (hierarchies or {}).items():
+            self._sources[("hierarchy", cost)] = source
+        self._built = {}
+        self.lock = threading.RLock()
+
+    def _get(self, key, build):
+        with self.lock:
+            if key not in self._built:
+                source = self._sources.pop(key, None)
+                self._built[key] = source() if source is not None else build()
+            return self._built[key]
+
+    def inherit(self, key):
+        """Source of a structure for the next snapshot, without a reference to this one.
+
+        A structure built here is passed on as is; otherwise this snapshot's own source (which
+        reads route.SHARED or an already built structure) is passed on, so a chain of snapshots
+        never keeps its predecessors alive.
+        """
+        with self.lock:
+            if key in self._built:
+                built = self._built[key]
+                return lambda: built
+            return self._sources.get(key)
+
+    # The same methods as route.SharedPrecomputed, so a snapshot is find_route()'s ``derived``.
+
+    def landmarks(self, graph=None):
+        return self._get("landmarks", lambda: Landmarks.build(self.graph))
+
+    def hierarchy(self, graph=None, cost="distance"):
+        check_metric(cost)
+        return self._get(("hierarchy", cost), lambda: ContractionHierarchy.build(self.graph, cost))
+
+    def geo(self, graph=None):
+        return self._get("geo", lambda: GeoTable(self.graph))
+
+    def spatial(self, graph=None):
+        return self._get("spatial", lambda: SpatialIndex.from_graph(self.graph))
+
+    def find_route(self, start, end, cost, engine="astar", **options):
+        """route.find_route() against this snapshot."""
+        return route.find_route(start, end, cost, engine, graph=self.graph, derived=self, **options)
+
+    def get_route(self, start, end, cost):
+        """get_route() against this snapshot, through its route cache."""
+        return self.find_route(start, end, cost, cache=self.cache)
+
+
+class LiveGraph(object):
+    def __init__(self, graph=None, cache=None) -> None:
+        """Road graph that accepts closures and speed updates while serving queries.
+
+        Args:
+            graph (RoadGraph): base road network, the shared one from get_graph() by default.
+            cache (RouteCache): route cache of the first snapshot.
+        """
+        self.base = graph or get_graph()
+        self.speed = np.array(self.base.speed, dtype=np.float64)
+        self.open = np.ones(len(self.base.indices), dtype=bool)
+        self._source = np.repeat(np.arange(self.base.num_cities), np.diff(self.base.indptr))
+        # The first snapshot uses the structures saved with the dataset.
+        base = self.base
+        self.current = Snapshot(base, 0, cache if cache is not None else RouteCache(),
+                                landmarks=lambda: route.SHARED.landmarks(base),
+                                hierarchies={cost: (lambda cost=cost: route.SHARED.hierarchy(base, cost))
+                                             for cost in ("distance", "time")},
+                                geo=lambda: route.SHARED.geo(base), spatial=lambda: route.SHARED.spatial(base))
+        self.lock = threading.Lock()
+
+    def snapshot(self):
+        """The current snapshot; hold on to it to run several queries on one version."""
+        return self.current
+
+    def find_route(self, start, end, cost, engine="astar", **options):
+        return self.current.find_route(start, end, cost, engine, **options)
+
+    def get_route(self, start, end, cost):
+        return self.current.get_route(start, end, cost)
+
+    def _positions(self, a, b):
+        """Base segment positions of both directions between two cities."""
+        u, v = self.base.city_id(a), self.base.city_id(b)
+        positions = [self.base.find_segment(u, v), self.base.find_segment(v, u)]
+        if -1 in positions:
+            raise KeyError("No road segment between %s and %s" % (a, b))
+        return positions
+
+    def update(self, speeds=None, close=(), reopen=()):
+        """Apply one batch of changes and publish the resulting snapshot.
+
+        Args:
+            speeds (dict): (city, city) -> new speed limit in mph, or None to restore the
+                dataset speed limit.  Applies to both directions of the segment.
+            close (iterable): (city, city) segments to close.
+            reopen (iterable): (city, city) segments to open again.
+
+        Returns:
+            Snapshot: the new current snapshot (the old one when nothing changed).
+
+        Raises:
+            KeyError: for an unknown city or a pair without a road segment.
+            ValueError: for a speed limit that is not positive.
+        """
+        with self.lock:
+            old = self.current
+            speed, open_ = self.speed.copy(), self.open.copy()
+            for (a, b), mph in (speeds or {}).items():
+                positions = self._positions(a, b)
+                if mph is not None and not mph > 0:
+                    raise ValueError("Error: speed limit must be positive, got %r" % (mph,))
+                speed[positions] = self.base.speed[positions] if mph is None else mph
+            for a, b in close:
+                open_[self._positions(a, b)] = False
+            for a, b in reopen:
+                open_[self._positions(a, b)] = True
+
+            closed = self.open & ~open_
+            reopened = ~self.open & open_
+            retimed = (speed != self.speed) & open_ & self.open
+            if not (closed.any() or reopened.any() or retimed.any()):
+                self.speed, self.open = speed, open_
+                return old
+            changed, decreased = set(), set()
+            if closed.any() or reopened.any():
+                changed.update(COSTS)
+            if reopened.any():
+                decreased.update(COSTS)
+            if retimed.any():
+                changed.update(("time", "delivery"))
+                miles = np.asarray(self.base.miles)
+                hours_before, hours_after = miles / self.speed, miles / speed
+                p_before = np.where(self.speed >= 50, np.tanh(miles / 1000), 0.0)
+                p_after = np.where(speed >= 50, np.tanh(miles / 1000), 0.0)
+                if (hours_after < hours_before)[retimed].any():
+                    decreased.update(("time", "delivery"))
+                if (p_after < p_before)[retimed].any():
+                    decreased.add("delivery")
+
+            touched = closed | reopened | retimed
+            names = self.base.names
+            touched_pairs = {frozenset((names[a], names[b])) for a, b in
+                             zip(self._source[touched].tolist(), np.asarray(self.base.indices)[touched].tolist())}
+
+            def keep(key, cities):
+                cost = key[2]
+                if cost in decreased:
+                    return False
+                if cost not in changed:
+                    return True
+                return not any(frozenset(pair) in touched_pairs for pair in zip(cities[:-1], cities[1:]))
+
+            landmarks = None
+            if not decreased & {"distance", "time", "segments"}:
+                landmarks = old.inherit("landmarks")
+            hierarchies = {cost: old.inherit(("hierarchy", cost)) for cost in ("distance", "time")
+                           if cost not in changed}
+            snapshot = Snapshot(self.base.with_segments(open_, speed), old.version + 1, old.cache.filtered(keep),
+                                landmarks=landmarks, hierarchies=hierarchies, spatial=old.inherit("spatial"))
+            snapshot.changed_costs = frozenset(changed)
+            snapshot.decreased_costs = frozenset(decreased)
+            self.speed, self.open = speed, open_
+            self.current = snapshot
+            return snapshot
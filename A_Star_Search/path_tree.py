@@ -0,0 +1,121 @@
+#!/usr/local/bin/python3
+# path_tree.py : Single-source shortest-path trees over the road graph
+#
+# One Dijkstra from a depot answers every destination: the tree keeps compact per-city
+# arrays of miles, hours, delivery hours, segment count and parent, and routes are only
+# rebuilt from the parent pointers when they are asked for.
+#
+
+import numpy as np
+
+from road_graph import get_graph
+from search import check_cost, delivery_step, dijkstra, empty_route, path_edges, route_summary
+
+# Per-city arrays a tree can be filtered on with within().
+MEASURES = ("miles", "hours", "delivery_hours", "segments")
+
+
+class ShortestPathTree(object):
+    def __init__(self, graph, source, cost, miles, hours, delivery_hours, segments, parent, parent_edge) -> None:
+        """Shortest-path tree rooted at ``source`` for one cost function.
+
+        Every array is indexed by city id.  Unreachable cities have inf in the float
+        arrays, -1 in ``segments`` and -1 as parent.
+
+        Args:
+            graph (RoadGraph): road network the tree was built on.
+            source (int): root city id.
+            cost (str): cost function the tree is optimal for.
+            miles, hours, delivery_hours (np.ndarray): totals along the tree route.
+            segments (np.ndarray): number of segments along the tree route.
+            parent (np.ndarray): previous city on the tree route.
+            parent_edge (np.ndarray): CSR position of the segment from the parent.
+        """
+        self.graph = graph
+        self.source = source
+        self.cost = cost
+        self.miles = miles
+        self.hours = hours
+        self.delivery_hours = delivery_hours
+        self.segments = segments
+        self.parent = parent
+        self.parent_edge = parent_edge
+
+    @property
+    def reachable(self):
+        """Boolean mask of the cities the source can reach."""
+        return self.segments >= 0
+
+    def _id(self, city):
+        return self.graph.city_id(city) if isinstance(city, str) else int(city)
+
+    def path(self, target):
+        """City ids from the source to ``target``, or None when it is unreachable."""
+        target = self._id(target)
+        if not self.reachable[target]:
+            return None
+        cities = [target]
+        while cities[-1] != self.source:
+            cities.append(int(self.parent[cities[-1]]))
+        cities.reverse()
+        return cities
+
+    def route(self, target):
+        """get_route() result dictionary for ``target`` (a city name or id)."""
+        edges = path_edges(self.parent, self.parent_edge, self.source, self._id(target))
+        return empty_route() if edges is None else route_summary(self.graph, edges)
+
+    def within(self, limit, measure="hours"):
+        """Cities whose ``measure`` from the source is at most ``limit``, nearest first.
+
+        For example ``tree.within(3)`` lists every city within three hours of driving
+        along the tree routes.
+
+        Returns:
+            list: (city name, value) pairs.
+        """
+        if measure not in MEASURES:
+            raise ValueError("Unknown measure %r, expected one of %s" % (measure, ", ".join(MEASURES)))
+        values = getattr(self, measure)
+        inside = np.flatnonzero(self.reachable & (values <= limit))
+        inside = inside[np.argsort(values[inside], kind="stable")]
+        return [(self.graph.names[city], values[city].item()) for city in inside]
+
+
+def shortest_path_tree(source, cost, graph=None):
+    """Run one Dijkstra from ``source`` over the whole road graph.
+
+    Args:
+        source (str or int): root city name or id.
+        cost (str): cost function the tree routes minimise.
+        graph (RoadGraph): road network, the shared one from get_graph() by default.
+
+    Returns:
+        ShortestPathTree: totals for every reachable city.
+    """
+    check_cost(cost)
+    graph = graph or get_graph()
+    root = graph.city_id(source) if isinstance(source, str) else int(source)
+    # Cities in the order Dijkstra settles them: every parent comes before its children,
+    # even across zero-length segments, where a parent and its child tie on cost.
+    order = []
+    dist, parent, parent_edge = dijkstra(graph, root, cost, on_expand=lambda city, _: order.append(city))
+    _, _, edge_miles, edge_hours, _, probability = graph.lists()
+
+    n = graph.num_cities
+    miles = np.full(n, np.inf)
+    hours = np.full(n, np.inf)
+    delivery_hours = np.full(n, np.inf)
+    segments = np.full(n, -1, dtype=np.int64)
+    miles[root] = hours[root] = delivery_hours[root] = 0.0
+    segments[root] = 0
+    m, h, dh, sg = miles.tolist(), hours.tolist(), delivery_hours.tolist(), segments.tolist()
+    for city in order[1:]:
+        p, i = parent[city], parent_edge[city]
+        m[city] = m[p] + edge_miles[i]
+        h[city] = h[p] + edge_hours[i]
+        dh[city] = delivery_step(dh[p], edge_hours[i], probability[i])
+        sg[city] = sg[p] + 1
+    return ShortestPathTree(graph, root, cost, np.array(m), np.array(h), np.array(dh),
+                            np.array(sg, dtype=np.int64), np.array(parent, dtype=np.int64),
+                            np.array(parent_edge, dtype=np.int64))
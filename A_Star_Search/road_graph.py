@@ -0,0 +1,269 @@
+#!/usr/local/bin/python3
+# road_graph.py : Compiled, array-backed road network shared by every route query
+#
+# The text dataset (city-gps.txt, road-segments.txt) is parsed once per process and turned
+# into integer city IDs plus CSR adjacency arrays.  The compiled form can be saved to a
+# directory of .npy files and loaded back memory-mapped, so a cold process skips parsing
+# entirely and several worker processes share one copy of the pages.
+#
+
+import functools
+import json
+import os
+import sys
+
+import numpy as np
+
+from ingest import CITY_GPS_FILE, DEFAULT_SPEED_LIMIT, ROAD_SEGMENTS_FILE, ValidationReport, read_dataset
+
+# References:
+'''
+https://en.wikipedia.org/wiki/Sparse_matrix#Compressed_sparse_row_(CSR,_CRS_or_Yale_format)
+https://numpy.org/doc/stable/reference/generated/numpy.load.html
+'''
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+COMPILED_DIR = "road-graph.compiled"
+FORMAT_VERSION = 1
+
+# Arrays written to / read from the compiled directory, one .npy file each.
+ARRAY_FIELDS = ("latitude", "longitude", "indptr", "indices", "miles", "speed", "hours", "highway")
+
+
+class RoadGraph(object):
+    def __init__(self, names, highways, latitude, longitude, indptr, indices, miles, speed, hours, highway,
+                 index=None) -> None:
+        """Undirected road network in CSR form.
+
+        Every road segment is stored twice (once per direction), so the neighbours of city
+        ``u`` are ``indices[indptr[u]:indptr[u + 1]]`` with the matching entries of
+        ``miles``, ``speed``, ``hours`` and ``highway`` describing each segment.
+
+        Args:
+            names (list): city name for every city id.
+            highways (list): highway name for every highway id.
+            latitude (np.ndarray): latitude in degrees per city, NaN when the city has no GPS record.
+            longitude (np.ndarray): longitude in degrees per city, NaN when the city has no GPS record.
+            indptr (np.ndarray): CSR row pointer, length ``len(names) + 1``.
+            indices (np.ndarray): neighbouring city id per directed segment.
+            miles (np.ndarray): segment length in miles.
+            speed (np.ndarray): segment speed limit in miles per hour.
+            hours (np.ndarray): segment travel time, ``miles / speed``.
+            highway (np.ndarray): highway id per directed segment.
+            index (dict): city name -> id, built from ``names`` when not given.
+        """
+        self.names = names
+        self.highways = highways
+        self.index = index if index is not None else {name: i for i, name in enumerate(names)}
+        self.latitude = latitude
+        self.longitude = longitude
+        self.indptr = indptr
+        self.indices = indices
+        self.miles = miles
+        self.speed = speed
+        self.hours = hours
+        self.highway = highway
+        # Probability of having to return for a new package on each segment (0 below 50 mph).
+        self.probability = np.where(speed >= 50, np.tanh(miles / 1000), 0.0)
+        self._lists = None
+
+    @property
+    def num_cities(self):
+        return len(self.names)
+
+    @property
+    def num_segments(self):
+        """Number of undirected road segments."""
+        return len(self.indices) // 2
+
+    @property
+    def max_speed_limit(self):
+        return float(self.speed.max()) if len(self.speed) else DEFAULT_SPEED_LIMIT
+
+    @property
+    def max_length(self):
+        return float(self.miles.max()) if len(self.miles) else 0.0
+
+    def fingerprint(self):
+        """Cheap identity of the network, stored with derived structures to detect stale ones."""
+        return [self.num_cities, len(self.indices), float(np.sum(self.miles)), float(np.sum(self.hours))]
+
+    def city_id(self, name):
+        """Map a city name to its integer id.
+
+        Raises:
+            KeyError: when the city is not part of the road network.
+        """
+        try:
+            return self.index[name]
+        except KeyError:
+            raise KeyError("Unknown city: %s" % name) from None
+
+    def has_gps(self, city):
+        return not np.isnan(self.latitude[city])
+
+    def neighbors(self, city):
+        """(neighbour id, segment position) pairs for a city, in dataset order."""
+        start, end = self.indptr[city], self.indptr[city + 1]
+        return zip(self.indices[start:end].tolist(), range(start, end))
+
+    def lists(self):
+        """Plain Python lists of the CSR arrays for the pure-Python search loops.
+
+        Indexing a list is several times cheaper than indexing a NumPy array element by
+        element, so the search engines work on these.  They are built once per graph.
+
+        Returns:
+            tuple: (indptr, indices, miles, hours, speed, probability) as lists.
+        """
+        if self._lists is None:
+            self._lists = (self.indptr.tolist(), self.indices.tolist(), self.miles.tolist(),
+                           self.hours.tolist(), self.speed.tolist(), self.probability.tolist())
+        return self._lists
+
+    def components(self):
+        """Connected component label of every city (the smallest city id in it)."""
+        indptr, indices = self.lists()[:2]
+        label = [-1] * self.num_cities
+        for root in range(self.num_cities):
+            if label[root] >= 0:
+                continue
+            label[root] = root
+            stack = [root]
+            while stack:
+                city = stack.pop()
+                for i in range(indptr[city], indptr[city + 1]):
+                    if label[indices[i]] < 0:
+                        label[indices[i]] = root
+                        stack.append(indices[i])
+        return np.array(label, dtype=np.int64)
+
+    def segment_info(self, position):
+        """Free-form segment description used in the "route-taken" output."""
+        return "{0} for {1} miles".format(self.highways[self.highway[position]], float(self.miles[position]))
+
+    def find_segment(self, a, b):
+        """Position of the segment a -> b in the CSR arrays, or -1 when there is none."""
+        start, end = self.indptr[a], self.indptr[a + 1]
+        hits = np.flatnonzero(self.indices[start:end] == b)
+        return int(start + hits[0]) if len(hits) else -1
+
+    def with_segments(self, keep, speed):
+        """Copy of the graph with new speed limits and only the segments in ``keep``.
+
+        Args:
+            keep (np.ndarray): boolean mask over the segment positions of this graph.
+            speed (np.ndarray): speed limit for every segment position of this graph.
+
+        The city data (names, coordinates and the name index) is shared, not copied.
+        """
+        source = np.repeat(np.arange(self.num_cities), np.diff(self.indptr))
+        indptr = np.zeros(self.num_cities + 1, dtype=np.int64)
+        np.cumsum(np.bincount(source[keep], minlength=self.num_cities), out=indptr[1:])
+        miles = np.asarray(self.miles)[keep]
+        speed = np.asarray(speed, dtype=np.float64)[keep]
+        return RoadGraph(self.names, self.highways, self.latitude, self.longitude, indptr,
+                         np.asarray(self.indices)[keep], miles, speed, miles / speed,
+                         np.asarray(self.highway)[keep], index=self.index)
+
+    # Parsing the nodes and edges of the graph.
+
+    @classmethod
+    def from_text(cls, data_dir=DATA_DIR, report=None):
+        """Parse city-gps.txt and road-segments.txt into a RoadGraph.
+
+        City ids are assigned in file order: first every city in city-gps.txt, then the
+        cities that only appear in road-segments.txt.  Neighbours keep the order in which
+        their segments appear, and the first of several parallel segments wins.
+
+        Args:
+            data_dir (str): dataset directory.
+            report (ingest.ValidationReport): when given, receives the malformed rows.
+        """
+        names, highways, latitude, longitude, edges = read_dataset(data_dir, report)
+        return cls.from_edges(names, highways, latitude, longitude, edges["src"], edges["dst"],
+                              edges["miles"], edges["speed"], edges["highway"])
+
+    @classmethod
+    def from_edges(cls, names, highways, latitude, longitude, src, dst, miles, speed, highway):
+        """Build the CSR arrays from a directed edge list, keeping edge order per source."""
+        src = np.asarray(src, dtype=np.int64)
+        order = np.argsort(src, kind="stable")
+        counts = np.bincount(src, minlength=len(names))
+        indptr = np.zeros(len(names) + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+        miles = np.asarray(miles, dtype=np.float64)[order]
+        speed = np.asarray(speed, dtype=np.float64)[order]
+        return cls(names, highways, latitude, longitude, indptr,
+                   np.asarray(dst, dtype=np.int32)[order], miles, speed, miles / speed,
+                   np.asarray(highway, dtype=np.int32)[order])
+
+    # Compiled binary form.
+
+    def save(self, path):
+        """Write the compiled graph to ``path`` (a directory of .npy files plus meta.json)."""
+        os.makedirs(path, exist_ok=True)
+        for field in ARRAY_FIELDS:
+            np.save(os.path.join(path, field + ".npy"), np.ascontiguousarray(getattr(self, field)))
+        # meta.json goes last: its presence marks a complete compiled graph.
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump({"version": FORMAT_VERSION, "names": self.names, "highways": self.highways}, f)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Load a graph written by ``save``.
+
+        Args:
+            path (str): compiled graph directory.
+            mmap (bool): memory-map the arrays read-only instead of reading them into memory.
+
+        Raises:
+            ValueError: when the directory holds a different format version.
+        """
+        with open(os.path.join(path, "meta.json"), "r") as f:
+            meta = json.load(f)
+        if meta.get("version") != FORMAT_VERSION:
+            raise ValueError("Unsupported compiled graph version: %s" % meta.get("version"))
+        mode = "r" if mmap else None
+        arrays = {field: np.load(os.path.join(path, field + ".npy"), mmap_mode=mode) for field in ARRAY_FIELDS}
+        return cls(meta["names"], meta["highways"], **arrays)
+
+
+def is_fresh(compiled_path, data_dir=DATA_DIR):
+    """Whether a compiled graph exists and is newer than both text files."""
+    meta = os.path.join(compiled_path, "meta.json")
+    if not os.path.exists(meta):
+        return False
+    built = os.path.getmtime(meta)
+    return all(os.path.getmtime(os.path.join(data_dir, name)) <= built
+               for name in (CITY_GPS_FILE, ROAD_SEGMENTS_FILE))
+
+
+def compile_graph(data_dir=DATA_DIR, path=None, report=None):
+    """Parse the text dataset and save its compiled form next to it."""
+    graph = RoadGraph.from_text(data_dir, report)
+    graph.save(path or os.path.join(data_dir, COMPILED_DIR))
+    return graph
+
+
+@functools.lru_cache(maxsize=None)
+def get_graph(data_dir=DATA_DIR):
+    """The process-wide road graph, loaded once and reused by every query.
+
+    A fresh compiled copy in ``data_dir`` is memory-mapped; otherwise the text files are
+    parsed.
+    """
+    compiled = os.path.join(data_dir, COMPILED_DIR)
+    if is_fresh(compiled, data_dir):
+        return RoadGraph.load(compiled)
+    return RoadGraph.from_text(data_dir)
+
+
+if __name__ == "__main__":
+    # python3 road_graph.py [data_dir]  -> writes <data_dir>/road-graph.compiled
+    directory = sys.argv[1] if len(sys.argv) > 1 else DATA_DIR
+    validation = ValidationReport()
+    compiled = compile_graph(directory, report=validation)
+    print("\n".join(validation.summary()))
+    print("Compiled %d cities and %d segments into %s" % (
+        compiled.num_cities, compiled.num_segments, os.path.join(directory, COMPILED_DIR)))
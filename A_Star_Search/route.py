@@ -8,10 +8,24 @@
 
 
 # !/usr/bin/env python3
-from queue import PriorityQueue
+import functools
 import sys
 import math
 
+from road_graph import get_graph
+from search import astar, bidirectional, breadth_first, check_cost, dijkstra, empty_route, path_edges, route_summary
+from landmarks import get_landmarks
+from geo import EARTH_RADIUS_MILES, GeoTable
+from spatial import SpatialIndex
+from delivery import delivery_search
+from contraction import get_hierarchy
+from path_tree import shortest_path_tree  # single-source trees, re-exported for callers
+from batch import cost_matrix, get_routes  # many-to-many queries, re-exported for callers
+from alternatives import k_shortest_routes, via_routes  # alternative routes, re-exported for callers
+from tours import plan_tour  # multi-stop tours, re-exported for callers
+from instrumentation import Probe, current_probe, no_phase  # Probe re-exported for callers
+from route_cache import get_route_cache
+
 # References:
 '''
 https://www.engati.com/glossary/admissible-heuristic
@@ -21,126 +35,214 @@ https://www.igismap.com/haversine-formula-calculate-geographic-distance-earth/
 '''
 
 # Parsing the nodes and edges of the graph.
+# The text files are parsed (or the compiled copy memory-mapped) once per process by
+# road_graph.get_graph(); the dictionaries below are views built from it on first use.
 
 
+@functools.lru_cache(maxsize=None)
 def load_graph():
-    f = open("city-gps.txt", "r")
+    graph = get_graph()
     nodes = {}
-    for line in f.read().rstrip("\n").split("\n"):
-        city = line.split(" ")[0]
-        latitude = line.split(" ")[1]
-        longtitude = line.split(" ")[2]
-        nodes[city] = (latitude, longtitude)
-
-    f.close()
-    g = open('road-segments.txt', "r")
+    for city, name in enumerate(graph.names):
+        if graph.has_gps(city):
+            nodes[name] = (float(graph.latitude[city]), float(graph.longitude[city]))
     edges = {}
-    max_speed_limit = 0
-    max_length = 0
-    for edge in g.read().rstrip("\n").split("\n"):
-        start_city = edge.split(" ")[0]
-        end_city = edge.split(" ")[1]
-        length = float(edge.split(" ")[2])
-        speed_limit = None
-        highway = None
-        if(len(edge.split(" ")) == 5 and float(edge.split(" ")[3]) > 0):
-            speed_limit = float(edge.split(" ")[3])
-            highway = edge.split(" ")[4]
-        else:
-            speed_limit = 40
-            highway = edge.split(" ")[3]
-        max_length = max(max_length, length)
-        max_speed_limit = max(max_speed_limit, speed_limit)
-        if(edges.get(start_city, False) == False):
-            edges[start_city] = {}
-        if(edges[start_city].get(end_city, False) == False):
-            edges[start_city][end_city] = [length, speed_limit, highway]
-        if(edges.get(end_city, False) == False):
-            edges[end_city] = {}
-        if(edges[end_city].get(start_city, False) == False):
-            edges[end_city][start_city] = [length, speed_limit, highway]
-    g.close()
-    return nodes, edges, max_length, max_speed_limit
-
-# Get minimum among the latitude and longtitude of the neighbouring nodes and setting it as the coordinates
-# of the current city.
-
-
-def get_min_lat_long(start_city_name, target_city_name, nodes, edges):
-    min_hs = float('inf')
-    (min_latitude, min_longtitude) = (float("inf"), float("inf"))
-    target_lat, target_long = nodes[target_city_name]
-    for neighbors in edges[start_city_name]:
-        if(neighbors in nodes):
-            neighbor_lat, neighbor_long = nodes[neighbors]
-            diff_lat = (float(neighbor_lat)-float(target_lat)) * math.pi / 180
-            diff_long = (float(neighbor_long) -
-                         float(target_long)) * math.pi / 180
-            dist = (math.sin(diff_lat / 2) ** 2
-                    + math.cos(float(target_lat) * math.pi / 180.0)
-                    * math.cos(float(neighbor_lat) * math.pi / 180.0)
-                    * math.sin(diff_long / 2) ** 2)
-            haversine_distance = float(
-                3961*2*math.atan2(math.sqrt(dist), math.sqrt(1-dist)))
-            min_hs = min(min_hs, haversine_distance)
-            if(min_hs == haversine_distance):
-                min_latitude, min_longtitude = neighbor_lat, neighbor_long
-    if(min_latitude == float("inf")):
-        min_latitude = 0
-    if(min_longtitude == float("inf")):
-        min_longtitude = 0
-    return (min_latitude, min_longtitude)
-
-# Calculate the haverstine distance,time between current city and target city as the heuristic
-
-
-def heuristic_function(next_city, end_city, cost, nodes, edges, max_speed_limit):
-    hs = 0
-    if cost == 'distance' or cost == 'time' or cost == 'delivery':
-        if end_city not in nodes:
-            end_city_lat, end_city_long = get_min_lat_long(
-                end_city, next_city, nodes, edges)
-            if(end_city_lat == 0 and end_city_long == 0):
-                return 0
-        else:
-            end_city_lat, end_city_long = nodes[end_city]
-        if next_city not in nodes:
-            next_city_lat, next_city_long = get_min_lat_long(
-                next_city, end_city, nodes, edges)
-            if(next_city_lat == 0 and next_city_long == 0):
-                return 0
-        else:
-            next_city_lat, next_city_long = nodes[next_city]
-        diff_lat = (float(next_city_lat)-float(end_city_lat)) * math.pi / 180
-        diff_long = (float(next_city_long) -
-                     float(end_city_long)) * math.pi / 180
-        dist = (math.sin(diff_lat / 2) ** 2
-                + math.cos(float(end_city_lat) * math.pi / 180.0)
-                * math.cos(float(next_city_lat) * math.pi / 180.0)
-                * math.sin(diff_long / 2) ** 2)
-        # Haversine distance formula.
-        haversine_distance = float(
-            3961*2*math.atan2(math.sqrt(dist), math.sqrt(1-dist)))
-        hs = haversine_distance
-        if(cost == 'distance'):
-            return hs
-        if(cost == 'time' or cost == 'delivery'):
-            time = float(hs/max_speed_limit)
-            return time
-    return hs
-# Update the shortest path to be traversed.
-
-
-def get_path(curr_path, neighbors, highway, length):
-    path = curr_path.copy()
-    path.append(("{0}".format(neighbors),
-                "{0} for {1} miles".format(highway, length)))
-    return path
-# neighboring nodes for the current city to be traversed for the successor function.
-
-
-def successors(city, edges):
-    return edges[city].items()
+    indptr, indices, miles, _, speed, _ = graph.lists()
+    for city, name in enumerate(graph.names):
+        edges[name] = {graph.names[indices[i]]: [miles[i], speed[i], graph.highways[graph.highway[i]]]
+                       for i in range(indptr[city], indptr[city + 1])}
+    return nodes, edges, graph.max_length, graph.max_speed_limit
+
+# Calculate the haversine distance between two points given in degrees.
+
+
+def haversine(lat1, long1, lat2, long2):
+    diff_lat = (lat1 - lat2) * math.pi / 180
+    diff_long = (long1 - long2) * math.pi / 180
+    dist = (math.sin(diff_lat / 2) ** 2
+            + math.cos(lat2 * math.pi / 180.0)
+            * math.cos(lat1 * math.pi / 180.0)
+            * math.sin(diff_long / 2) ** 2)
+    # Haversine distance formula.
+    return float(EARTH_RADIUS_MILES*2*math.atan2(math.sqrt(dist), math.sqrt(1-dist)))
+
+
+@functools.lru_cache(maxsize=8)
+def _geo(graph):
+    return GeoTable(graph)
+
+
+@functools.lru_cache(maxsize=8)
+def _spatial(graph):
+    return SpatialIndex.from_graph(graph)
+
+
+@functools.lru_cache(maxsize=8)
+def _landmarks(graph):
+    return get_landmarks(graph)
+
+
+@functools.lru_cache(maxsize=8)
+def _hierarchy(graph, cost):
+    return get_hierarchy(cost, graph)
+
+
+class SharedPrecomputed(object):
+    """Precomputed structures of a graph, kept once per process (and on disk where they are saved).
+
+    find_route() asks its ``derived`` argument for them; live.Snapshot provides the same
+    methods for graphs with live updates.
+    """
+
+    def landmarks(self, graph):
+        return _landmarks(graph)
+
+    def hierarchy(self, graph, cost):
+        return _hierarchy(graph, cost)
+
+    def geo(self, graph):
+        return _geo(graph)
+
+    def spatial(self, graph):
+        return _spatial(graph)
+
+
+SHARED = SharedPrecomputed()
+
+
+def snap_to_city(latitude, longitude, max_miles=math.inf, graph=None, derived=SHARED):
+    """Nearest city with a GPS record to each position, e.g. raw truck coordinates.
+
+    Args:
+        latitude (float or np.ndarray): latitude(s) in degrees.
+        longitude (float or np.ndarray): longitude(s) in degrees.
+        max_miles (float): positions farther than this from every city snap to None.
+        graph (RoadGraph): road network, the shared one by default.
+
+    Returns:
+        str or list: the city name (None when nothing is close enough), one per
+        position for arrays.
+    """
+    graph = graph or get_graph()
+    cities, _ = derived.spatial(graph).snap(latitude, longitude, max_miles)
+    if isinstance(cities, int):
+        return graph.names[cities] if cities >= 0 else None
+    return [graph.names[city] if city >= 0 else None for city in cities.tolist()]
+
+
+# Engines whose routes are always optimal ("astar" caps its great-circle bound by the
+# landmark bound, so it is admissible).
+EXACT_ENGINES = ("astar", "dijkstra", "alt", "bidirectional", "bidijkstra", "ch")
+
+
+def is_exact(engine, max_fringe=None):
+    """Whether find_route() always returns an optimal route; memory-bounded A* may not."""
+    return engine in EXACT_ENGINES and max_fringe is None
+
+
+def find_route(start, end, cost, engine="astar", graph=None, stats=None, max_fringe=None, cache=None,
+               probe=None, derived=SHARED):
+    """Find the route between two cities with a chosen search engine.
+
+    Args:
+        start (str): start city.
+        end (str): end city.
+        cost (str): "segments", "distance", "time" or "delivery".
+        engine (str): "astar" (haversine A*; breadth-first search for segments and
+            label-setting search with landmark bounds for delivery),
+            "dijkstra", "alt" (A* with landmarks), "bidirectional" (bidirectional A*
+            with landmark potentials), "bidijkstra" (bidirectional Dijkstra) or "ch"
+            (contraction hierarchy, distance and time only).  The bidirectional engines
+            do not support delivery.
+        graph (RoadGraph): road network, the shared one from get_graph() by default.
+        stats (dict): when given, receives the search counters of the engine.
+        max_fringe (int): memory-bounded A*; the fringe is pruned back to half of this
+            size whenever it grows past it, and the limit doubles if the target is lost.
+        cache (RouteCache): answer from / store into this cache.  The cache is keyed by
+            (start, end, cost) only, so use one cache per engine; reverse and subpath
+            reuse only applies to routes of exact engines (see is_exact).
+        probe (instrumentation.Probe): when given, receives phase timings, search
+            counters, heuristic lookups and expansion events of the query.
+        derived (SharedPrecomputed): source of the landmarks, hierarchies and geo table
+            for ``graph``.
+
+    Returns:
+        dict: same format as get_route().
+    """
+    check_cost(cost)
+    phase = no_phase if probe is None else probe.phase
+    with phase("load_graph"):
+        graph = graph or get_graph()
+    if cache is not None:
+        with phase("cache_lookup"):
+            result = cache.get(graph, start, end, cost)
+        if result is None:
+            result = find_route(start, end, cost, engine, graph, stats, max_fringe, probe=probe, derived=derived)
+            cache.put(start, end, cost, result, is_exact(engine, max_fringe))
+        elif probe is not None:
+            probe.count("cache_hits")
+        return result
+    source, target = graph.city_id(start), graph.city_id(end)
+    on_expand = None
+    if probe is not None:
+        stats = {} if stats is None else stats
+        on_expand = probe.expansion_callback()
+    with phase("query", start=start, end=end, cost=cost, engine=engine):
+        result = _search(graph, source, target, cost, engine, stats, max_fringe, probe, on_expand, derived)
+    if probe is not None:
+        probe.end_query(stats, start=start, end=end, cost=cost, engine=engine)
+    return result
+
+
+def _search(graph, source, target, cost, engine, stats, max_fringe, probe, on_expand, derived):
+    phase = no_phase if probe is None else probe.phase
+    if engine == "ch":
+        with phase("preprocess"):
+            hierarchy = derived.hierarchy(graph, cost)
+        with phase("search"):
+            return hierarchy.route(graph, source, target, stats)
+    if engine in ("bidirectional", "bidijkstra"):
+        potential = None
+        if engine == "bidirectional":
+            with phase("heuristic"):
+                potential = derived.landmarks(graph).potential(source, target, cost)
+        with phase("search"):
+            edges = bidirectional(graph, source, target, cost, potential, stats, on_expand)
+        with phase("route_summary"):
+            return empty_route() if edges is None else route_summary(graph, edges)
+    if engine == "dijkstra":
+        with phase("search"):
+            search_result = dijkstra(graph, source, cost, [target], stats, on_expand)
+    elif engine not in ("astar", "alt"):
+        raise ValueError("Error: invalid search engine %r" % (engine,))
+    elif engine == "astar" and cost == "segments":
+        with phase("search"):
+            search_result = breadth_first(graph, source, target, stats, on_expand)
+    else:
+        with phase("heuristic"):
+            if engine == "alt" or cost == "delivery":
+                heuristic = derived.landmarks(graph).heuristic(target, cost)
+            else:
+                heuristic = derived.geo(graph).heuristic(target, cost, derived.landmarks(graph))
+        if probe is not None:
+            heuristic = probe.wrap_heuristic(heuristic)
+        if engine == "astar" and cost == "delivery":
+            with phase("search"):
+                edges = delivery_search(graph, source, target, heuristic, stats, on_expand)
+            with phase("route_summary"):
+                return empty_route() if edges is None else route_summary(graph, edges)
+        if engine == "alt":
+            max_fringe = None
+        while True:
+            search_stats = {} if stats is None else stats
+            with phase("search"):
+                search_result = astar(graph, source, target, cost, heuristic, search_stats, max_fringe, on_expand)
+            if max_fringe is None or search_result[0][target] < math.inf or search_stats["pruned_bound"] == math.inf:
+                break
+            max_fringe *= 2
+    with phase("route_summary"):
+        edges = path_edges(search_result[1], search_result[2], source, target)
+        return empty_route() if edges is None else route_summary(graph, edges)
 
 # Main Function to calculate the total cost and processing the shortest route to be traversed based on the
 # cost function given.
@@ -167,97 +269,8 @@ def get_route(start, end, cost):
     """
     if(start == end):
         print("Please Input Different Cities.")
-    nodes, edges, max_speed_limit, _ = load_graph()
-    fringe = PriorityQueue() if(cost != 'segments') else []
-    visited = set()
-    if(cost != 'segments'):
-        fringe.put((0, (start, [], 0, 0, 0)))
-        while(fringe.empty() == False):
-            (_, output) = fringe.get()
-            # current city for which successor states should be traversed.
-            curr_city = output[0]
-            path = output[1]  # Calculate the path traversed.
-            curr_dist = output[2]  # Total Distance travelled so far.
-            curr_hrs = output[3]  # Total Time for the journey so far.
-            # Total delivery time for the journey so far.
-            curr_delivery_hrs = output[4]
-            if(curr_city != end):
-                for neighbors, edge_attr in successors(curr_city, edges):
-                    if(neighbors not in visited):
-                        time = int(edge_attr[0])/int(edge_attr[1])
-                        t_road = float(int(edge_attr[0])/int(edge_attr[1]))
-                        if(edge_attr[1] >= 50):
-                            probability = float(
-                                math.tanh(int(edge_attr[0])/1000))
-                            delivery_hours = float(
-                                t_road + 2*probability*(t_road+curr_delivery_hrs))
-                        else:
-                            delivery_hours = t_road
-                        heuristic_func = heuristic_function(
-                            neighbors, end, cost, nodes, edges, max_speed_limit)
-                        if(cost == 'distance'):  # distance as cost function
-                            fringe.put((float(curr_dist+int(edge_attr[0]))+heuristic_func, (neighbors, get_path(path, neighbors, edge_attr[2], edge_attr[0]), float(curr_dist+int(edge_attr[0])),
-                                                                                            curr_hrs+time, curr_delivery_hrs+delivery_hours)))
-                        elif(cost == 'time'):  # time as cost function
-                            fringe.put((curr_hrs+time+heuristic_func, (neighbors, get_path(path, neighbors, edge_attr[2], edge_attr[0]), float(curr_dist+int(edge_attr[0])),
-                                                                       curr_hrs+time, curr_delivery_hrs+delivery_hours)))
-                        else:  # delivery time as cost function
-                            fringe.put((curr_delivery_hrs+delivery_hours+heuristic_func, (neighbors, get_path(path, neighbors, edge_attr[2], edge_attr[0]), float(curr_dist+int(edge_attr[0])),
-                                                                                          curr_hrs+time, curr_delivery_hrs+delivery_hours)))
-                        visited.add(neighbors)
-            else:
-                return {
-                    "total-segments": len(path),
-                    "total-miles": curr_dist,
-                    "total-hours": curr_hrs,
-                    "total-delivery-hours": curr_delivery_hrs,
-                    "route-taken": path
-                }
-    else:
-        fringe.append((start, [], 0, 0, 0))
-        while(fringe):
-            output = fringe.pop(0)
-            # current city for which successor states should be traversed.
-            curr_city = output[0]
-            path = output[1]  # Calculate the path traversed.
-            curr_dist = output[2]  # Total Distance travelled so far.
-            curr_hrs = output[3]  # Total Time for the journey so far.
-            # Total delivery time for the journey so far.
-            curr_delivery_hrs = output[4]
-            if(curr_city != end):
-                for neighbors, edge_attr in successors(curr_city, edges):
-                    if(neighbors not in visited):
-                        if int(edge_attr[1]) >= 50:
-                            p = float(math.tanh(int(edge_attr[0]) / 1000))
-                            t_road = float(
-                                int(edge_attr[0]) / int(edge_attr[1]))
-                            delivery_hours = float(
-                                t_road + p * 2 * (t_road + curr_hrs))
-                        else:
-                            delivery_hours = float(
-                                int(edge_attr[0]) / int(edge_attr[1]))
-
-                        fringe.append(
-                            (neighbors, get_path(path, neighbors, edge_attr[2], edge_attr[0]), float(curr_dist + int(edge_attr[0])),
-                             curr_hrs + int(edge_attr[0]) / int(edge_attr[1]),
-                             curr_delivery_hrs + delivery_hours))
-                        visited.add(neighbors)
-            else:
-                return {
-                    "total-segments": len(path),
-                    "total-miles": curr_dist,
-                    "total-hours": curr_hrs,
-                    "total-delivery-hours": curr_delivery_hrs,
-                    "route-taken": path
-                }
-
-    return {
-        "total-segments": 0,
-        "total-miles": 0,
-        "total-hours": 0,
-        "total-delivery-hours": 0,
-        "route-taken": []
-    }
+    # Hub-heavy traffic can set ROUTE_CACHE=1 to be answered from the process-wide route cache.
+    return find_route(start, end, cost, cache=get_route_cache(), probe=current_probe())
 
 
 # Please don't modify anything below this line
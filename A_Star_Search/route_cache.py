@@ -0,0 +1,202 @@
+#!/usr/local/bin/python3
+# route_cache.py : LRU cache of route results with reverse-direction and subpath reuse
+#
+# Roads are bidirectional, so for the additive costs (segments, distance, time) the reverse
+# of an optimal cached route answers the reverse query, and any piece of it between two of
+# its cities answers that pair as well.  Only routes from exact engines are known to be
+# optimal, so routes from the others (memory-bounded A*) are reused for the same query only.
+#
+# route.get_route() answers from default_cache() only when the ROUTE_CACHE environment variable
+# is set to something other than 0, so by default it stays stateless.
+# The delivery cost depends on the direction of travel, so delivery routes are only reused
+# for the exact same query.
+#
+
+from collections import OrderedDict
+import functools
+import json
+import os
+import threading
+
+from search import route_summary
+
+# Costs whose optimal routes can be reversed and cut into optimal subroutes.
+SYMMETRIC_COSTS = ("segments", "distance", "time")
+
+DEFAULT_MAX_ENTRIES = 4096
+
+# Environment variable that opts route.get_route() into default_cache().
+CACHE_SWITCH = "ROUTE_CACHE"
+
+
+def _copy(result):
+    copy = dict(result)
+    copy["route-taken"] = list(result["route-taken"])
+    return copy
+
+
+class RouteCache(object):
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, reuse_subpaths=True) -> None:
+        """Bounded route cache keyed by (start, end, cost).
+
+        Args:
+            max_entries (int): cached routes kept before the least recently used is evicted.
+            reuse_subpaths (bool): answer symmetric-cost queries from pieces of cached routes.
+        """
+        self.max_entries = max_entries
+        self.reuse_subpaths = reuse_subpaths
+        self.entries = OrderedDict()  # (start, end, cost) -> (cities, result, exact)
+        self.through = {}  # (city, cost) -> keys of the exact cached routes passing through it
+        self.hits = 0
+        self.misses = 0
+        self.reverse_hits = 0
+        self.subpath_hits = 0
+        self.evictions = 0
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def counters(self):
+        return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses,
+                "reverse_hits": self.reverse_hits, "subpath_hits": self.subpath_hits,
+                "evictions": self.evictions}
+
+    def get(self, graph, start, end, cost):
+        """Cached result for the query, or None.
+
+        Hits on the reverse query or on a longer cached route are rebuilt from ``graph``
+        and stored as entries of their own.
+        """
+        key = (start, end, cost)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return _copy(entry[1])
+            if cost in SYMMETRIC_COSTS:
+                cities = self._reverse(start, end, cost)
+                if cities is not None:
+                    self.reverse_hits += 1
+                elif self.reuse_subpaths:
+                    cities = self._subpath(start, end, cost)
+                    if cities is not None:
+                        self.subpath_hits += 1
+                if cities is not None:
+                    self.hits += 1
+                    result = self._summary(graph, cities)
+                    self._store(key, cities, result, True)
+                    return _copy(result)
+            self.misses += 1
+            return None
+
+    def put(self, start, end, cost, result, exact=False):
+        """Cache a result; routes that could not be found are not cached.
+
+        Args:
+            exact (bool): the route is optimal (found by an exact engine), so its reverse
+                and its pieces may answer other queries.
+        """
+        if start != end and not result["route-taken"]:
+            return
+        cities = [start] + [step[0] for step in result["route-taken"]]
+        with self.lock:
+            self._store((start, end, cost), cities, _copy(result), exact)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.through.clear()
+
+    def filtered(self, keep):
+        """New cache holding the entries for which ``keep(key, cities)`` is true, in LRU order."""
+        copy = RouteCache(self.max_entries, self.reuse_subpaths)
+        with self.lock:
+            for key, (cities, result, exact) in self.entries.items():
+                if keep(key, cities):
+                    copy._store(key, cities, result, exact)
+        return copy
+
+    def _reverse(self, start, end, cost):
+        entry = self.entries.get((end, start, cost))
+        if entry is None or not entry[2]:
+            return None
+        self.entries.move_to_end((end, start, cost))
+        return entry[0][::-1]
+
+    def _subpath(self, start, end, cost):
+        keys = self.through.get((start, cost))
+        others = self.through.get((end, cost))
+        if not keys or not others:
+            return None
+        for key in keys & others:
+            cities = self.entries[key][0]
+            self.entries.move_to_end(key)
+            i, j = cities.index(start), cities.index(end)
+            return cities[i:j + 1] if i <= j else cities[j:i + 1][::-1]
+        return None
+
+    @staticmethod
+    def _summary(graph, cities):
+        ids = [graph.city_id(city) for city in cities]
+        edges = [graph.find_segment(a, b) for a, b in zip(ids[:-1], ids[1:])]
+        if -1 in edges:
+            raise KeyError("No road segment along the cached route")
+        return route_summary(graph, edges)
+
+    def _store(self, key, cities, result, exact):
+        if key in self.entries:
+            self._forget(key)
+        self.entries[key] = (cities, result, exact)
+        if exact and key[2] in SYMMETRIC_COSTS:
+            for city in cities:
+                self.through.setdefault((city, key[2]), set()).add(key)
+        while len(self.entries) > self.max_entries:
+            self._forget(next(iter(self.entries)))
+            self.evictions += 1
+
+    def _forget(self, key):
+        cities, _, exact = self.entries.pop(key)
+        if exact and key[2] in SYMMETRIC_COSTS:
+            for city in cities:
+                keys = self.through.get((city, key[2]))
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self.through[(city, key[2])]
+
+    # Persistence between runs: only the city sequences are stored, and the results are
+    # rebuilt from the road graph when loading.
+
+    def save(self, path):
+        with self.lock:
+            routes = [{"start": start, "end": end, "cost": cost, "cities": cities, "exact": exact}
+                      for (start, end, cost), (cities, _, exact) in self.entries.items()]
+        with open(path, "w") as f:
+            json.dump({"version": 1, "routes": routes}, f)
+
+    def load(self, graph, path):
+        """Add the routes saved at ``path``; routes the graph no longer has are skipped."""
+        with open(path, "r") as f:
+            routes = json.load(f)["routes"]
+        with self.lock:
+            for route in routes:
+                try:
+                    result = self._summary(graph, route["cities"])
+                except KeyError:
+                    continue
+                # Files written before exactness was recorded may hold inexact routes.
+                self._store((route["start"], route["end"], route["cost"]), route["cities"], result,
+                            route.get("exact", False))
+
+
+@functools.lru_cache(maxsize=None)
+def default_cache():
+    """A process-wide cache for long-running services (the route server) to opt into."""
+    return RouteCache()
+
+
+def get_route_cache():
+    """default_cache() when the ROUTE_CACHE switch is on, else None."""
+    return default_cache() if os.environ.get(CACHE_SWITCH, "0") not in ("", "0") else None
@@ -0,0 +1,150 @@
+#!/usr/local/bin/python3
+# route_client.py : Client for server.py and a load test against spawning route.py
+#
+# python3 route_client.py [--unix /tmp/route.sock | --address 127.0.0.1:8551]
+#                         [--queries N] [--concurrency C] [--cli-queries M] [--seed S]
+#
+# Sends N random distance/time queries from C threads (one keep-alive connection each)
+# and reports throughput and latency percentiles, then times M queries that each spawn
+# "python3 route.py start end cost" the way the CLI is used today.
+#
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from urllib.parse import urlencode
+
+from benchmark import random_workload
+from instrumentation import percentile
+from road_graph import DATA_DIR
+
+# References:
+'''
+https://docs.python.org/3/library/http.client.html
+'''
+
+
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=None) -> None:
+        super().__init__("localhost", timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+class RouteError(Exception):
+    def __init__(self, status, message) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class RouteClient(object):
+    def __init__(self, address=None, unix=None, timeout=60) -> None:
+        """Keep-alive connection to a route server.
+
+        Args:
+            address (str): "host:port" of a TCP server.
+            unix (str): path of a Unix socket server (used instead of ``address``).
+            timeout (float): socket timeout in seconds.
+        """
+        if unix is not None:
+            self.connection = _UnixConnection(unix, timeout)
+        else:
+            host, _, port = (address or "127.0.0.1:8551").rpartition(":")
+            self.connection = http.client.HTTPConnection(host, int(port), timeout=timeout)
+
+    def _request(self, method, path, body=None):
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        self.connection.request(method, path, body=body, headers=headers)
+        response = self.connection.getresponse()
+        payload = json.loads(response.read() or b"null")
+        if response.status != 200:
+            raise RouteError(response.status, payload.get("error", response.reason))
+        return payload
+
+    def get_route(self, start, end, cost, engine=None):
+        """The server's get_route() dictionary; route-taken steps come back as tuples."""
+        query = {"start": start, "end": end, "cost": cost}
+        if engine is not None:
+            query["engine"] = engine
+        result = self._request("GET", "/route?" + urlencode(query))
+        result["route-taken"] = [tuple(step) for step in result["route-taken"]]
+        return result
+
+    def health(self):
+        return self._request("GET", "/health")
+
+    def metrics(self):
+        return self._request("GET", "/metrics")
+
+    def close(self):
+        self.connection.close()
+
+
+def load_test(queries, concurrency, address=None, unix=None):
+    """Run the queries from ``concurrency`` threads; each thread keeps one connection open.
+
+    Returns:
+        dict: "queries", "seconds", "throughput_qps" and latency percentiles in ms.
+    """
+    chunks = [queries[i::concurrency] for i in range(concurrency)]
+
+    def run(chunk):
+        client = RouteClient(address, unix)
+        latencies = []
+        try:
+            for start, end, cost in chunk:
+                tick = time.perf_counter()
+                client.get_route(start, end, cost)
+                latencies.append(time.perf_counter() - tick)
+        finally:
+            client.close()
+        return latencies
+
+    begin = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = sorted(value for chunk in pool.map(run, chunks) for value in chunk)
+    elapsed = time.perf_counter() - begin
+    return {"queries": len(latencies), "seconds": elapsed, "throughput_qps": len(latencies) / elapsed,
+            "p50_ms": 1000 * percentile(latencies, 50), "p99_ms": 1000 * percentile(latencies, 99)}
+
+
+def cli_baseline(queries):
+    """Time the queries run one by one as "python3 route.py start end cost" processes."""
+    latencies = []
+    for start, end, cost in queries:
+        tick = time.perf_counter()
+        subprocess.run([sys.executable, os.path.join(DATA_DIR, "route.py"), start, end, cost],
+                       cwd=DATA_DIR, check=True, stdout=subprocess.DEVNULL)
+        latencies.append(time.perf_counter() - tick)
+    latencies.sort()
+    elapsed = sum(latencies)
+    return {"queries": len(latencies), "seconds": elapsed, "throughput_qps": len(latencies) / elapsed,
+            "p50_ms": 1000 * percentile(latencies, 50), "p99_ms": 1000 * percentile(latencies, 99)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test a route server.")
+    parser.add_argument("--address", default="127.0.0.1:8551")
+    parser.add_argument("--unix", help="Unix socket of the server")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--cli-queries", type=int, default=20, help="queries to time through route.py")
+    parser.add_argument("--seed", type=int, default=551)
+    args = parser.parse_args()
+
+    workload = random_workload(args.queries // 2, args.seed, ("distance", "time"))
+    report = {"server": load_test(workload, args.concurrency, args.address, args.unix)}
+    if args.cli_queries:
+        report["cli"] = cli_baseline(workload[:args.cli_queries])
+        report["speedup"] = report["server"]["throughput_qps"] / report["cli"]["throughput_qps"]
+    print(json.dumps(report, indent=2))
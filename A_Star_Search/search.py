@@ -0,0 +1,371 @@
+#!/usr/local/bin/python3
+# search.py : Shortest-path search engines over the compiled RoadGraph
+#
+# All engines work on integer city ids and keep parent pointers instead of copying the
+# route on every push; the "route-taken" list is only built once a target is reached.
+#
+
+from collections import deque
+import heapq
+import math
+
+# References:
+'''
+https://www.geeksforgeeks.org/dijkstras-shortest-path-algorithm-greedy-algo-7/
+https://docs.python.org/3/library/heapq.html
+'''
+
+COSTS = ("segments", "distance", "time", "delivery")
+
+# Summary keys reported in the result dictionary for each cost function.
+COST_KEYS = {
+    "segments": "total-segments",
+    "distance": "total-miles",
+    "time": "total-hours",
+    "delivery": "total-delivery-hours",
+}
+
+
+def check_cost(cost):
+    if cost not in COSTS:
+        raise ValueError("Error: invalid cost function %r" % (cost,))
+
+
+def delivery_step(delivery_hrs, hours, probability):
+    """Delivery hours after driving one segment.
+
+    A driver on a segment of ``hours`` travel time with a ``probability`` of a fall-off may
+    have to return to the start and drive the whole trip so far plus the segment again:
+    ``t_road + 2 * p * (t_road + t_trip)``.
+    """
+    return delivery_hrs + hours + 2 * probability * (hours + delivery_hrs)
+
+
+def dijkstra(graph, source, cost, targets=None, stats=None, on_expand=None):
+    """Single-source shortest paths, stopping once every target is settled.
+
+    ``delivery`` is path dependent, but the delivery time after a segment is increasing in
+    the delivery time before it, so the cheapest label per city is still the only one that
+    matters and label-setting Dijkstra is exact for it as well.
+
+    Args:
+        graph (RoadGraph): road network.
+        source (int): start city id.
+        cost (str): one of COSTS.
+        targets (iterable): city ids to settle; None explores the whole component.
+        stats (dict): when given, receives the "expanded", "pushed" and "peak_fringe" counts.
+        on_expand (callable): called as ``on_expand(city, cost_so_far)`` for every
+            expanded city (see instrumentation.Probe).
+
+    Returns:
+        tuple: (dist, parent, parent_edge) lists indexed by city id; ``dist`` is inf for
+        cities that were not reached and ``parent_edge`` holds the CSR position of the
+        segment used to enter each city (-1 for the source and unreached cities).
+    """
+    check_cost(cost)
+    indptr, indices, miles, hours, _, probability = graph.lists()
+    weight = {"distance": miles, "time": hours}.get(cost)
+    n = graph.num_cities
+    dist = [math.inf] * n
+    parent = [-1] * n
+    parent_edge = [-1] * n
+    settled = [False] * n
+    remaining = None if targets is None else set(targets)
+    dist[source] = 0
+    fringe = [(0, source)]
+    expanded = pushed = peak = 0
+    while fringe:
+        peak = max(peak, len(fringe))
+        d, city = heapq.heappop(fringe)
+        if settled[city]:
+            continue
+        settled[city] = True
+        expanded += 1
+        if on_expand is not None:
+            on_expand(city, d)
+        if remaining is not None:
+            remaining.discard(city)
+            if not remaining:
+                break
+        for i in range(indptr[city], indptr[city + 1]):
+            neighbor = indices[i]
+            if settled[neighbor]:
+                continue
+            if weight is not None:
+                new = d + weight[i]
+            elif cost == "segments":
+                new = d + 1
+            else:
+                new = delivery_step(d, hours[i], probability[i])
+            if new < dist[neighbor]:
+                dist[neighbor] = new
+                parent[neighbor] = city
+                parent_edge[neighbor] = i
+                heapq.heappush(fringe, (new, neighbor))
+                pushed += 1
+    if stats is not None:
+        stats["expanded"] = expanded
+        stats["pushed"] = pushed
+        stats["peak_fringe"] = peak
+    return dist, parent, parent_edge
+
+
+def breadth_first(graph, source, target, stats=None, on_expand=None):
+    """Fewest-segments route: breadth-first search with a deque, marking cities when queued.
+
+    Returns:
+        tuple: (dist, parent, parent_edge) as for dijkstra().
+    """
+    indptr, indices = graph.lists()[:2]
+    n = graph.num_cities
+    dist = [math.inf] * n
+    parent = [-1] * n
+    parent_edge = [-1] * n
+    dist[source] = 0
+    fringe = deque([source])
+    expanded = pushed = peak = 0
+    while fringe:
+        peak = max(peak, len(fringe))
+        city = fringe.popleft()
+        expanded += 1
+        if on_expand is not None:
+            on_expand(city, dist[city])
+        if city == target:
+            break
+        d = dist[city] + 1
+        for i in range(indptr[city], indptr[city + 1]):
+            neighbor = indices[i]
+            if dist[neighbor] == math.inf:
+                dist[neighbor] = d
+                parent[neighbor] = city
+                parent_edge[neighbor] = i
+                fringe.append(neighbor)
+                pushed += 1
+    if stats is not None:
+        stats["expanded"] = expanded
+        stats["pushed"] = pushed
+        stats["peak_fringe"] = peak
+    return dist, parent, parent_edge
+
+
+def _shrink_fringe(fringe, dist, keep):
+    """Drop all but the ``keep`` most promising fringe entries.
+
+    Cities whose best entry is dropped are forgotten (dist reset to inf) so they can be
+    reached again later, and stale entries are discarded on the way.
+
+    Returns:
+        float: smallest f value that was dropped, a lower bound on any route through the
+        forgotten part of the search.
+    """
+    fringe.sort()
+    bound = math.inf
+    for f, g, city in fringe[keep:]:
+        if g == dist[city]:
+            dist[city] = math.inf
+            bound = min(bound, f)
+    fringe[:] = [entry for entry in fringe[:keep] if entry[1] == dist[entry[2]]]
+    return bound
+
+
+def astar(graph, source, target, cost, heuristic, stats=None, max_fringe=None, on_expand=None):
+    """A* search from source to target.
+
+    Args:
+        graph (RoadGraph): road network.
+        source (int): start city id.
+        target (int): end city id.
+        cost (str): one of COSTS.
+        heuristic (sequence): lower bound on the remaining cost to target for every city
+            id; inf marks cities that cannot reach the target.
+        stats (dict): when given, receives the "expanded", "pushed" and "peak_fringe"
+            counts, plus "pruned_bound" in memory-bounded mode.
+        max_fringe (int): memory-bounded mode; whenever the fringe outgrows this many
+            entries only the better half is kept.  The route found is still optimal when
+            its cost is at most ``stats["pruned_bound"]``, and the target may be missed.
+        on_expand (callable): called as ``on_expand(city, cost_so_far)`` for every
+            expansion, including re-expansions.
+
+    Returns:
+        tuple: (dist, parent, parent_edge) as for dijkstra().  A city is expanded again
+        if a cheaper route to it turns up later, so an admissible but inconsistent
+        heuristic still gives optimal routes.
+    """
+    check_cost(cost)
+    indptr, indices, miles, hours, _, probability = graph.lists()
+    weight = {"distance": miles, "time": hours}.get(cost)
+    n = graph.num_cities
+    dist = [math.inf] * n
+    parent = [-1] * n
+    parent_edge = [-1] * n
+    dist[source] = 0
+    fringe = [(heuristic[source], 0, source)]
+    expanded = pushed = peak = 0
+    pruned_bound = math.inf
+    while fringe:
+        if max_fringe is not None and len(fringe) > max_fringe:
+            pruned_bound = min(pruned_bound, _shrink_fringe(fringe, dist, max_fringe // 2))
+            if not fringe:
+                break
+        peak = max(peak, len(fringe))
+        _, d, city = heapq.heappop(fringe)
+        if d > dist[city]:
+            continue
+        expanded += 1
+        if on_expand is not None:
+            on_expand(city, d)
+        if city == target:
+            break
+        for i in range(indptr[city], indptr[city + 1]):
+            neighbor = indices[i]
+            if weight is not None:
+                new = d + weight[i]
+            elif cost == "segments":
+                new = d + 1
+            else:
+                new = delivery_step(d, hours[i], probability[i])
+            if new < dist[neighbor]:
+                h = heuristic[neighbor]
+                if h == math.inf:
+                    continue
+                dist[neighbor] = new
+                parent[neighbor] = city
+                parent_edge[neighbor] = i
+                heapq.heappush(fringe, (new + h, new, neighbor))
+                pushed += 1
+    if stats is not None:
+        stats["expanded"] = expanded
+        stats["pushed"] = pushed
+        stats["peak_fringe"] = peak
+        if max_fringe is not None:
+            stats["pruned_bound"] = pruned_bound
+    return dist, parent, parent_edge
+
+
+def bidirectional(graph, source, target, cost, potential=None, stats=None, on_expand=None):
+    """Bidirectional Dijkstra, or bidirectional A* with an average potential.
+
+    A forward search from source and a backward search from target (every segment can be
+    driven both ways at the same cost) take turns by smallest key.  With
+    ``potential[v] = (h_target(v) - h_source(v)) / 2`` for consistent bounds h (the
+    landmark bounds; haversine is not consistent on this dataset) the forward keys are
+    ``d_f(v) + potential[v]`` and the backward keys ``d_b(v) - potential[v]``, so both
+    searches settle cities in order of the same non-negative reduced costs.  The search
+    stops once the two smallest keys sum to at least the best route seen through a city
+    both sides reached, which is then optimal.
+
+    Args:
+        graph (RoadGraph): road network.
+        source (int): start city id.
+        target (int): end city id.
+        cost (str): "segments", "distance" or "time"; the delivery cost depends on the
+            direction of travel and is not supported.
+        potential (sequence): average potential per city id; None for plain
+            bidirectional Dijkstra.
+        stats (dict): when given, receives "expanded", "expanded_forward",
+            "expanded_backward", "pushed" and "peak_fringe".
+        on_expand (callable): called as ``on_expand(city, cost_so_far)`` for every city
+            settled by either side.
+
+    Returns:
+        list: CSR segment positions of the route, or None when target is unreachable.
+    """
+    check_cost(cost)
+    if cost == "delivery":
+        raise ValueError("Error: bidirectional search does not support the delivery cost")
+    indptr, indices, miles, hours = graph.lists()[:4]
+    weight = {"distance": miles, "time": hours}.get(cost)
+    n = graph.num_cities
+    if potential is None:
+        potential = [0.0] * n
+    sign = (1, -1)
+    dist = ([math.inf] * n, [math.inf] * n)
+    parent = ([-1] * n, [-1] * n)
+    parent_edge = ([-1] * n, [-1] * n)
+    settled = ([False] * n, [False] * n)
+    dist[0][source] = dist[1][target] = 0
+    fringes = ([(potential[source], source)], [(-potential[target], target)])
+    best, meet = (0, source) if source == target else (math.inf, -1)
+    expanded = [0, 0]
+    pushed = peak = 0
+    while fringes[0] and fringes[1]:
+        peak = max(peak, len(fringes[0]) + len(fringes[1]))
+        if fringes[0][0][0] + fringes[1][0][0] >= best:
+            break
+        side = 0 if fringes[0][0][0] <= fringes[1][0][0] else 1
+        _, city = heapq.heappop(fringes[side])
+        if settled[side][city]:
+            continue
+        settled[side][city] = True
+        expanded[side] += 1
+        d = dist[side][city]
+        if on_expand is not None:
+            on_expand(city, d)
+        mine, other, s = dist[side], dist[1 - side], sign[side]
+        for i in range(indptr[city], indptr[city + 1]):
+            neighbor = indices[i]
+            new = d + (1 if weight is None else weight[i])
+            if new < mine[neighbor]:
+                mine[neighbor] = new
+                parent[side][neighbor] = city
+                parent_edge[side][neighbor] = i
+                heapq.heappush(fringes[side], (new + s * potential[neighbor], neighbor))
+                pushed += 1
+            if mine[neighbor] + other[neighbor] < best:
+                best = mine[neighbor] + other[neighbor]
+                meet = neighbor
+    if stats is not None:
+        stats.update({"expanded": expanded[0] + expanded[1], "expanded_forward": expanded[0],
+                      "expanded_backward": expanded[1], "pushed": pushed, "peak_fringe": peak})
+    if meet < 0:
+        return None
+    edges = path_edges(parent[0], parent_edge[0], source, meet)
+    city = meet
+    while city != target:
+        # The backward tree stores segments towards the target side; drive them reversed.
+        previous = parent[1][city]
+        edges.append(graph.find_segment(city, previous))
+        city = previous
+    return edges
+
+
+def path_edges(parent, parent_edge, source, target):
+    """CSR segment positions from source to target, or None when target was not reached."""
+    if target != source and parent_edge[target] < 0:
+        return None
+    edges = []
+    city = target
+    while city != source:
+        edges.append(parent_edge[city])
+        city = parent[city]
+    edges.reverse()
+    return edges
+
+
+def route_summary(graph, edges):
+    """Build the get_route() result dictionary for a sequence of CSR segment positions."""
+    _, indices, miles, hours, _, probability = graph.lists()
+    total_miles, total_hours, total_delivery = 0.0, 0.0, 0.0
+    route_taken = []
+    for i in edges:
+        total_delivery = delivery_step(total_delivery, hours[i], probability[i])
+        total_miles += miles[i]
+        total_hours += hours[i]
+        route_taken.append((graph.names[indices[i]], graph.segment_info(i)))
+    return {
+        "total-segments": len(edges),
+        "total-miles": total_miles,
+        "total-hours": total_hours,
+        "total-delivery-hours": total_delivery,
+        "route-taken": route_taken
+    }
+
+
+def empty_route():
+    return {
+        "total-segments": 0,
+        "total-miles": 0,
+        "total-hours": 0,
+        "total-delivery-hours": 0,
+        "route-taken": []
+    }
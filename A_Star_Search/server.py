@@ -0,0 +1,253 @@
+#!/usr/local/bin/python3
+# server.py : Long-running route service over HTTP or a Unix socket
+#
+# python3 server.py [--host 127.0.0.1] [--port 8551 | --unix /tmp/route.sock] [--workers N]
+#
+# The road graph (and the landmark and hierarchy tables) stay resident, so a query costs
+# only its search instead of interpreter start-up plus loading.  Connections are served
+# by asyncio; searches run in a process pool whose workers load the graph once.
+#
+#   GET /route?start=A&end=B&cost=distance[&engine=astar]  -> the get_route() dictionary
+#   POST /route with the same fields as a JSON object      -> the same
+#   GET /health                                             -> status, graph size, uptime
+#   GET /metrics                                            -> request counters and latency
+#
+
+import argparse
+import asyncio
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import json
+import os
+import threading
+import time
+from urllib.parse import parse_qsl, urlsplit
+
+from instrumentation import percentile
+from road_graph import DATA_DIR, get_graph
+from route_cache import default_cache
+from search import COSTS
+import route
+
+# References:
+'''
+https://docs.python.org/3/library/asyncio-stream.html
+https://docs.python.org/3/library/asyncio-eventloop.html#executing-code-in-thread-or-process-pools
+https://www.rfc-editor.org/rfc/rfc9112 (HTTP/1.1 message syntax)
+'''
+
+DEFAULT_PORT = 8551
+LATENCY_WINDOW = 10000
+MAX_BODY = 1 << 16
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+def _init_worker(data_dir):
+    get_graph(data_dir)
+
+
+def _route(data_dir, start, end, cost, engine):
+    """One query in a worker: get_route() without its console message, or another engine."""
+    graph = get_graph(data_dir)
+    if engine == "astar":
+        return route.find_route(start, end, cost, graph=graph, cache=default_cache())
+    return route.find_route(start, end, cost, engine=engine, graph=graph)
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class RouteServer(object):
+    def __init__(self, workers=None, data_dir=DATA_DIR) -> None:
+        """Route service state.
+
+        Args:
+            workers (int): search processes; 0 runs searches on a thread in this process,
+                None uses one process per CPU.
+            data_dir (str): directory holding the dataset.
+        """
+        self.data_dir = data_dir
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.graph = get_graph(data_dir)
+        if self.workers == 0:
+            self.pool = ThreadPoolExecutor(max_workers=1)
+        else:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                            initargs=(data_dir,))
+        self.started = time.time()
+        self.requests = Counter()
+        self.statuses = Counter()
+        self.in_flight = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.server = None
+        self.loop = None
+        self.ready = threading.Event()
+
+    # HTTP plumbing.
+
+    async def _read_request(self, reader):
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, target, _ = line.decode("latin-1").split()
+        except ValueError:
+            raise HTTPError(400, "Malformed request line")
+        headers = {}
+        while True:
+            header = await reader.readline()
+            if header in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = header.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length", 0) or 0)
+        except ValueError:
+            raise HTTPError(400, "Malformed Content-Length")
+        if length < 0:
+            raise HTTPError(400, "Malformed Content-Length")
+        if length > MAX_BODY:
+            raise HTTPError(413, "Request body too large")
+        body = await reader.readexactly(length) if length else b""
+        return method, target, headers, body
+
+    @staticmethod
+    def _write_response(writer, status, payload, keep_alive):
+        body = json.dumps(payload).encode("utf-8")
+        writer.write(("HTTP/1.1 %d %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\n"
+                      "Connection: %s\r\n\r\n" % (status, REASONS.get(status, ""), len(body),
+                                                  "keep-alive" if keep_alive else "close")).encode("latin-1"))
+        writer.write(body)
+
+    async def handle(self, reader, writer):
+        """Serve requests on one connection until the client closes it."""
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except HTTPError as error:
+                    self._write_response(writer, error.status, {"error": str(error)}, False)
+                    break
+                if request is None:
+                    break
+                method, target, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                begin = time.perf_counter()
+                try:
+                    status, payload = 200, await self.dispatch(method, target, body)
+                except HTTPError as error:
+                    status, payload = error.status, {"error": str(error)}
+                except Exception as error:  # reported to the client, the server keeps running
+                    status, payload = 500, {"error": "%s: %s" % (type(error).__name__, error)}
+                self.statuses[status] += 1
+                self.latencies.append(time.perf_counter() - begin)
+                self._write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            # Idle keep-alive connections are cancelled when the server shuts down.
+            pass
+        finally:
+            writer.close()
+
+    # Endpoints.
+
+    async def dispatch(self, method, target, body):
+        url = urlsplit(target)
+        self.requests[url.path] += 1
+        if url.path == "/route":
+            if method == "GET":
+                fields = dict(parse_qsl(url.query))
+            elif method == "POST":
+                try:
+                    fields = json.loads(body or b"{}")
+                except ValueError:
+                    raise HTTPError(400, "Request body is not JSON")
+            else:
+                raise HTTPError(405, "Use GET or POST")
+            return await self.route(fields)
+        if method != "GET":
+            raise HTTPError(405, "Use GET")
+        if url.path == "/health":
+            return self.health()
+        if url.path == "/metrics":
+            return self.metrics()
+        raise HTTPError(404, "Unknown path %s" % url.path)
+
+    async def route(self, fields):
+        missing = [name for name in ("start", "end", "cost") if not fields.get(name)]
+        if missing:
+            raise HTTPError(400, "Missing field(s): %s" % ", ".join(missing))
+        start, end, cost = fields["start"], fields["end"], fields["cost"]
+        if cost not in COSTS:
+            raise HTTPError(400, "Invalid cost function %r" % cost)
+        for city in (start, end):
+            if city not in self.graph.index:
+                raise HTTPError(404, "Unknown city: %s" % city)
+        loop = asyncio.get_running_loop()
+        self.in_flight += 1
+        try:
+            return await loop.run_in_executor(self.pool, _route, self.data_dir, start, end, cost,
+                                              fields.get("engine", "astar"))
+        except ValueError as error:
+            raise HTTPError(400, str(error))
+        finally:
+            self.in_flight -= 1
+
+    def health(self):
+        return {"status": "ok", "cities": self.graph.num_cities, "segments": self.graph.num_segments,
+                "workers": self.workers, "uptime_s": time.time() - self.started}
+
+    def metrics(self):
+        latencies = sorted(self.latencies)
+        return {
+            "requests": dict(self.requests),
+            "statuses": {str(status): count for status, count in self.statuses.items()},
+            "in_flight": self.in_flight,
+            "latency_ms": {"p50": 1000 * percentile(latencies, 50), "p95": 1000 * percentile(latencies, 95),
+                           "p99": 1000 * percentile(latencies, 99), "window": len(latencies)},
+        }
+
+    # Life cycle.
+
+    async def serve(self, host="127.0.0.1", port=DEFAULT_PORT, path=None):
+        """Listen on a Unix socket at ``path`` (or TCP host:port) until stop() is called."""
+        self.loop = asyncio.get_running_loop()
+        if path is not None:
+            self.server = await asyncio.start_unix_server(self.handle, path=path)
+        else:
+            self.server = await asyncio.start_server(self.handle, host, port)
+        self.ready.set()
+        try:
+            async with self.server:
+                await self.server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+
+    def stop(self):
+        """Stop serving; safe to call from another thread."""
+        if self.loop is not None and self.server is not None:
+            self.loop.call_soon_threadsafe(self.server.close)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve route queries.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", help="listen on this Unix socket instead of TCP")
+    parser.add_argument("--workers", type=int, help="search processes (0: threads in this process)")
+    args = parser.parse_args()
+    service = RouteServer(args.workers)
+    print("Serving %d cities on %s" % (service.graph.num_cities, args.unix or "%s:%d" % (args.host, args.port)),
+          flush=True)
+    asyncio.run(service.serve(args.host, args.port, args.unix))
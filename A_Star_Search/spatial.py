@@ -0,0 +1,236 @@
+#!/usr/local/bin/python3
+# spatial.py : Spatial index of the cities in city-gps.txt
+#
+# python3 spatial.py [k] < positions.txt : "latitude longitude" per line, prints the k nearest cities
+#
+# Points are placed on the unit sphere as (x, y, z).  The straight-line (chord) distance
+# between two such points grows with their great-circle distance, so nearest-k and radius
+# queries can be answered in Euclidean space and converted to miles at the end.
+#
+# A KD-tree built by median splits along the widest axis cuts the cities into leaves of
+# at most ``leaf_size`` points; every node keeps its bounding box and bounding ball.
+# Queries descend the tree for whole arrays of points at once, one level per step: the
+# distance to a node's box is a lower bound for its points and the distance to its ball's
+# centre plus the radius an upper bound, so a (query, node) pair is dropped as soon as its
+# lower bound exceeds the best upper bound of that query.  The points of the leaves that
+# remain are compared with NumPy.
+#
+
+import math
+import sys
+
+import numpy as np
+
+from geo import EARTH_RADIUS_MILES
+
+# References:
+'''
+https://en.wikipedia.org/wiki/K-d_tree
+https://en.wikipedia.org/wiki/Chord_(geometry)#In_trigonometry
+https://en.wikipedia.org/wiki/Great-circle_distance
+'''
+
+DEFAULT_LEAF_SIZE = 8
+CHUNK = 2048
+
+
+def unit_vectors(latitude, longitude):
+    """(n, 3) points on the unit sphere for coordinates in degrees."""
+    lat = np.radians(np.asarray(latitude, dtype=np.float64))
+    long = np.radians(np.asarray(longitude, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.stack([cos_lat * np.cos(long), cos_lat * np.sin(long), np.sin(lat)], axis=-1)
+
+
+def chord_to_miles(chord):
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.minimum(chord / 2, 1.0))
+
+
+def miles_to_chord(miles):
+    return 2 * np.sin(np.minimum(np.asarray(miles, dtype=np.float64) / (2 * EARTH_RADIUS_MILES), math.pi / 2))
+
+
+class SpatialIndex(object):
+    def __init__(self, latitude, longitude, ids=None, leaf_size=DEFAULT_LEAF_SIZE) -> None:
+        """Index points given in degrees; points with a NaN coordinate are left out.
+
+        Args:
+            latitude (np.ndarray): latitude in degrees per point.
+            longitude (np.ndarray): longitude in degrees per point.
+            ids (np.ndarray): id reported for each point, by default its position.
+            leaf_size (int): most points in a leaf.
+        """
+        latitude = np.asarray(latitude, dtype=np.float64)
+        longitude = np.asarray(longitude, dtype=np.float64)
+        ids = np.arange(len(latitude)) if ids is None else np.asarray(ids)
+        known = np.isfinite(latitude) & np.isfinite(longitude)
+        self.ids = ids[known].astype(np.int64)
+        self.points = unit_vectors(latitude[known], longitude[known])
+        self.leaf_size = leaf_size
+
+        nodes, leaves = [], []
+        self._split(np.arange(len(self.points)), nodes, leaves)
+        self.low = np.array([node[0] for node in nodes]).reshape(-1, 3)
+        self.high = np.array([node[1] for node in nodes]).reshape(-1, 3)
+        self.center = np.array([node[2] for node in nodes]).reshape(-1, 3)
+        self.radius = np.array([node[3] for node in nodes], dtype=np.float64)
+        self.counts = np.array([node[4] for node in nodes], dtype=np.int64)
+        # First child of an internal node (the second follows it), or -1 for a leaf.
+        self.child = np.array([node[5] for node in nodes], dtype=np.int64)
+        self.leaf = np.array([node[6] for node in nodes], dtype=np.int64)
+        # Leaf members padded to leaf_size; padding points sit at infinity.
+        self.members = np.full((len(leaves), leaf_size), -1, dtype=np.int64)
+        for row, leaf in enumerate(leaves):
+            self.members[row, :len(leaf)] = leaf
+        self.padded = np.vstack([self.points, np.full((1, 3), np.inf)])[self.members]
+
+    @classmethod
+    def from_graph(cls, graph, leaf_size=DEFAULT_LEAF_SIZE):
+        """Index the cities of ``graph`` that have a GPS record, reporting city ids."""
+        return cls(graph.latitude, graph.longitude, leaf_size=leaf_size)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _split(self, positions, nodes, leaves):
+        """Append the node of ``positions`` and then its subtree; children are adjacent."""
+        if not len(positions):
+            return
+        coords = self.points[positions]
+        low, high = coords.min(axis=0), coords.max(axis=0)
+        center = (low + high) / 2
+        radius = float(np.sqrt(((coords - center) ** 2).sum(axis=1)).max())
+        node = [low, high, center, radius, len(positions), -1, -1]
+        nodes.append(node)
+        pending = [(node, positions, coords)]
+        while pending:
+            node, positions, coords = pending.pop()
+            if len(positions) <= self.leaf_size:
+                node[6] = len(leaves)
+                leaves.append(positions)
+                continue
+            axis = int(np.argmax(node[1] - node[0]))
+            order = np.argsort(coords[:, axis], kind="stable")
+            middle = len(order) // 2
+            node[5] = len(nodes)
+            for part in (order[:middle], order[middle:]):
+                part_coords = coords[part]
+                low, high = part_coords.min(axis=0), part_coords.max(axis=0)
+                center = (low + high) / 2
+                radius = float(np.sqrt(((part_coords - center) ** 2).sum(axis=1)).max())
+                child = [low, high, center, radius, len(part), -1, -1]
+                nodes.append(child)
+                pending.append((child, positions[part], part_coords))
+
+    def _candidates(self, queries, bound, k=None):
+        """(query row, point position, chord) of every point that may lie within ``bound``.
+
+        With ``k`` the bound of each query also shrinks to the upper bound of the nearest
+        node holding at least k points as the descent goes.
+        """
+        bound = bound.copy()
+        rows = np.arange(len(queries))
+        nodes = np.zeros(len(queries), dtype=np.int64)
+        leaf_rows, leaf_nodes = [], []
+        while len(rows):
+            offset = queries[rows]
+            gap = np.maximum(self.low[nodes] - offset, 0) + np.maximum(offset - self.high[nodes], 0)
+            lower = np.sqrt((gap ** 2).sum(axis=1))
+            if k is not None:
+                upper = np.sqrt(((offset - self.center[nodes]) ** 2).sum(axis=1)) + self.radius[nodes]
+                np.minimum.at(bound, rows, np.where(self.counts[nodes] >= k, upper, np.inf))
+            keep = lower <= bound[rows]
+            rows, nodes = rows[keep], nodes[keep]
+            internal = self.child[nodes] >= 0
+            leaf_rows.append(rows[~internal])
+            leaf_nodes.append(nodes[~internal])
+            first = self.child[nodes[internal]]
+            rows = np.repeat(rows[internal], 2)
+            nodes = np.stack([first, first + 1], axis=1).ravel()
+        rows, leaves = np.concatenate(leaf_rows), self.leaf[np.concatenate(leaf_nodes)]
+        chord = np.sqrt(((self.padded[leaves] - queries[rows, None, :]) ** 2).sum(axis=2))
+        keep = chord <= bound[rows, None]
+        return (np.broadcast_to(rows[:, None], chord.shape)[keep], self.members[leaves][keep], chord[keep])
+
+    # Queries.
+
+    def _prepare(self, latitude, longitude):
+        scalar = np.ndim(latitude) == 0 and np.ndim(longitude) == 0
+        queries = unit_vectors(np.atleast_1d(latitude), np.atleast_1d(longitude)).reshape(-1, 3)
+        return scalar, queries, np.isfinite(queries).all(axis=1)
+
+    def nearest(self, latitude, longitude, k=1):
+        """The k indexed points nearest to each query point.
+
+        Args:
+            latitude (float or np.ndarray): query latitude(s) in degrees.
+            longitude (float or np.ndarray): query longitude(s) in degrees.
+            k (int): points per query.
+
+        Returns:
+            (np.ndarray, np.ndarray): ids and great-circle miles, shape (n, k) for
+            arrays and (k,) for scalars, nearest first; -1 and inf fill the rows of
+            NaN queries and the places past the number of indexed points.
+        """
+        scalar, queries, valid = self._prepare(latitude, longitude)
+        ids = np.full((len(queries), k), -1, dtype=np.int64)
+        miles = np.full((len(queries), k), np.inf)
+        if len(self) and k > 0:
+            rows_valid = np.flatnonzero(valid)
+            for begin in range(0, len(rows_valid), CHUNK):
+                chunk = rows_valid[begin:begin + CHUNK]
+                rows, positions, chord = self._candidates(queries[chunk], np.full(len(chunk), np.inf),
+                                                          min(k, len(self)))
+                order = np.lexsort((self.ids[positions], chord, rows))
+                rows, positions, chord = rows[order], positions[order], chord[order]
+                rank = np.arange(len(rows)) - np.searchsorted(rows, rows)
+                keep = rank < k
+                ids[chunk[rows[keep]], rank[keep]] = self.ids[positions[keep]]
+                miles[chunk[rows[keep]], rank[keep]] = chord_to_miles(chord[keep])
+        return (ids[0], miles[0]) if scalar else (ids, miles)
+
+    def within(self, latitude, longitude, radius):
+        """Indexed points within ``radius`` great-circle miles of each query point.
+
+        Returns:
+            list: one (ids, miles) pair of arrays per query, nearest first; a single
+            pair for scalar coordinates.
+        """
+        scalar, queries, valid = self._prepare(latitude, longitude)
+        bound_all = miles_to_chord(radius)
+        found = [(np.empty(0, dtype=np.int64), np.empty(0)) for _ in range(len(queries))]
+        rows_valid = np.flatnonzero(valid) if len(self) else np.empty(0, dtype=np.int64)
+        for begin in range(0, len(rows_valid), CHUNK):
+            chunk = rows_valid[begin:begin + CHUNK]
+            rows, positions, chord = self._candidates(queries[chunk], np.full(len(chunk), bound_all))
+            order = np.lexsort((self.ids[positions], chord, rows))
+            rows, positions, chord = rows[order], positions[order], chord[order]
+            edges = np.searchsorted(rows, np.arange(len(chunk) + 1))
+            for row in range(len(chunk)):
+                piece = slice(edges[row], edges[row + 1])
+                found[chunk[row]] = (self.ids[positions[piece]], chord_to_miles(chord[piece]))
+        return found[0] if scalar else found
+
+    def snap(self, latitude, longitude, max_miles=math.inf):
+        """Nearest indexed point of each query, or -1 when it is farther than ``max_miles``.
+
+        Returns:
+            (np.ndarray, np.ndarray): ids and miles, shape (n,) (scalars for scalar input).
+        """
+        ids, miles = self.nearest(latitude, longitude, 1)
+        ids, miles = ids[..., 0], miles[..., 0]
+        ids = np.where(miles <= max_miles, ids, -1)
+        return (int(ids), float(miles)) if np.ndim(ids) == 0 else (ids, miles)
+
+
+if __name__ == "__main__":
+    from road_graph import get_graph
+
+    graph = get_graph()
+    index = SpatialIndex.from_graph(graph)
+    k = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    positions = np.array([line.split()[:2] for line in sys.stdin if line.split()], dtype=np.float64).reshape(-1, 2)
+    found, miles = index.nearest(positions[:, 0], positions[:, 1], k)
+    for (lat, long), row, distance in zip(positions, found, miles):
+        print("%.5f %.5f  %s" % (lat, long, "  ".join("%s (%.1f mi)" % (graph.names[city], d)
+                                                      for city, d in zip(row, distance) if city >= 0)))
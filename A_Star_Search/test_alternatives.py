@@ -0,0 +1,68 @@
+# !/usr/bin/env python3
+# test_alternatives.py : k-shortest and via-node alternative routes
+
+import itertools
+
+import numpy as np
+import pytest
+
+import road_graph
+import route
+from alternatives import k_shortest_routes, via_routes
+
+START, END = "Bloomington,_Indiana", "Chicago,_Illinois"
+
+
+def cities_of(result, start):
+    return [start] + [step[0] for step in result["route-taken"]]
+
+
+def simple_paths(graph, source, target):
+    """Every route without repeated cities, by depth-first enumeration."""
+    stack = [[source]]
+    while stack:
+        path = stack.pop()
+        if path[-1] == target:
+            yield path
+            continue
+        for neighbor, _ in graph.neighbors(path[-1]):
+            if neighbor not in path:
+                stack.append(path + [neighbor])
+
+
+def test_yen_matches_enumeration():
+    names = list("ABCDEF")
+    pairs = [(0, 1, 4), (0, 2, 2), (1, 2, 1), (1, 3, 5), (2, 3, 8), (2, 4, 10), (3, 4, 2), (3, 5, 6), (4, 5, 3)]
+    src = [a for a, b, _ in pairs] + [b for a, b, _ in pairs]
+    dst = [b for a, b, _ in pairs] + [a for a, b, _ in pairs]
+    miles = [m for _, _, m in pairs] * 2
+    graph = road_graph.RoadGraph.from_edges(names, ["Road"], np.full(6, np.nan), np.full(6, np.nan),
+                                            src, dst, miles, [50.0] * len(src), [0] * len(src))
+    expected = sorted(sum(graph.miles[graph.find_segment(a, b)] for a, b in zip(path[:-1], path[1:]))
+                      for path in simple_paths(graph, 0, 5))
+    found = [result["total-miles"] for result in k_shortest_routes("A", "F", "distance", k=50, graph=graph)]
+    assert found == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("cost", ["distance", "time", "segments"])
+def test_k_shortest_routes(cost):
+    key = {"distance": "total-miles", "time": "total-hours", "segments": "total-segments"}[cost]
+    stats = {}
+    results = k_shortest_routes(START, END, cost, k=4, stats=stats)
+    assert len(results) == 4 and stats["spur_searches"] >= 3
+    assert results[0][key] == pytest.approx(route.find_route(START, END, cost, engine="dijkstra")[key])
+    assert [r[key] for r in results] == sorted(r[key] for r in results)
+    paths = [cities_of(r, START) for r in results]
+    assert all(len(set(path)) == len(path) and path[-1] == END for path in paths)
+    assert len({tuple(path) for path in paths}) == 4
+
+
+def test_via_routes_are_distinct_and_bounded():
+    results = via_routes(START, END, "distance", k=3, max_stretch=1.3, max_overlap=0.7)
+    best = results[0]["total-miles"]
+    assert best == pytest.approx(route.find_route(START, END, "distance", engine="dijkstra")["total-miles"])
+    for a, b in itertools.combinations([cities_of(r, START) for r in results], 2):
+        assert a != b
+    assert all(r["total-miles"] <= 1.3 * best + 1e-9 for r in results)
+    with pytest.raises(ValueError):
+        via_routes(START, END, "delivery")
@@ -0,0 +1,28 @@
+# !/usr/bin/env python3
+# test_batch.py : many-to-many route queries
+
+import pytest
+
+import batch
+
+ORIGINS = ["Bloomington,_Indiana", "Chicago,_Illinois"]
+DESTINATIONS = ["Indianapolis,_Indiana", "Columbus,_Ohio", "Bloomington,_Indiana"]
+
+
+@pytest.mark.parametrize("cost", ["distance", "time", "segments", "delivery"])
+def test_pool_matches_inline(cost):
+    inline = batch.cost_matrix(ORIGINS, DESTINATIONS, cost, workers=0)
+    pooled = batch.cost_matrix(ORIGINS, DESTINATIONS, cost, workers=2)
+    assert (inline == pooled).all()
+    assert inline[0, 2] == 0
+
+
+def test_routes_agree_with_matrix():
+    pairs = [(a, b) for a in ORIGINS for b in DESTINATIONS]
+    matrix = batch.cost_matrix(ORIGINS, DESTINATIONS, "distance", workers=0)
+    results = {(a, b): r for a, b, r in batch.get_routes(pairs, "distance", workers=2)}
+    assert len(results) == len(pairs)
+    for (a, b), result in results.items():
+        assert result["total-miles"] == matrix[ORIGINS.index(a), DESTINATIONS.index(b)]
+    assert results[("Bloomington,_Indiana", "Indianapolis,_Indiana")]["total-miles"] == 51.0
+    assert results[("Bloomington,_Indiana", "Indianapolis,_Indiana")]["route-taken"][-1][0] == "Indianapolis,_Indiana"
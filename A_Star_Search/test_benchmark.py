@@ -0,0 +1,41 @@
+# !/usr/bin/env python3
+# test_benchmark.py : benchmark harness and query-log replay
+
+import json
+
+import benchmark
+
+
+def test_workload_is_reproducible():
+    assert benchmark.random_pairs(5, 3) == benchmark.random_pairs(5, 3)
+    assert benchmark.random_pairs(5, 3) != benchmark.random_pairs(5, 4)
+    graph = benchmark.get_graph()
+    for start, end in benchmark.random_pairs(5, 3, min_miles=1500):
+        a, b = graph.city_id(start), graph.city_id(end)
+        assert benchmark.route.haversine(graph.latitude[a], graph.longitude[a],
+                                         graph.latitude[b], graph.longitude[b]) >= 1500
+
+
+def test_replay_report(tmp_path):
+    log = tmp_path / "queries.log"
+    log.write_text("# recorded queries\n"
+                   "Bloomington,_Indiana Indianapolis,_Indiana distance\n"
+                   + json.dumps({"start": "Chicago,_Illinois", "end": "Denver,_Colorado", "cost": "segments"}) + "\n")
+    queries = benchmark.read_query_log(str(log))
+    assert queries[1] == ("Chicago,_Illinois", "Denver,_Colorado", "segments")
+    report = benchmark.run_benchmark(queries, ["astar", "ch"], {"replay": str(log)})
+    json.dumps(report)
+    assert set(report["engines"]["astar"]) == {"distance", "segments"}
+    assert set(report["engines"]["ch"]) == {"distance"}
+    row = report["engines"]["astar"]["distance"]
+    assert row["queries"] == 1 and row["mean_expanded"] > 0 and row["rss_mb"] > 0
+    assert benchmark.compare(report, report)[0].endswith("(x1.00)")
+
+
+def test_get_route_row_reports_search_counters():
+    queries = [(start, end, "distance") for start, end in benchmark.random_pairs(4, 7)]
+    report = benchmark.run_benchmark(queries, ["get_route", "astar"])
+    row, astar = report["engines"]["get_route"]["distance"], report["engines"]["astar"]["distance"]
+    # get_route() is the default engine without a cache: the same searches, query for query.
+    assert row["mean_expanded"] == astar["mean_expanded"] > 0
+    assert row["mean_peak_fringe"] == astar["mean_peak_fringe"] > 0
@@ -0,0 +1,53 @@
+# !/usr/bin/env python3
+# test_contraction.py : contraction hierarchies must reproduce the optimal routes
+
+import math
+import random
+
+import pytest
+
+import contraction
+import road_graph
+import search
+from test_a1_route import validate_route
+
+
+@pytest.fixture(scope="module", params=["distance", "time"])
+def hierarchy(request, tmp_path_factory):
+    graph = road_graph.get_graph()
+    data_dir = str(tmp_path_factory.mktemp("ch"))
+    built = contraction.get_hierarchy(request.param, graph, data_dir=data_dir)
+    loaded = contraction.get_hierarchy(request.param, graph, data_dir=data_dir)
+    assert loaded.matches(graph) and loaded.num_shortcuts == built.num_shortcuts
+    return request.param, loaded
+
+
+def test_part2_case1(hierarchy):
+    cost, ch = hierarchy
+    graph = road_graph.get_graph()
+    args = ("Bloomington,_Indiana", "Indianapolis,_Indiana", cost)
+    output = ch.route(graph, graph.city_id(args[0]), graph.city_id(args[1]))
+    _, miles, hours, _ = validate_route(output, args)
+    # Never worse than the reference answers of test_a1_route.
+    assert {"distance": miles, "time": hours}[cost] <= {"distance": 51.0, "time": 1.07949}[cost]
+
+
+def test_matches_dijkstra(hierarchy):
+    cost, ch = hierarchy
+    graph = road_graph.get_graph()
+    rng = random.Random(551)
+    for _ in range(100):
+        source, target = rng.randrange(graph.num_cities), rng.randrange(graph.num_cities)
+        dist, _, _ = search.dijkstra(graph, source, cost, [target])
+        result = ch.route(graph, source, target)
+        if dist[target] == math.inf:
+            assert result["total-segments"] == 0
+            continue
+        assert result[search.COST_KEYS[cost]] == pytest.approx(dist[target], rel=1e-12)
+        if result["route-taken"]:
+            assert result["route-taken"][-1][0] == graph.names[target]
+
+
+def test_rejects_other_costs():
+    with pytest.raises(ValueError):
+        contraction.check_metric("segments")
@@ -0,0 +1,37 @@
+# !/usr/bin/env python3
+# test_delivery.py : label-setting delivery engine
+
+import random
+
+import pytest
+
+import road_graph
+import route
+import search
+from delivery import delivery_search
+
+
+def test_optimal_against_dijkstra():
+    graph = road_graph.get_graph()
+    rng = random.Random(12)
+    for _ in range(40):
+        source, target = rng.randrange(graph.num_cities), rng.randrange(graph.num_cities)
+        expected = search.dijkstra(graph, source, "delivery", [target])[0][target]
+        edges = delivery_search(graph, source, target)
+        if edges is None:
+            assert expected == float("inf")
+        else:
+            assert search.route_summary(graph, edges)["total-delivery-hours"] == pytest.approx(expected, rel=1e-12)
+
+
+def test_reproducible_with_stats():
+    runs = []
+    for _ in range(2):
+        stats = {}
+        result = route.find_route("Bloomington,_Indiana", "Boston,_Massachusetts", "delivery", stats=stats)
+        runs.append(result)
+        assert stats["expanded"] <= stats["labels"] + 1
+        assert stats["wall_time"] > 0 and stats["peak_fringe"] > 0
+    assert runs[0] == runs[1]
+    case = route.find_route("Bloomington,_Indiana", "Indianapolis,_Indiana", "delivery")
+    assert case["total-delivery-hours"] <= 1.1364
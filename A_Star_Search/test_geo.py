@@ -0,0 +1,79 @@
+# !/usr/bin/env python3
+# test_geo.py : vectorized haversine table and GPS imputation
+
+import math
+
+import numpy as np
+import pytest
+
+import road_graph
+import route
+import search
+from geo import GeoTable
+
+
+def test_matches_scalar_haversine():
+    graph = road_graph.get_graph()
+    table = GeoTable(graph)
+    target = graph.city_id("Bloomington,_Indiana")
+    bound = table.miles_to(target)
+    for name in ("Chicago,_Illinois", "Denver,_Colorado", "Boston,_Massachusetts"):
+        city = graph.city_id(name)
+        expected = route.haversine(graph.latitude[city], graph.longitude[city],
+                                   graph.latitude[target], graph.longitude[target])
+        assert bound[city] == pytest.approx(expected, rel=1e-9)
+    assert table.heuristic(target, "time")[city] == pytest.approx(bound[city] / graph.max_speed_limit)
+
+
+def test_imputed_cities_use_road_slack():
+    graph = road_graph.get_graph()
+    table = GeoTable(graph)
+    missing = np.flatnonzero(np.isnan(graph.latitude))
+    assert table.imputed[missing].all() and not table.imputed[~np.isnan(graph.latitude)].any()
+    city = int(missing[0])
+    miles = search.dijkstra(graph, city, "distance")[0]
+    assert table.slack[city] == pytest.approx(miles[table.anchor[city]])
+    assert np.asarray(miles)[~np.isnan(graph.latitude)].min() == pytest.approx(table.slack[city])
+    target = graph.city_id("Chicago,_Illinois")
+    bound = table.miles_to(target)
+    assert bound[city] <= bound[table.anchor[city]]
+
+
+def test_admissible_on_consistent_roads():
+    # Four towns along the equator one degree apart, two of them without GPS.
+    degree = math.radians(1) * 3961
+    names = ["A", "B", "C", "D"]
+    latitude = np.array([0.0, np.nan, 0.0, np.nan])
+    longitude = np.array([0.0, np.nan, 2.0, np.nan])
+    src, dst = [0, 1, 1, 2, 2, 3], [1, 0, 2, 1, 3, 2]
+    miles = [1.1 * degree] * 6
+    graph = road_graph.RoadGraph.from_edges(names, ["Road"], latitude, longitude, src, dst, miles, [50.0] * 6, [0] * 6)
+    table = GeoTable(graph)
+    for target in range(4):
+        exact = np.asarray(search.dijkstra(graph, target, "distance")[0])
+        assert (table.miles_to(target) <= exact + 1e-9).all()
+    assert table.miles_to(0)[2] > 0
+    with pytest.raises(ValueError):
+        table.heuristic(0, "segments")
+
+
+@pytest.mark.parametrize("cost", ["distance", "time"])
+def test_astar_matches_dijkstra(cost):
+    graph = road_graph.get_graph()
+    rng = np.random.default_rng(13)
+    key = search.COST_KEYS[cost]
+    for source, target in rng.integers(0, graph.num_cities, (60, 2)).tolist():
+        start, end = graph.names[source], graph.names[target]
+        expected = route.find_route(start, end, cost, engine="dijkstra")[key]
+        assert route.find_route(start, end, cost)[key] == pytest.approx(expected, rel=1e-12)
+
+
+def test_landmarks_cap_the_great_circle_bound():
+    graph = road_graph.get_graph()
+    table, landmarks = GeoTable(graph), route.get_landmarks(graph)
+    target = graph.city_id("Bloomington,_Indiana")
+    capped = np.asarray(table.heuristic(target, "distance", landmarks))
+    assert (capped <= landmarks.bounds(target, "distance")).all()
+    assert (capped <= table.miles_to(target)).all()
+    exact = np.asarray(search.dijkstra(graph, target, "distance")[0])
+    assert (capped <= exact + 1e-9).all()
@@ -0,0 +1,75 @@
+# !/usr/bin/env python3
+# test_ingest.py : streaming dataset parser and validation report
+
+import math
+
+import numpy as np
+
+import ingest
+from road_graph import RoadGraph
+
+CITIES = """A 39.1 -86.5
+B 39.2 -86.4
+B 10.0 10.0
+C north -86.0
+D 39.3
+
+E 39.4 -86.3
+"""
+
+SEGMENTS = """A B 10 50 I_1
+B A 12 50 I_2
+A C 5 0 IN_45
+C E 7 IN_46
+E E 3 30 Loop
+A D x 30 Bad
+D
+B F 20 55 US_1
+A B 11 45 I_3
+"""
+
+
+def write_dataset(path):
+    (path / ingest.CITY_GPS_FILE).write_text(CITIES)
+    (path / ingest.ROAD_SEGMENTS_FILE).write_text(SEGMENTS)
+    return str(path)
+
+
+def test_validation_report(tmp_path):
+    report = ingest.ValidationReport()
+    graph = RoadGraph.from_text(write_dataset(tmp_path), report)
+    assert report.rows == {"city-gps.txt": 6, "road-segments.txt": 9}
+    assert report.issues("city-gps.txt") == {"duplicate_city": 1, "bad_coordinates": 1, "too_few_fields": 1}
+    assert report.issues("road-segments.txt") == {"bad_speed": 1, "missing_speed": 1, "self_loop": 1,
+                                                  "bad_length": 1, "too_few_fields": 1, "parallel_segment": 2}
+    assert report.samples[("road-segments.txt", "self_loop")] == [(5, "E E 3 30 Loop")]
+    assert [line for line, _ in report.samples[("road-segments.txt", "parallel_segment")]] == [2, 9]
+    assert not report.clean and report.to_dict()["files"]["city-gps.txt"]["rows"] == 6
+
+    assert graph.names == ["A", "B", "E", "C", "F"]
+    # A duplicated city keeps its first id and its last coordinates.
+    assert math.isnan(graph.latitude[graph.city_id("C")]) and graph.latitude[graph.city_id("B")] == 10.0
+    # The first segment between A and B wins in both directions.
+    a, b = graph.city_id("A"), graph.city_id("B")
+    assert graph.miles[graph.find_segment(a, b)] == 10 and graph.miles[graph.find_segment(b, a)] == 10
+    c = graph.city_id("C")
+    assert graph.speed[graph.find_segment(a, c)] == ingest.DEFAULT_SPEED_LIMIT
+    assert graph.highways[graph.highway[graph.find_segment(c, graph.city_id("E"))]] == "IN_46"
+    assert len(graph.indices) == 8
+
+
+def test_chunk_size_does_not_change_the_graph(tmp_path):
+    directory = write_dataset(tmp_path)
+    whole = ingest.read_dataset(directory)
+    for chunk_bytes in (1, 16, 64):
+        names, highways, latitude, longitude, edges = ingest.read_dataset(directory, chunk_bytes=chunk_bytes)
+        assert names == whole[0] and highways == whole[1]
+        assert np.array_equal(latitude, whole[2], equal_nan=True)
+        for key in edges:
+            assert np.array_equal(edges[key], whole[4][key]), key
+
+
+def test_shipped_dataset_is_nearly_clean():
+    report = ingest.ValidationReport()
+    RoadGraph.from_text(report=report)
+    assert report.issues() == {"duplicate_city": 1, "parallel_segment": 3, "self_loop": 1}
@@ -0,0 +1,62 @@
+# !/usr/bin/env python3
+# test_instrumentation.py : query probes, phase timers and trace export
+
+import json
+
+import pytest
+
+import route
+from instrumentation import Probe, current_probe, percentile
+from route_cache import RouteCache
+
+START, END = "Bloomington,_Indiana", "Chicago,_Illinois"
+
+
+def test_percentile():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([7], 95) == 7
+    assert percentile([], 50) == 0.0
+
+
+@pytest.mark.parametrize("engine,cost", [("astar", "distance"), ("astar", "segments"), ("astar", "delivery"),
+                                         ("alt", "time"), ("dijkstra", "time"), ("ch", "distance")])
+def test_probe_does_not_change_routes(engine, cost):
+    expanded = []
+    probe = Probe(on_expand=lambda city, d: expanded.append(city))
+    result = route.find_route(START, END, cost, engine=engine, probe=probe)
+    assert result == route.find_route(START, END, cost, engine=engine)
+    assert probe.counters["queries"] == 1
+    assert {"load_graph", "query", "search"} <= set(probe.phases)
+    if engine != "ch":
+        assert "route_summary" in probe.phases
+        assert len(expanded) == probe.counters["expanded"]
+        assert route.get_graph().city_id(END) == expanded[-1]
+    if engine in ("astar", "alt") and cost != "segments":
+        assert sum(probe.heuristic_histogram.values()) > 0
+
+
+def test_get_route_reports_to_active_probe(tmp_path):
+    assert current_probe() is None
+    with Probe(trace_expansions=True).activate() as probe:
+        route.get_route(START, END, "time")
+    assert current_probe() is None
+    record = json.loads(json.dumps(probe.record(service="test")))
+    assert record["service"] == "test" and record["counters"]["queries"] == 1
+
+    path = tmp_path / "trace.json"
+    probe.write_chrome_trace(str(path))
+    events = json.load(open(path))["traceEvents"]
+    assert {"X", "i", "C"} <= {event["ph"] for event in events}
+    assert all(event["dur"] >= 0 for event in events if event["ph"] == "X")
+
+
+def test_counters_accumulate_across_queries():
+    probe = Probe()
+    cache = RouteCache()
+    for end in (END, "Indianapolis,_Indiana", END):
+        route.find_route(START, end, "distance", engine="dijkstra", cache=cache, probe=probe)
+    assert probe.counters["queries"] == 2 and probe.counters["cache_hits"] == 1
+    assert probe.counters["expanded"] == sum(query["stats"]["expanded"] for query in probe.queries)
+    assert probe.counters["peak_fringe"] == max(query["stats"]["peak_fringe"] for query in probe.queries)
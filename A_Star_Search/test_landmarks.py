@@ -0,0 +1,45 @@
+# !/usr/bin/env python3
+# test_landmarks.py : ALT heuristic must stay admissible and keep routes optimal
+
+import math
+import random
+
+import numpy as np
+import pytest
+
+import landmarks
+import road_graph
+import search
+
+
+@pytest.fixture(scope="module")
+def tables(tmp_path_factory):
+    graph = road_graph.get_graph()
+    data_dir = str(tmp_path_factory.mktemp("alt"))
+    landmarks.get_landmarks(graph, data_dir=data_dir, count=8)
+    loaded = landmarks.get_landmarks(graph, data_dir=data_dir, count=8)
+    assert loaded.matches(graph) and len(loaded.cities) == 8
+    return loaded
+
+
+@pytest.mark.parametrize("cost", ["distance", "time", "segments", "delivery"])
+def test_matches_dijkstra(tables, cost):
+    graph = road_graph.get_graph()
+    rng = random.Random(4)
+    for _ in range(40):
+        source, target = rng.randrange(graph.num_cities), rng.randrange(graph.num_cities)
+        expected = search.dijkstra(graph, source, cost, [target])[0][target]
+        found = tables.search(graph, source, target, cost)[0][target]
+        assert found == pytest.approx(expected, rel=1e-12) or found == expected == math.inf
+
+
+def test_heuristic_is_admissible_without_gps(tables):
+    graph = road_graph.get_graph()
+    target = graph.city_id("Indianapolis,_Indiana")
+    exact = np.asarray(search.dijkstra(graph, target, "distance")[0])
+    bound = np.asarray(tables.heuristic(target, "distance"))
+    reachable = np.isfinite(exact)
+    assert (bound[reachable] <= exact[reachable] + 1e-9).all()
+    assert np.isinf(bound[~reachable]).all()
+    no_gps = reachable & np.isnan(graph.latitude)
+    assert no_gps.any() and (bound[no_gps] > 0).any()
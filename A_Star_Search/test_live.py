@@ -0,0 +1,118 @@
+# !/usr/bin/env python3
+# test_live.py : closures and speed updates on a live road graph
+
+import gc
+import threading
+import time
+import weakref
+
+import pytest
+
+from live import LiveGraph
+
+START, END = "Bloomington,_Indiana", "Chicago,_Illinois"
+
+
+def cities_of(result):
+    return [START] + [step[0] for step in result["route-taken"]]
+
+
+def test_closure_reroutes_and_keeps_old_snapshot():
+    live = LiveGraph()
+    before = live.snapshot()
+    first = before.get_route(START, END, "distance")
+    before.get_route("Bloomington,_Indiana", "Indianapolis,_Indiana", "segments")
+    cities = cities_of(first)
+    after = live.update(close=[(cities[2], cities[3])])
+    assert after.version == 1 and after.decreased_costs == frozenset()
+    assert len(after.cache) < len(before.cache)
+
+    rerouted = after.find_route(START, END, "distance", engine="dijkstra")
+    assert rerouted["total-miles"] > first["total-miles"]
+    assert (cities[2], cities[3]) not in zip(cities_of(rerouted)[:-1], cities_of(rerouted)[1:])
+    for engine in ("alt", "bidirectional"):
+        assert after.find_route(START, END, "distance", engine=engine)["total-miles"] == \
+            pytest.approx(rerouted["total-miles"])
+    # Landmark tables survive closures, queries on the old snapshot still see the old graph.
+    assert after.landmarks() is before.landmarks()
+    assert before.get_route(START, END, "distance") == first
+
+    reopened = live.update(reopen=[(cities[2], cities[3])])
+    assert reopened.decreased_costs and len(reopened.cache) == 0
+    assert reopened.get_route(START, END, "distance")["total-miles"] == first["total-miles"]
+    assert reopened.graph.fingerprint() == before.graph.fingerprint()
+
+
+def test_speed_updates():
+    live = LiveGraph()
+    before = live.snapshot()
+    fastest = before.find_route(START, END, "time", engine="dijkstra")
+    cities = cities_of(fastest)
+    slower = live.update(speeds={(cities[1], cities[2]): 5})
+    # Below 50 mph the delivery return probability drops to 0, so delivery may get cheaper.
+    assert slower.changed_costs == {"time", "delivery"} and "time" not in slower.decreased_costs
+    assert slower.hierarchy(cost="distance") is before.hierarchy(cost="distance")
+    assert slower.landmarks() is before.landmarks()
+    expected = slower.find_route(START, END, "time", engine="dijkstra")
+    assert expected["total-hours"] > fastest["total-hours"]
+    assert slower.find_route(START, END, "time", engine="alt")["total-hours"] == pytest.approx(expected["total-hours"])
+    assert slower.find_route(START, END, "distance")["total-miles"] == before.find_route(START, END, "distance")["total-miles"]
+
+    restored = live.update(speeds={(cities[1], cities[2]): None})
+    assert "time" in restored.decreased_costs
+    assert restored.find_route(START, END, "time", engine="dijkstra")["total-hours"] == fastest["total-hours"]
+    assert live.update(speeds={(cities[1], cities[2]): None}) is restored
+    with pytest.raises(ValueError):
+        live.update(speeds={(cities[1], cities[2]): 0})
+    with pytest.raises(KeyError):
+        live.update(close=[(START, END)])
+
+
+def test_queries_run_against_consistent_snapshots():
+    live = LiveGraph()
+    cities = cities_of(live.find_route(START, END, "distance", engine="dijkstra"))
+    errors, versions = [], set()
+    writing = threading.Event()
+    writing.set()
+
+    def writer():
+        for i in range(20):
+            pair = (cities[1 + i % 4], cities[2 + i % 4])
+            snapshot = live.update(close=[pair]) if i % 2 == 0 else live.update(reopen=[pair])
+            # Let a reader pick up each version before the next one replaces it.
+            deadline = time.monotonic() + 5
+            while snapshot.version not in versions and time.monotonic() < deadline:
+                time.sleep(0.001)
+        writing.clear()
+
+    def reader():
+        while writing.is_set():
+            snapshot = live.snapshot()
+            versions.add(snapshot.version)
+            found = snapshot.find_route(START, END, "distance", engine="bidijkstra")
+            expected = snapshot.find_route(START, END, "distance", engine="dijkstra")
+            if found["total-miles"] != pytest.approx(expected["total-miles"]):
+                errors.append((snapshot.version, found["total-miles"], expected["total-miles"]))
+
+    threads = [threading.Thread(target=reader) for _ in range(3)] + [threading.Thread(target=writer)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors and len(versions) > 1
+
+
+def test_old_snapshots_are_collected():
+    live = LiveGraph()
+    first = live.snapshot()
+    first.landmarks(), first.hierarchy(cost="distance")
+    cities = cities_of(first.find_route(START, END, "distance", engine="dijkstra"))
+    old = [weakref.ref(first)]
+    del first
+    for i in range(5):
+        old.append(weakref.ref(live.update(speeds={(cities[1], cities[2]): 20 + i})))
+    current = live.snapshot()
+    gc.collect()
+    assert [ref() for ref in old[:-1]] == [None] * 5 and old[-1]() is current
+    # The structures still reach the current snapshot.
+    assert current.landmarks() is current.landmarks() and current.hierarchy(cost="distance") is not None
@@ -0,0 +1,51 @@
+# !/usr/bin/env python3
+# test_path_tree.py : single-source shortest-path trees
+
+import numpy as np
+import pytest
+
+import route
+from path_tree import shortest_path_tree
+from road_graph import RoadGraph
+
+DEPOT = "Bloomington,_Indiana"
+
+
+@pytest.mark.parametrize("cost", ["distance", "time", "segments", "delivery"])
+def test_tree_routes_match_point_queries(cost):
+    tree = shortest_path_tree(DEPOT, cost)
+    for end in ("Indianapolis,_Indiana", "Chicago,_Illinois", "Denver,_Colorado"):
+        expected = route.find_route(DEPOT, end, cost, engine="dijkstra")
+        result = tree.route(end)
+        assert result == expected
+        city = tree.graph.city_id(end)
+        assert tree.miles[city] == pytest.approx(result["total-miles"])
+        assert tree.hours[city] == pytest.approx(result["total-hours"])
+        assert tree.delivery_hours[city] == pytest.approx(result["total-delivery-hours"])
+        assert tree.segments[city] == result["total-segments"]
+        assert tree.path(end)[0] == tree.source and tree.path(end)[-1] == city
+
+
+def test_isochrone():
+    tree = shortest_path_tree(DEPOT, "time")
+    nearby = tree.within(3)
+    assert nearby[0] == (DEPOT, 0.0)
+    assert all(hours <= 3 for _, hours in nearby)
+    assert [hours for _, hours in nearby] == sorted(hours for _, hours in nearby)
+    assert len(nearby) == np.count_nonzero(tree.hours <= 3)
+    assert not tree.reachable.all() and tree.route(int(np.flatnonzero(~tree.reachable)[0]))["route-taken"] == []
+
+
+def test_zero_length_segment_to_a_lower_id():
+    # Root R, then P, then K across a zero-length segment; K's id is below its parent's,
+    # so K ties with P on distance and sorts before it.
+    names = ["R", "K", "P"]
+    src, dst, miles = [0, 2, 2, 1], [2, 0, 1, 2], [5.0, 5.0, 0.0, 0.0]
+    graph = RoadGraph.from_edges(names, ["H"], np.full(3, np.nan), np.full(3, np.nan), src, dst, miles,
+                                 [50.0] * 4, [0] * 4)
+    for cost in ("distance", "time", "delivery"):
+        tree = shortest_path_tree("R", cost, graph)
+        assert tree.reachable.all()
+        assert tree.miles.tolist() == [0.0, 5.0, 5.0] and tree.segments.tolist() == [0, 2, 1]
+        assert tree.hours[1] == tree.hours[2] == pytest.approx(0.1)
+        assert tree.path("K") == [0, 2, 1] and tree.route("K")["total-miles"] == 5.0
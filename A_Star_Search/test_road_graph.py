@@ -0,0 +1,31 @@
+# !/usr/bin/env python3
+# test_road_graph.py : compiled road graph round trip and legacy views
+
+import numpy as np
+
+import road_graph
+import route
+
+
+def test_compiled_round_trip(tmp_path):
+    graph = road_graph.get_graph()
+    graph.save(str(tmp_path))
+    loaded = road_graph.RoadGraph.load(str(tmp_path))
+    assert isinstance(loaded.indices, np.memmap)
+    assert loaded.names == graph.names and loaded.highways == graph.highways
+    for field in road_graph.ARRAY_FIELDS:
+        assert np.array_equal(getattr(loaded, field), getattr(graph, field), equal_nan=True), field
+
+
+def test_graph_is_loaded_once():
+    assert road_graph.get_graph() is road_graph.get_graph()
+    assert route.load_graph() is route.load_graph()
+
+
+def test_segments_are_bidirectional():
+    graph = road_graph.get_graph()
+    a, b = graph.city_id("Bloomington,_Indiana"), graph.city_id("Martinsville,_Indiana")
+    forward, backward = graph.find_segment(a, b), graph.find_segment(b, a)
+    assert forward >= 0 and backward >= 0
+    assert graph.miles[forward] == graph.miles[backward]
+    assert graph.hours[forward] == graph.miles[forward] / graph.speed[forward]
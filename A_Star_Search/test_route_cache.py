@@ -0,0 +1,89 @@
+# !/usr/bin/env python3
+# test_route_cache.py : LRU route cache with reverse and subpath reuse
+
+import pytest
+
+import road_graph
+import route
+import search
+from route_cache import CACHE_SWITCH, RouteCache, default_cache
+
+START, END = "San_Diego,_California", "Boston,_Massachusetts"
+
+
+def test_hits_and_lru_eviction():
+    cache = RouteCache(max_entries=2)
+    first = route.find_route(START, END, "distance", engine="dijkstra", cache=cache)
+    again = route.find_route(START, END, "distance", engine="dijkstra", cache=cache)
+    assert again == first and again is not first
+    assert (cache.hits, cache.misses) == (1, 1)
+    route.find_route(START, END, "time", engine="dijkstra", cache=cache)
+    route.find_route(START, END, "segments", engine="dijkstra", cache=cache)
+    assert len(cache) == 2 and cache.evictions == 1
+    assert (START, END, "distance") not in cache.entries
+
+
+@pytest.mark.parametrize("cost", ["distance", "time", "segments"])
+def test_reverse_and_subpath_reuse(cost):
+    cache = RouteCache()
+    forward = route.find_route(START, END, cost, engine="dijkstra", cache=cache)
+    backward = route.find_route(END, START, cost, engine="dijkstra", cache=cache)
+    assert cache.reverse_hits == 1
+    assert backward["route-taken"][-1][0] == START
+    for key in ("total-segments", "total-miles", "total-hours"):
+        assert backward[key] == pytest.approx(forward[key])
+
+    middle = forward["route-taken"][len(forward["route-taken"]) // 2][0]
+    piece = route.find_route(END, middle, cost, engine="dijkstra", cache=cache)
+    assert cache.subpath_hits == 1
+    exact = route.find_route(END, middle, cost, engine="dijkstra")
+    assert piece[search.COST_KEYS[cost]] == pytest.approx(exact[search.COST_KEYS[cost]])
+
+
+def test_delivery_is_not_reversed():
+    cache = RouteCache()
+    route.find_route(START, END, "delivery", engine="dijkstra", cache=cache)
+    route.find_route(END, START, "delivery", engine="dijkstra", cache=cache)
+    assert cache.reverse_hits == 0 and cache.misses == 2
+
+
+def test_persistence(tmp_path):
+    cache = RouteCache()
+    expected = route.find_route(START, END, "time", engine="dijkstra", cache=cache)
+    cache.save(str(tmp_path / "routes.json"))
+    restored = RouteCache()
+    restored.load(road_graph.get_graph(), str(tmp_path / "routes.json"))
+    assert restored.get(road_graph.get_graph(), START, END, "time") == expected
+
+
+def test_inexact_routes_are_only_reused_for_the_same_query(tmp_path):
+    # Memory-bounded A* may return a longer route than the optimal one.
+    cache = RouteCache()
+    forward = route.find_route(START, END, "distance", cache=cache, max_fringe=100)
+    assert route.find_route(START, END, "distance", cache=cache, max_fringe=100) == forward
+    route.find_route(END, START, "distance", cache=cache, max_fringe=100)
+    middle = forward["route-taken"][len(forward["route-taken"]) // 2][0]
+    route.find_route(START, middle, "distance", cache=cache, max_fringe=100)
+    assert cache.reverse_hits == cache.subpath_hits == 0 and cache.hits == 1
+    cache.save(str(tmp_path / "routes.json"))
+    restored = RouteCache()
+    restored.load(road_graph.get_graph(), str(tmp_path / "routes.json"))
+    assert restored.get(road_graph.get_graph(), END, middle, "distance") is None
+
+
+def test_get_route_caches_only_when_switched_on(monkeypatch):
+    monkeypatch.delenv(CACHE_SWITCH, raising=False)
+    before = len(default_cache())
+    first = route.get_route(START, END, "distance")
+    assert route.get_route(START, END, "distance") == first
+    assert len(default_cache()) == before
+
+    monkeypatch.setenv(CACHE_SWITCH, "1")
+    cache = default_cache()
+    cache.clear()
+    counters = (cache.misses, cache.hits, cache.reverse_hits)
+    assert route.get_route(START, END, "distance") == first
+    assert route.get_route(START, END, "distance") == first
+    assert route.get_route(END, START, "distance")["total-miles"] == pytest.approx(first["total-miles"])
+    assert (cache.misses, cache.hits, cache.reverse_hits) == (counters[0] + 1, counters[1] + 2, counters[2] + 1)
+    cache.clear()
@@ -0,0 +1,93 @@
+# !/usr/bin/env python3
+# test_search.py : search engines behind route.find_route
+
+import math
+import random
+
+import pytest
+
+import road_graph
+import route
+import search
+
+
+def random_pairs(count, seed):
+    graph = road_graph.get_graph()
+    rng = random.Random(seed)
+    return [(graph.names[rng.randrange(graph.num_cities)], graph.names[rng.randrange(graph.num_cities)])
+            for _ in range(count)]
+
+
+def test_breadth_first_finds_fewest_segments():
+    for start, end in random_pairs(30, 1):
+        expected = route.find_route(start, end, "segments", engine="dijkstra")
+        found = route.find_route(start, end, "segments")
+        assert found["total-segments"] == expected["total-segments"]
+
+
+@pytest.mark.parametrize("cost", ["distance", "time", "delivery"])
+def test_route_totals_match_search_cost(cost):
+    graph = road_graph.get_graph()
+    for start, end in random_pairs(20, 2):
+        dist = search.dijkstra(graph, graph.city_id(start), cost, [graph.city_id(end)])[0][graph.city_id(end)]
+        result = route.find_route(start, end, cost, engine="dijkstra")
+        if dist == math.inf:
+            assert result["route-taken"] == []
+        else:
+            assert result[search.COST_KEYS[cost]] == pytest.approx(dist, rel=1e-12)
+
+
+@pytest.mark.parametrize("cost", ["distance", "time", "segments"])
+def test_bidirectional_matches_dijkstra(cost):
+    for start, end in random_pairs(40, 5) + [("San_Diego,_California", "Boston,_Massachusetts")]:
+        expected = route.find_route(start, end, cost, engine="dijkstra")
+        for engine in ("bidirectional", "bidijkstra"):
+            found = route.find_route(start, end, cost, engine=engine)
+            assert found[search.COST_KEYS[cost]] == pytest.approx(expected[search.COST_KEYS[cost]], rel=1e-12)
+            assert [step[0] for step in found["route-taken"]][-1:] == [step[0] for step in expected["route-taken"]][-1:]
+
+
+def test_bidirectional_expands_less_on_long_routes():
+    start, end = "San_Diego,_California", "Boston,_Massachusetts"
+    one_way, both_ways = {}, {}
+    route.find_route(start, end, "distance", stats=one_way)
+    route.find_route(start, end, "distance", engine="bidirectional", stats=both_ways)
+    assert both_ways["expanded_forward"] > 0 and both_ways["expanded_backward"] > 0
+    assert both_ways["expanded"] < one_way["expanded"]
+    with pytest.raises(ValueError):
+        route.find_route(start, end, "delivery", engine="bidirectional")
+
+
+def test_memory_bounded_astar():
+    start, end = "San_Diego,_California", "Boston,_Massachusetts"
+    unbounded, bounded = {}, {}
+    route.find_route(start, end, "distance", stats=unbounded)
+    small = route.find_route(start, end, "distance", stats=bounded, max_fringe=100)
+    assert bounded["peak_fringe"] <= 100 < unbounded["peak_fringe"]
+    assert small["route-taken"][-1][0] == end
+
+
+@pytest.mark.parametrize("start, end, max_fringe", [
+    ("Bloomington,_Indiana", "Chicago,_Illinois", 12),
+    ("Bloomington,_Indiana", "Indianapolis,_Indiana", 4),
+    ("San_Diego,_California", "Boston,_Massachusetts", 100),
+    ("Seattle,_Washington", "Miami,_Florida", 100),
+])
+def test_memory_bounded_astar_is_optimal_below_the_pruned_bound(start, end, max_fringe):
+    full = route.find_route(start, end, "distance", engine="dijkstra")
+    bounded = {}
+    small = route.find_route(start, end, "distance", stats=bounded, max_fringe=max_fringe)
+    assert small["route-taken"][-1][0] == end
+    assert bounded["pruned_bound"] < math.inf
+    # Nothing cheaper than the optimum was pruned: the bounded route is the optimal one.
+    if bounded["pruned_bound"] >= full["total-miles"]:
+        assert small["total-miles"] == pytest.approx(full["total-miles"])
+    else:
+        assert small["total-miles"] >= full["total-miles"]
+
+
+def test_unknown_engine_and_city():
+    with pytest.raises(ValueError):
+        route.find_route("Bloomington,_Indiana", "Indianapolis,_Indiana", "distance", engine="bogus")
+    with pytest.raises(KeyError):
+        route.find_route("Atlantis", "Indianapolis,_Indiana", "distance")
@@ -0,0 +1,79 @@
+# !/usr/bin/env python3
+# test_server.py : the route service and its client
+
+import asyncio
+import json
+import os
+import socket
+import tempfile
+import threading
+
+import pytest
+
+import route
+from route_client import RouteClient, RouteError, load_test
+from server import RouteServer
+
+START, END = "Bloomington,_Indiana", "Chicago,_Illinois"
+
+
+@pytest.fixture(scope="module", params=[0, 2], ids=["threads", "processes"])
+def socket_path(request):
+    server = RouteServer(workers=request.param)
+    path = os.path.join(tempfile.mkdtemp(), "route.sock")
+    thread = threading.Thread(target=asyncio.run, args=(server.serve(path=path),), daemon=True)
+    thread.start()
+    assert server.ready.wait(10)
+    yield path
+    server.stop()
+    thread.join(10)
+
+
+def test_route_matches_get_route(socket_path):
+    client = RouteClient(unix=socket_path)
+    try:
+        for cost in ("segments", "distance", "time", "delivery"):
+            assert client.get_route(START, END, cost) == route.find_route(START, END, cost)
+        assert client.get_route(START, END, "distance", engine="dijkstra")["total-miles"] == \
+            pytest.approx(route.find_route(START, END, "distance", engine="dijkstra")["total-miles"])
+        assert client.health()["status"] == "ok"
+    finally:
+        client.close()
+
+
+def test_errors_and_metrics(socket_path):
+    client = RouteClient(unix=socket_path)
+    try:
+        with pytest.raises(RouteError) as error:
+            client.get_route(START, "Atlantis", "distance")
+        assert error.value.status == 404
+        with pytest.raises(RouteError) as error:
+            client.get_route(START, END, "scenery")
+        assert error.value.status == 400
+        # The connection stays usable after an error.
+        assert client.get_route(START, END, "segments")["total-segments"] > 0
+
+        report = load_test([(START, END, "time"), (END, START, "distance")] * 10, 4, unix=socket_path)
+        assert report["queries"] == 20 and report["throughput_qps"] > 0
+        metrics = client.metrics()
+        assert metrics["statuses"]["404"] >= 1 and metrics["statuses"]["400"] >= 1
+        assert metrics["requests"]["/route"] >= 23 and metrics["in_flight"] == 0
+        assert 0 < metrics["latency_ms"]["p50"] <= metrics["latency_ms"]["p99"]
+    finally:
+        client.close()
+
+
+@pytest.mark.parametrize("length", ["ten", "-5"])
+def test_malformed_content_length(socket_path, length):
+    with socket.socket(socket.AF_UNIX) as sock:
+        sock.settimeout(10)
+        sock.connect(socket_path)
+        sock.sendall(("POST /route HTTP/1.1\r\nContent-Length: %s\r\n\r\n" % length).encode("latin-1"))
+        response = b""
+        while True:
+            chunk = sock.recv(4096)
+            if not chunk:
+                break
+            response += chunk
+    head, _, body = response.partition(b"\r\n\r\n")
+    assert head.startswith(b"HTTP/1.1 400 ") and "Content-Length" in json.loads(body)["error"]
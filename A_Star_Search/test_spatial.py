@@ -0,0 +1,60 @@
+# !/usr/bin/env python3
+# test_spatial.py : nearest-city and radius lookups
+
+import math
+
+import numpy as np
+import pytest
+
+import road_graph
+import route
+from live import LiveGraph
+from spatial import SpatialIndex
+
+
+def brute_force(graph, lat, long):
+    known = np.flatnonzero(np.isfinite(graph.latitude))
+    miles = np.array([route.haversine(lat, long, float(graph.latitude[city]), float(graph.longitude[city]))
+                      for city in known])
+    order = np.lexsort((known, miles))
+    return known[order], miles[order]
+
+
+def test_nearest_matches_linear_scan():
+    graph = road_graph.get_graph()
+    index = SpatialIndex.from_graph(graph)
+    assert len(index) == int(np.isfinite(graph.latitude).sum())
+    rng = np.random.default_rng(18)
+    lat, long = rng.uniform(25, 49, 40), rng.uniform(-125, -67, 40)
+    cities, miles = index.nearest(lat, long, k=4)
+    assert cities.shape == miles.shape == (40, 4)
+    for row in range(40):
+        expected, expected_miles = brute_force(graph, lat[row], long[row])
+        assert miles[row] == pytest.approx(expected_miles[:4], rel=1e-9, abs=1e-6)
+        assert cities[row, 0] == expected[0]
+
+    radius = 60.0
+    found = index.within(lat, long, radius)
+    for row in range(40):
+        expected, expected_miles = brute_force(graph, lat[row], long[row])
+        assert set(found[row][0].tolist()) == set(expected[expected_miles <= radius].tolist())
+        assert list(found[row][1]) == sorted(found[row][1])
+
+
+def test_scalars_padding_and_snapping():
+    graph = road_graph.get_graph()
+    index = SpatialIndex.from_graph(graph)
+    city = graph.city_id("Bloomington,_Indiana")
+    lat, long = float(graph.latitude[city]), float(graph.longitude[city])
+    assert index.snap(lat, long) == (city, 0.0)
+    assert route.snap_to_city(lat + 0.001, long) == "Bloomington,_Indiana"
+    # Mid-Atlantic is farther than 100 miles from every city; NaN positions never snap.
+    assert route.snap_to_city(np.array([lat, 35.0, math.nan]), np.array([long, -40.0, 0.0]), max_miles=100) == \
+        ["Bloomington,_Indiana", None, None]
+
+    small = SpatialIndex([40.0, 41.0, math.nan], [-86.0, -86.0, -87.0], ids=[7, 8, 9], leaf_size=1)
+    cities, miles = small.nearest(40.2, -86.0, k=3)
+    assert cities.tolist() == [7, 8, -1] and math.isinf(miles[2])
+    ids, _ = small.within(40.5, -86.0, 10)
+    assert ids.size == 0
+    assert LiveGraph().snapshot().spatial() is route.SHARED.spatial(graph)
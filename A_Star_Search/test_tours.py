@@ -0,0 +1,47 @@
+# !/usr/bin/env python3
+# test_tours.py : multi-stop tour planning
+
+import itertools
+import time
+
+import pytest
+
+import route
+from search import COST_KEYS
+from tours import LegMatrix, plan_tour
+
+STOPS = ["Bloomington,_Indiana", "Indianapolis,_Indiana", "Chicago,_Illinois", "Columbus,_Ohio",
+         "Louisville,_Kentucky", "Cincinnati,_Ohio"]
+
+
+@pytest.mark.parametrize("cost", ["distance", "delivery"])
+def test_small_tour_is_optimal(cost):
+    matrix = LegMatrix.build(STOPS, cost)
+    best = min(matrix.tour_cost([0] + list(rest)) for rest in itertools.permutations(range(1, len(STOPS))))
+    plan = plan_tour(STOPS, cost, budget=0.5)
+    assert plan["stops"][0] == STOPS[0] and sorted(plan["stops"]) == sorted(STOPS)
+    assert plan["cost"] == pytest.approx(best)
+    # Composing the legs gives the totals of the concatenated route.
+    assert plan["cost"] == pytest.approx(plan[COST_KEYS[cost]])
+    assert plan["route"]["route-taken"][-1][0] == STOPS[0]
+
+
+def test_legs_match_point_queries():
+    matrix = LegMatrix.build(STOPS[:3], "delivery")
+    leg = route.find_route(STOPS[0], STOPS[2], "delivery", engine="dijkstra")
+    assert matrix.weight[0, 2] == pytest.approx(leg["total-delivery-hours"])
+    assert matrix.factor[0, 2] >= 1 and matrix.factor[1, 1] == 1 and matrix.weight[1, 1] == 0
+
+
+def test_open_tour_budget_and_parallel_solvers():
+    improvements = []
+    begin = time.perf_counter()
+    plan = plan_tour(STOPS, "time", budget=0.3, closed=False,
+                     on_improve=lambda order, cost: improvements.append(cost))
+    assert time.perf_counter() - begin < 5
+    assert len(plan["legs"]) == len(STOPS) - 1 and improvements == sorted(improvements, reverse=True)
+    assert plan["route"]["route-taken"][-1][0] == plan["stops"][-1]
+    parallel = plan_tour(STOPS, "time", budget=0.3, workers=2, closed=False)
+    assert parallel["cost"] == pytest.approx(plan["cost"])
+    with pytest.raises(ValueError):
+        plan_tour(STOPS + ["Argentia,_Newfoundland"], "distance", budget=0.1)
@@ -0,0 +1,265 @@
+#!/usr/local/bin/python3
+# tours.py : Multi-stop tour planning on top of the route engine
+#
+# python3 tours.py cost [budget_seconds] < stops.txt : one city per line, the first is the depot
+#
+# One shortest-path search per stop fills the leg matrix.  Every leg is an affine map of
+# the cost accumulated before it, D -> factor * D + weight: factor is 1 for the additive
+# costs, and for delivery driving a segment maps D to (1 + 2p) * D + (1 + 2p) * t, so a leg
+# multiplies D by the product of (1 + 2p) over its segments.  Tours are scored by composing
+# their legs, which makes the delivery cost of a whole tour exact for the chosen legs.
+#
+# The solver builds a tour by nearest insertion and improves it with 2-opt and Or-opt
+# moves; until the time budget runs out it keeps kicking the best tour (double bridge) and
+# improving it again, so the best tour found so far is always available.  Several
+# solvers with different seeds can run in parallel processes.
+#
+
+from concurrent.futures import ProcessPoolExecutor
+import math
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+from batch import run_tasks
+from road_graph import DATA_DIR, get_graph
+from search import COST_KEYS, check_cost, dijkstra, path_edges, route_summary
+
+# References:
+'''
+https://en.wikipedia.org/wiki/Travelling_salesman_problem#Heuristic_and_approximation_algorithms
+https://en.wikipedia.org/wiki/2-opt
+https://doi.org/10.1287/opre.21.2.498 (Lin-Kernighan, Or-opt and double-bridge moves)
+'''
+
+DEFAULT_BUDGET = 2.0
+
+
+def _leg_row(data_dir, row, stops, cost):
+    """Weight, factor and segment positions of the best legs from one stop to every stop."""
+    graph = get_graph(data_dir)
+    source = graph.city_id(stops[row])
+    targets = [graph.city_id(stop) for stop in stops]
+    dist, parent, parent_edge = dijkstra(graph, source, cost, targets)
+    probability = graph.lists()[5]
+    weights, factors, legs = [], [], []
+    for target in targets:
+        edges = path_edges(parent, parent_edge, source, target)
+        factor = 1.0
+        if cost == "delivery" and edges is not None:
+            for i in edges:
+                factor *= 1 + 2 * probability[i]
+        weights.append(dist[target])
+        factors.append(factor)
+        legs.append(edges)
+    return row, weights, factors, legs
+
+
+class LegMatrix(object):
+    def __init__(self, stops, cost, weight, factor, legs) -> None:
+        """Best legs between every pair of stops.
+
+        Args:
+            stops (list): city names; stop 0 is the depot.
+            cost (str): cost function the legs minimise.
+            weight (np.ndarray): leg cost when nothing is accumulated yet, inf if unreachable.
+            factor (np.ndarray): multiplier of the cost accumulated before the leg.
+            legs (list): legs[i][j] is the list of segment positions from stop i to j.
+        """
+        self.stops = stops
+        self.cost = cost
+        self.weight = weight
+        self.factor = factor
+        self.legs = legs
+
+    @classmethod
+    def build(cls, stops, cost, workers=0, data_dir=DATA_DIR):
+        """One search per stop, spread over ``workers`` processes as in batch.get_routes()."""
+        check_cost(cost)
+        stops = list(stops)
+        n = len(stops)
+        weight, factor = np.full((n, n), math.inf), np.ones((n, n))
+        legs = [None] * n
+        for row, weights, factors, edges in run_tasks([(_leg_row, (row, stops, cost)) for row in range(n)],
+                                                      workers, data_dir):
+            weight[row], factor[row], legs[row] = weights, factors, edges
+        return cls(stops, cost, weight, factor, legs)
+
+    def tour_cost(self, order, closed=True):
+        """Cost of visiting the stops in ``order`` (and returning to the first when closed)."""
+        total = 0.0
+        for a, b in zip(order, order[1:] + order[:1] if closed else order[1:]):
+            total = self.factor[a, b] * total + self.weight[a, b]
+        return total
+
+
+class _Solver(object):
+    def __init__(self, weight, factor, closed, seed, deadline) -> None:
+        self.weight = weight.tolist()
+        self.factor = factor.tolist()
+        self.closed = closed
+        self.rng = random.Random(seed)
+        self.deadline = deadline
+        self.n = len(weight)
+
+    def cost(self, order):
+        weight, factor = self.weight, self.factor
+        total = 0.0
+        for i in range(len(order) - 1):
+            a, b = order[i], order[i + 1]
+            total = factor[a][b] * total + weight[a][b]
+        if self.closed and len(order) > 1:
+            total = factor[order[-1]][order[0]] * total + weight[order[-1]][order[0]]
+        return total
+
+    def nearest_insertion(self):
+        """Grow a tour from the depot, inserting the stop nearest to it at its cheapest position."""
+        order = [0]
+        left = set(range(1, self.n))
+        nearest = {city: min(self.weight[0][city], self.weight[city][0]) for city in left}
+        while left:
+            city = min(left, key=lambda c: (nearest[c], c))
+            left.remove(city)
+            best = None
+            for position in range(1, len(order) + 1):
+                candidate = order[:position] + [city] + order[position:]
+                value = self.cost(candidate)
+                if best is None or value < best[0]:
+                    best = (value, candidate)
+            order = best[1]
+            for other in left:
+                nearest[other] = min(nearest[other], self.weight[city][other], self.weight[other][city])
+        return order
+
+    def improve(self, order):
+        """2-opt and Or-opt moves until none helps or the deadline passes; the depot stays first."""
+        best = self.cost(order)
+        improved = True
+        while improved and time.perf_counter() < self.deadline:
+            improved = False
+            n = len(order)
+            # 2-opt: reverse order[i:j].
+            for i in range(1, n - 1):
+                for j in range(i + 2, n + 1):
+                    candidate = order[:i] + order[i:j][::-1] + order[j:]
+                    value = self.cost(candidate)
+                    if value < best - 1e-12:
+                        order, best, improved = candidate, value, True
+                if time.perf_counter() >= self.deadline:
+                    return order, best
+            # Or-opt: move a run of up to three stops elsewhere, possibly reversed.
+            for length in (1, 2, 3):
+                for i in range(1, n - length + 1):
+                    run = order[i:i + length]
+                    rest = order[:i] + order[i + length:]
+                    for position in range(1, len(rest) + 1):
+                        for piece in (run, run[::-1]) if length > 1 else (run,):
+                            candidate = rest[:position] + piece + rest[position:]
+                            value = self.cost(candidate)
+                            if value < best - 1e-12:
+                                order, best, improved = candidate, value, True
+                                break
+                        else:
+                            continue
+                        break
+                if time.perf_counter() >= self.deadline:
+                    return order, best
+        return order, best
+
+    def kick(self, order):
+        """Double-bridge move: cut the tour after the depot into four parts and reorder them."""
+        if len(order) < 8:
+            body = order[1:]
+            self.rng.shuffle(body)
+            return order[:1] + body
+        a, b, c = sorted(self.rng.sample(range(2, len(order)), 3))
+        return order[:a] + order[c:] + order[b:c] + order[a:b]
+
+    def solve(self, on_improve=None):
+        """Best (order, cost) found before the deadline and the (seconds, cost) history."""
+        begin = time.perf_counter()
+        best_order, best = self.improve(self.nearest_insertion())
+        history = [(time.perf_counter() - begin, best)]
+        if on_improve is not None:
+            on_improve(best_order, best)
+        while time.perf_counter() < self.deadline and self.n > 3:
+            order, value = self.improve(self.kick(best_order))
+            if value < best - 1e-12:
+                best_order, best = order, value
+                history.append((time.perf_counter() - begin, best))
+                if on_improve is not None:
+                    on_improve(best_order, best)
+        return best_order, best, history
+
+
+def _solve(weight, factor, closed, seed, budget):
+    solver = _Solver(weight, factor, closed, seed, time.perf_counter() + budget)
+    return solver.solve()
+
+
+def plan_tour(stops, cost, budget=DEFAULT_BUDGET, workers=0, seed=0, closed=True, on_improve=None,
+              data_dir=DATA_DIR):
+    """Order the stops of a delivery shift.
+
+    Args:
+        stops (list): city names; the first one is the depot the tour starts from.
+        cost (str): "segments", "distance", "time" or "delivery".
+        budget (float): seconds the solver may spend improving the tour.
+        workers (int): 0 or 1 solves in this process; more run that many solvers with
+            different seeds in parallel processes and keep the best tour.  The leg matrix
+            is built with the same number of processes.
+        seed (int): random seed of the (first) solver.
+        closed (bool): return to the depot at the end.
+        on_improve (callable): called as ``on_improve(order, cost)`` whenever the
+            in-process solver finds a better tour.
+        data_dir (str): directory holding the dataset.
+
+    Returns:
+        dict: "stops" (names in visiting order), "legs" (get_route() dictionaries),
+        "route" (one get_route() dictionary for the whole tour), "history" ((seconds,
+        cost) improvements of the solver that won) and the totals of the tour.
+
+    Raises:
+        ValueError: when some stop cannot be reached from the others.
+    """
+    check_cost(cost)
+    stops = list(stops)
+    matrix = LegMatrix.build(stops, cost, workers, data_dir)
+    if not np.isfinite(matrix.weight).all():
+        raise ValueError("Error: not every stop can be reached from the others")
+    if workers is not None and workers <= 1:
+        order, value, history = _Solver(matrix.weight, matrix.factor, closed, seed,
+                                        time.perf_counter() + budget).solve(on_improve)
+    else:
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_solve, matrix.weight, matrix.factor, closed, seed + k, budget)
+                       for k in range(workers)]
+            order, value, history = min((future.result() for future in futures), key=lambda result: result[1])
+
+    graph = get_graph(data_dir)
+    pairs = list(zip(order, order[1:] + order[:1] if closed else order[1:]))
+    legs = [route_summary(graph, matrix.legs[a][b]) for a, b in pairs]
+    whole = route_summary(graph, [i for a, b in pairs for i in matrix.legs[a][b]])
+    return {
+        "stops": [stops[i] for i in order],
+        "legs": legs,
+        "route": whole,
+        "history": history,
+        "cost": value,
+        **{key: whole[key] for key in COST_KEYS.values()},
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        raise(Exception("Error: expected the cost function and optionally a time budget"))
+    shift = [line.split()[0] for line in sys.stdin if line.split()]
+    plan = plan_tour(shift, sys.argv[1], float(sys.argv[2]) if len(sys.argv) == 3 else DEFAULT_BUDGET,
+                     workers=None)
+    print("Tour: %s" % " -> ".join(plan["stops"] + plan["stops"][:1]))
+    for key in COST_KEYS.values():
+        print("%24s: %10.3f" % (key, plan[key]))
@@ -0,0 +1,275 @@
+import numpy as np
+
+# Points per leaf of the nearest-neighbour index.
+LEAF_SIZE = 64
+# The index is rebuilt once more than max(MIN_TAIL, indexed / TAIL_FRACTION) vertices were
+# added after it was built; until then they are compared one by one (in one NumPy pass).
+MIN_TAIL = 512
+TAIL_FRACTION = 8
+
+
+class Leaves(object):
+    def __init__(self, points, leaf_size=LEAF_SIZE) -> None:
+        """ Static nearest-neighbour index: the leaves of a KD-tree with their bounding boxes.
+
+        Points are split at the median of their widest axis until at most leaf_size are
+        left. A query finds the leaf whose box is closest, takes its nearest point, then
+        compares only the points of the leaves whose boxes are closer than that point.
+
+        Args:
+            points (np.ndarray): (n, d) array of the points to index.
+            leaf_size (int): most points in a leaf.
+        """
+        leaves = []
+        pending = [np.arange(len(points))]
+        while pending:
+            ids = pending.pop()
+            if(len(ids) <= leaf_size):
+                leaves.append(ids)
+                continue
+            coords = points[ids]
+            axis = int(np.argmax(coords.max(axis=0) - coords.min(axis=0)))
+            ids = ids[np.argsort(coords[:, axis], kind="stable")]
+            pending.append(ids[len(ids) // 2:])
+            pending.append(ids[:len(ids) // 2])
+        self.members = np.full((len(leaves), leaf_size), -1, dtype=np.int64)
+        for row, ids in enumerate(leaves):
+            self.members[row, :len(ids)] = ids
+        # Members padded with points at infinity, so padding is never the nearest.
+        self.padded = np.vstack([points, np.full((1, points.shape[1]), np.inf)])[self.members]
+        used = (self.members >= 0)[:, :, None]
+        self.low = np.where(used, self.padded, np.inf).min(axis=1)
+        self.high = np.where(used, self.padded, -np.inf).max(axis=1)
+
+    def nearest(self, x):
+        """ Index and squared distance of the point nearest to x."""
+        # Along every axis at most one of low - x and x - high is positive.
+        gap = np.maximum(np.maximum(self.low - x, x - self.high), 0)
+        bound = (gap * gap).sum(axis=1)
+        first = int(bound.argmin())
+        distance = ((self.padded[first] - x) ** 2).sum(axis=1)
+        best = int(distance.argmin())
+        best_distance, best_id = distance[best], self.members[first, best]
+        bound[first] = np.inf
+        others = np.flatnonzero(bound < best_distance)
+        if(len(others)):
+            distance = ((self.padded[others] - x) ** 2).sum(axis=2)
+            flat = int(distance.argmin())
+            if(distance.flat[flat] < best_distance):
+                best_distance = distance.flat[flat]
+                best_id = self.members[others[flat // distance.shape[1]], flat % distance.shape[1]]
+        return int(best_id), float(best_distance)
+
+    def find(self, x):
+        """ Index of a point equal to x, or -1; only leaves whose box holds x are searched."""
+        holding = np.flatnonzero(((self.low <= x) & (x <= self.high)).all(axis=1))
+        if(len(holding)):
+            equal = (self.padded[holding] == x).all(axis=2)
+            flat = int(equal.argmax())
+            if(equal.flat[flat]):
+                return int(self.members[holding[flat // equal.shape[1]], flat % equal.shape[1]])
+        return -1
+
+    def within(self, x, radius):
+        """ Indices and squared distances of the points within radius of x."""
+        gap = np.maximum(np.maximum(self.low - x, x - self.high), 0)
+        leaves = np.flatnonzero((gap * gap).sum(axis=1) <= radius * radius)
+        distance = ((self.padded[leaves] - x) ** 2).sum(axis=2)
+        inside = distance <= radius * radius
+        return self.members[leaves][inside], distance[inside]
+
+    def nearest_many(self, points):
+        """ Indices and squared distances of the points nearest to each row of points."""
+        gap = np.maximum(np.maximum(self.low[None] - points[:, None], points[:, None] - self.high[None]), 0)
+        bound = (gap * gap).sum(axis=2)
+        rows = np.arange(len(points))
+        first = bound.argmin(axis=1)
+        distance = ((self.padded[first] - points[:, None]) ** 2).sum(axis=2)
+        best = distance.argmin(axis=1)
+        best_distance = distance[rows, best]
+        best_id = self.members[first, best]
+        pair_rows, pair_leaves = np.nonzero(bound < best_distance[:, None])
+        if(len(pair_rows)):
+            distance = ((self.padded[pair_leaves] - points[pair_rows, None]) ** 2).sum(axis=2)
+            column = distance.argmin(axis=1)
+            pair_distance = distance[np.arange(len(pair_rows)), column]
+            # The closest pair of every row is last after sorting by (row, -distance).
+            order = np.lexsort((-pair_distance, pair_rows))
+            last = order[np.r_[pair_rows[order][1:] != pair_rows[order][:-1], True]]
+            better = pair_distance[last] < best_distance[pair_rows[last]]
+            last = last[better]
+            best_distance[pair_rows[last]] = pair_distance[last]
+            best_id[pair_rows[last]] = self.members[pair_leaves[last], column[last]]
+        return best_id, best_distance
+
+
+class Array_Tree(object):
+    def __init__(self, s_space, capacity=1024) -> None:
+        """ Tree store on growable NumPy arrays: vertex coordinates and parent indices.
+
+        It has the same methods as rrt.Tree. Vertices are identified by their coordinates
+        like there, but are looked up through the nearest-neighbour index instead of a
+        dictionary keyed by coordinate tuples.
+
+        Args:
+            s_space (Search_Space): search space object.
+            capacity (int): vertices allocated up front; the arrays double when full.
+        """
+        self.dimensions = s_space.dimensions
+        self.coords = np.empty((capacity, self.dimensions))
+        self.parents = np.full(capacity, -1, dtype=np.int64)
+        self.vertex_count = 0
+        self._index = None
+        self._indexed = 0
+        # (coordinates, index) of the last vertex added and the last one found, and
+        # (coordinates, vertex count) of the last point found absent.
+        self._added = None
+        self._found = None
+        self._absent = None
+
+    def _grow(self):
+        capacity = 2 * len(self.coords)
+        coords = np.empty((capacity, self.dimensions))
+        coords[:self.vertex_count] = self.coords[:self.vertex_count]
+        parents = np.full(capacity, -1, dtype=np.int64)
+        parents[:self.vertex_count] = self.parents[:self.vertex_count]
+        self.coords, self.parents = coords, parents
+
+    def add_vertex(self, v):
+        if(self.vertex_count == len(self.coords)):
+            self._grow()
+        i = self.vertex_count
+        self.coords[i] = v
+        self.parents[i] = -1
+        self.vertex_count += 1
+        self._added = (tuple(v), i)
+        return i
+
+    def add_edge(self, child, parent):
+        self.parents[self.index(child)] = -1 if parent is None else self.index(parent)
+
+    def _refresh(self):
+        n = self.vertex_count
+        if(n - self._indexed > max(MIN_TAIL, self._indexed // TAIL_FRACTION)):
+            self._index = Leaves(self.coords[:n])
+            self._indexed = n
+
+    def nearest_index(self, x):
+        """ Index and squared distance of the vertex nearest to x.
+
+        Raises:
+            ValueError: when the tree has no vertex.
+        """
+        x = np.asarray(x, dtype=np.float64)
+        n = self.vertex_count
+        if(n == 0):
+            raise ValueError("Nearest vertex of an empty tree")
+        self._refresh()
+        best, best_distance = -1, np.inf
+        if(self._index is not None):
+            best, best_distance = self._index.nearest(x)
+        if(n > self._indexed):
+            distance = ((self.coords[self._indexed:n] - x) ** 2).sum(axis=1)
+            tail = int(distance.argmin())
+            if(distance[tail] < best_distance):
+                best, best_distance = self._indexed + tail, float(distance[tail])
+        return best, best_distance
+
+    def nearest_many(self, points):
+        """ Indices and squared distances of the vertices nearest to each row of points
+        (-1 and inf for every row when the tree has no vertex)."""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, self.dimensions)
+        n = self.vertex_count
+        self._refresh()
+        best = np.full(len(points), -1, dtype=np.int64)
+        best_distance = np.full(len(points), np.inf)
+        if(self._index is not None):
+            best, best_distance = self._index.nearest_many(points)
+        if(n > self._indexed):
+            distance = ((self.coords[None, self._indexed:n] - points[:, None]) ** 2).sum(axis=2)
+            tail = distance.argmin(axis=1)
+            tail_distance = distance[np.arange(len(points)), tail]
+            better = tail_distance < best_distance
+            best = np.where(better, self._indexed + tail, best)
+            best_distance = np.where(better, tail_distance, best_distance)
+        return best, best_distance
+
+    def near(self, x, radius):
+        """ Indices and squared distances of the vertices within radius of x."""
+        x = np.asarray(x, dtype=np.float64)
+        n = self.vertex_count
+        self._refresh()
+        ids, distance = np.empty(0, dtype=np.int64), np.empty(0)
+        if(self._index is not None):
+            ids, distance = self._index.within(x, radius)
+        if(n > self._indexed):
+            tail = ((self.coords[self._indexed:n] - x) ** 2).sum(axis=1)
+            inside = np.flatnonzero(tail <= radius * radius)
+            ids = np.concatenate([ids, self._indexed + inside])
+            distance = np.concatenate([distance, tail[inside]])
+        return ids, distance
+
+    def nearest(self, x):
+        i, _ = self.nearest_index(x)
+        v = tuple(self.coords[i])
+        self._found = (v, i)
+        return v
+
+    def index(self, x):
+        """ Index of the vertex at x.
+
+        Raises:
+            KeyError: when no vertex is at x.
+        """
+        i = self.find(x)
+        if(i < 0):
+            raise KeyError(x)
+        return i
+
+    def find(self, x):
+        """ Index of the vertex at x, or -1."""
+        for memo in (self._added, self._found):
+            if(memo is not None and memo[0] == x):
+                return memo[1]
+        if(self._absent == (x, self.vertex_count)):
+            return -1
+        self._refresh()
+        point = np.asarray(x, dtype=np.float64)
+        i = -1 if self._index is None else self._index.find(point)
+        if(i < 0 and self.vertex_count > self._indexed):
+            equal = np.flatnonzero((self.coords[self._indexed:self.vertex_count] == point).all(axis=1))
+            i = self._indexed + int(equal[0]) if len(equal) else -1
+        if(i < 0):
+            self._absent = (x, self.vertex_count)
+        return i
+
+    def contains(self, x):
+        return self.find(x) >= 0
+
+    def parent(self, x):
+        p = self.parents[self.index(x)]
+        return None if p < 0 else tuple(self.coords[p])
+
+    @property
+    def edges(self):
+        """ Read-only view of the edges as {child: parent}, for plotting."""
+        return Edge_View(self)
+
+
+class Edge_View(object):
+    def __init__(self, tree) -> None:
+        self.tree = tree
+
+    def __len__(self):
+        return self.tree.vertex_count
+
+    def __contains__(self, x):
+        return self.tree.contains(x)
+
+    def __getitem__(self, x):
+        return self.tree.parent(x)
+
+    def items(self):
+        coords = self.tree.coords
+        for i, p in enumerate(self.tree.parents[:self.tree.vertex_count].tolist()):
+            yield tuple(coords[i]), (None if p < 0 else tuple(coords[p]))
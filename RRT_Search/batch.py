@@ -0,0 +1,154 @@
+import contextlib
+import io
+import multiprocessing
+import random
+import time
+
+import numpy as np
+
+from rrt import RRT
+from search_space import Search_Space
+
+# Slots of the shared table that tells workers a race was won: the query with key k is
+# finished once slot k % RACE_SLOTS holds k + 1, so keys never need to be reset.  With more
+# than RACE_SLOTS queries in flight, queries RACE_SLOTS keys apart share a slot and a win
+# may overwrite another's mark; its losing runs then go on to their own end instead of
+# being stopped early.  No run is ever cancelled by another query's win.
+RACE_SLOTS = 4096
+
+# Search space and planner settings of a worker process, set by _start_worker.
+_worker = {}
+
+
+class Cancelled(Exception):
+    """ Raised inside a planner whose race another seed already won."""
+
+
+def task_seed(seed, query, attempt):
+    """ Seed of one planner run, fixed by the batch seed, the query and the attempt."""
+    return int(np.random.SeedSequence([seed, query, attempt]).generate_state(1)[0])
+
+
+def _start_worker(boxes, shape, dimension_lengths, finished, sampler, planner, edge_list, max_samples, res,
+                  options):
+    # Search_Space keeps a float64 array as it is, so the boxes stay in the shared buffer;
+    # only the rtree and the sweep order are built per worker.
+    obstacles = np.frombuffer(boxes)[:int(np.prod(shape))].reshape(shape)
+    _worker.update(s_space=Search_Space(dimension_lengths, obstacles if len(obstacles) else None),
+                   finished=np.frombuffer(finished, dtype=np.int64), sampler=sampler, planner=planner,
+                   edge_list=edge_list, max_samples=max_samples, res=res, options=options)
+
+
+def _plan(task):
+    key, query, x_init, x_goal, seed, racing = task
+    finished = _worker["finished"]
+    slot = key % RACE_SLOTS
+    result = {"query": query, "seed": seed, "path": None, "samples": 0, "seconds": 0.0, "cancelled": False}
+    if(finished[slot] == key + 1):
+        result["cancelled"] = True
+        return result
+    random.seed(seed)
+    np.random.seed(seed)
+    if(_worker["sampler"] is not None):
+        # A fresh sampler per run, so its draws depend on the seed only.
+        sampler, sampler_options = _worker["sampler"]
+        _worker["s_space"].set_sampler(sampler(_worker["s_space"], x_goal, **sampler_options))
+    rrt = _worker["planner"](_worker["s_space"], _worker["edge_list"], x_init, x_goal, _worker["max_samples"],
+                             _worker["res"], **_worker["options"])
+    if(racing):
+        sample_free = rrt.sample_free
+
+        def checked(tree):
+            if(finished[slot] == key + 1):
+                raise Cancelled()
+            return sample_free(tree)
+        rrt.sample_free = checked
+    begin = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            result["path"] = rrt.search()
+    except Cancelled:
+        result["cancelled"] = True
+    result["seconds"] = time.perf_counter() - begin
+    result["samples"] = rrt.samples_taken
+    return result
+
+
+class Batch_Planner(object):
+    def __init__(self, s_space, edge_list, max_samples, res, planner=RRT, processes=None, **options) -> None:
+        """ Plans many queries in one search space on a pool of worker processes.
+
+        The obstacle boxes are copied once into shared memory, which every worker maps
+        instead of receiving its own copy with each task. Every run is seeded from the batch
+        seed, the query and the attempt, so a batch gives the same paths whatever worker
+        runs which task.
+
+        A sampler set with Search_Space.set_sampler is rebuilt for every run from its class
+        and options(), after seeding; a goal-biased one is biased towards the goal of the
+        run's query.
+
+        Args:
+            s_space (Search_Space): search space object; obstacles added and samplers set
+                later are not seen.
+            edge_list (np.ndarray): (step length, samples per round) pairs.
+            max_samples (int): samples after which a run stops.
+            res (float): resolution of the collision checks.
+            planner (class): RRT or a planner with the same constructor, e.g. RRT_Connect.
+            processes (int): worker processes, os.cpu_count() by default.
+            **options: further keyword arguments of the planner, e.g. prc.
+        """
+        context = multiprocessing.get_context("spawn")
+        boxes = s_space.boxes
+        shared = context.RawArray("d", max(boxes.size, 1))
+        np.frombuffer(shared)[:boxes.size] = boxes.ravel()
+        finished = context.RawArray("q", RACE_SLOTS)
+        self.finished = np.frombuffer(finished, dtype=np.int64)
+        self.keys = 0
+        sampler = None if s_space.sampler is None else (type(s_space.sampler), s_space.sampler.options())
+        self.pool = context.Pool(processes, initializer=_start_worker,
+                                 initargs=(shared, boxes.shape, s_space.dimension_lengths, finished, sampler,
+                                           planner, edge_list, max_samples, res, options))
+
+    def plan(self, queries, seed=0, race=1):
+        """ Plan a path for every query.
+
+        Args:
+            queries (list): (x_init, x_goal) pairs.
+            seed (int): batch seed.
+            race (int): runs per query with different seeds; the first to find a path wins
+                and the others are stopped. The winning seed is reported, so its path can
+                be reproduced, but which seed wins may change between batches. Beyond
+                RACE_SLOTS queries per batch, losing runs may not be stopped early.
+
+        Returns:
+            list: one dict per query with its path (None if no run found one), the seed,
+            the samples and seconds of the run, and whether it was cancelled.
+        """
+        keys = [self.keys + q for q in range(len(queries))]
+        self.keys += len(queries)
+        tasks = [(keys[q], q, tuple(x_init), tuple(x_goal), task_seed(seed, q, attempt), race > 1)
+                 for q, (x_init, x_goal) in enumerate(queries) for attempt in range(race)]
+        results = [None] * len(queries)
+        for result in self.pool.imap_unordered(_plan, tasks):
+            q = result["query"]
+            if(results[q] is None or (results[q]["path"] is None and result["path"] is not None)):
+                results[q] = result
+            if(result["path"] is not None):
+                self.finished[keys[q] % RACE_SLOTS] = keys[q] + 1
+        return results
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def plan_many(s_space, queries, edge_list, max_samples, res, seed=0, race=1, planner=RRT, processes=None, **options):
+    """ Plan every (x_init, x_goal) query on a pool started for this batch; see Batch_Planner."""
+    with Batch_Planner(s_space, edge_list, max_samples, res, planner, processes, **options) as batch:
+        return batch.plan(queries, seed, race)
@@ -0,0 +1,403 @@
+# !/usr/bin/python
+# benchmark.py : collision checking and planning benchmark on main.py-style maps
+#
+# python3 benchmark.py [--obstacles 50,5000] [--runs 5] [--res 1] [--segments 2000] [--seed 0]
+# python3 benchmark.py --tree-samples 100000 [--obstacles 50] [--seed 0]
+# python3 benchmark.py --star 2 [--obstacles 50,500] [--runs 5] [--seed 0]
+# python3 benchmark.py --connect [--obstacles 50,200,500] [--runs 5] [--seed 0]
+# python3 benchmark.py --batch 16 [--race 4] [--processes N] [--obstacles 200] [--seed 0]
+# python3 benchmark.py --samplers [--goal-bias 0.05] [--obstacles 50,200] [--runs 5] [--seed 0]
+# python3 benchmark.py --sweep 2000 [--dimensions 2-7] [--obstacles 50,500] [--sweep-res 0.5,1,2] [--seed 0]
+#
+# For every obstacle count the same random obstacles (obstacles shrink as their number
+# grows, so maps stay equally cluttered) are loaded into a search space with the exact
+# segment-vs-box collision check and into one with the former check that tests points
+# every res along the segment with one rtree call each. Both check the same random
+# segments, then plan main.py's query with the same seeds.
+#
+# With --tree-samples the planner instead runs for that many samples without stopping at
+# a solution, once with each tree store (each in a fresh process, for its memory), and
+# reports samples per second and the memory per vertex.
+#
+# With --star every planner gets that many seconds per run: RRT restarts with new seeds
+# and keeps its shortest path, RRT* and informed RRT* refine one tree. Reports the mean
+# and standard deviation of the path length and the time to the first solution.
+#
+# With --connect RRT and RRT-Connect run main.py's query until their first solution (up to
+# 20000 samples) and the samples they drew and seconds they took are compared.
+#
+# With --batch that many random queries are planned one after the other in this process,
+# then on a Batch_Planner pool (whose paths must be the same), then one query at a time
+# with one seed and with --race seeds, for the latency percentiles of a query.
+#
+# With --samplers main.py's query is planned to its first solution with the former
+# one-at-a-time sample_free and with every sampler strategy, without and with goal bias,
+# and the microseconds per free sample are measured.
+#
+# With --sweep the planner grows a tree for that many samples (like --tree-samples) in
+# every number of dimensions, for every obstacle count, with the exact collision check
+# and with the former sampled check at every --sweep-res. Each configuration runs in a
+# fresh process and reports samples per second, collision checks per second (of the time
+# spent checking), the share of free space and the memory it grew by. The maps are drawn
+# for the coverage of main.py's 2D map (summed box volume over the volume of the space,
+# see coverage_edge_scale), though rejecting overlapping boxes leaves less of it in more
+# dimensions. Where the boxes would reach past a quarter of the space from their center,
+# they are capped there and more of them are drawn (see cap_edge_scale). Each row gives the
+# requested and placed obstacle counts, the coverage reached and the largest half-edge as
+# a share of an axis.
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import random
+import resource
+import time
+
+import numpy as np
+
+from array_tree import Array_Tree
+from batch import Batch_Planner, task_seed
+from obs_generator import cap_edge_scale, coverage_edge_scale, generate_random_obstacles
+from rrt import RRT, Tree, get_points
+from rrt_connect import RRT_Connect
+from rrt_star import RRT_Star
+from sampler import SAMPLERS
+from search_space import Search_Space
+
+DIMENSIONS = np.array([(0, 100), (0, 100)])
+TREES = {"rtree": Tree, "array": Array_Tree}
+X_INIT = (0, 0)
+X_GOAL = (90, 80)
+EDGE_LIST = np.array([(8, 4)])
+
+
+class Sampled_Search_Space(Search_Space):
+    """ Search space with the former point-by-point collision check, for comparison."""
+
+    def collision_free(self, start, end, r):
+        return all(map(self.obstacle_free, get_points(start, end, r)))
+
+
+def query(d):
+    """ main.py's query, and map, in d dimensions."""
+    return np.array([(0, 100)] * d), (0,) * d, tuple([90, 80] * d)[:d]
+
+
+def make_obstacles(n, seed, d=2):
+    """ n random obstacles of main.py's map, shrunk by sqrt(n / 50) in 2D (see coverage_edge_scale).
+
+    In many dimensions the boxes would reach past a quarter of the space from their center;
+    they are capped there and more of them are drawn (see cap_edge_scale).
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+    dimensions, x_init, x_goal = query(d)
+    s_space = Search_Space(dimensions)
+    count, edge_scale = cap_edge_scale(d, n, coverage_edge_scale(d, max(n, 50)))
+    return generate_random_obstacles(s_space, x_init, x_goal, count, edge_scale=edge_scale)
+
+
+def count_checks(s_space):
+    """ Count the collision checks of a search space and the seconds spent in them."""
+    check = s_space.collision_free
+    totals = {"checks": 0, "check_seconds": 0.0}
+
+    def counted(start, end, r=None):
+        begin = time.perf_counter()
+        try:
+            return check(start, end, r)
+        finally:
+            totals["checks"] += 1
+            totals["check_seconds"] += time.perf_counter() - begin
+    s_space.collision_free = counted
+    return totals
+
+
+def check_segments(s_space, segments, res):
+    begin = time.perf_counter()
+    free = [s_space.collision_free(a, b, res) for a, b in segments]
+    return free, time.perf_counter() - begin
+
+
+def path_length(path):
+    return float(sum(np.linalg.norm(np.subtract(a, b)) for a, b in zip(path, path[1:]))) if path else None
+
+
+def plan(s_space, seed, res, max_samples=1024, prc=0.15):
+    """ Run main.py's query; returns seconds, samples taken, path length and check counts."""
+    random.seed(seed)
+    np.random.seed(seed)
+    totals = count_checks(s_space)
+    rrt = RRT(s_space, EDGE_LIST, X_INIT, X_GOAL, max_samples, res, prc)
+    begin = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        path = rrt.search()
+    elapsed = time.perf_counter() - begin
+    del s_space.collision_free
+    return {"seconds": elapsed, "samples": rrt.samples_taken, "path_length": path_length(path), **totals}
+
+
+def benchmark(n, runs, res, segments, seed):
+    obstacles = make_obstacles(n, seed)
+    exact = Search_Space(DIMENSIONS, obstacles)
+    sampled = Sampled_Search_Space(DIMENSIONS, obstacles)
+    rng = np.random.default_rng(seed)
+    pairs = [(tuple(a), tuple(b)) for a, b in rng.uniform(0, 100, (segments, 2, 2))]
+    exact_free, exact_seconds = check_segments(exact, pairs, res)
+    sampled_free, sampled_seconds = check_segments(sampled, pairs, res)
+    # The exact check must not depend on the resolution.
+    for other in (res / 10, res * 10):
+        assert check_segments(exact, pairs, other)[0] == exact_free
+    report = {
+        "obstacles": len(obstacles),
+        "segments": segments,
+        "check_us": {"exact": 1e6 * exact_seconds / segments, "sampled": 1e6 * sampled_seconds / segments},
+        "check_speedup": sampled_seconds / exact_seconds,
+        # Segments the sampled check lets through although they touch an obstacle.
+        "missed_by_sampled": sum(s and not e for e, s in zip(exact_free, sampled_free)),
+        "plan": {},
+    }
+    for name, s_space in (("exact", exact), ("sampled", sampled)):
+        results = [plan(s_space, seed + run, res) for run in range(runs)]
+        report["plan"][name] = {key: sum(r[key] for r in results) / runs
+                                for key in ("seconds", "samples", "checks", "check_seconds")}
+        report["plan"][name]["solved"] = sum(r["path_length"] is not None for r in results)
+    return report
+
+
+def grow_tree(store, n, samples, seed):
+    """ Grow one tree for a number of samples; runs in a fresh process."""
+    s_space = Search_Space(DIMENSIONS, make_obstacles(n, seed))
+    random.seed(seed)
+    np.random.seed(seed)
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rrt = RRT(s_space, EDGE_LIST, X_INIT, X_GOAL, samples, 1, 0, tree_class=TREES[store])
+    begin = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        rrt.search()
+    elapsed = time.perf_counter() - begin
+    grown = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss
+    vertices = rrt.trees[0].vertex_count
+    return {"store": store, "samples": rrt.samples_taken, "vertices": vertices, "seconds": elapsed,
+            "samples_per_s": rrt.samples_taken / elapsed, "bytes_per_vertex": 1024 * grown / vertices}
+
+
+def tree_benchmark(n, samples, seed):
+    context = multiprocessing.get_context("spawn")
+    report = []
+    for store in TREES:
+        with context.Pool(1) as pool:
+            report.append(pool.apply(grow_tree, (store, n, samples, seed)))
+    return report
+
+
+def star_run(s_space, planner, seed, budget):
+    """ Best path length and seconds to the first path of one planner within budget seconds."""
+    random.seed(seed)
+    np.random.seed(seed)
+    begin = time.perf_counter()
+    if(planner == "rrt"):
+        best, first = None, None
+        while time.perf_counter() - begin < budget:
+            rrt = RRT(s_space, EDGE_LIST, X_INIT, X_GOAL, 1024, 1, 0.15, tree_class=Array_Tree)
+            with contextlib.redirect_stdout(io.StringIO()):
+                length = path_length(rrt.search())
+            if(length is not None):
+                first = time.perf_counter() - begin if first is None else first
+                best = length if best is None else min(best, length)
+        return best, first
+    rrt = RRT_Star(s_space, EDGE_LIST, X_INIT, X_GOAL, np.inf, 1, time_budget=budget,
+                   informed=(planner == "informed"))
+    length = path_length(rrt.search())
+    return length, (rrt.history[0][1] if rrt.history else None)
+
+
+def star_benchmark(n, runs, budget, seed):
+    s_space = Search_Space(DIMENSIONS, make_obstacles(n, seed))
+    report = {"obstacles": n, "budget_s": budget, "runs": runs}
+    for planner in ("rrt", "rrt_star", "informed"):
+        results = [star_run(s_space, planner, seed + run, budget) for run in range(runs)]
+        lengths = [length for length, _ in results if length is not None]
+        firsts = [first for _, first in results if first is not None]
+        report[planner] = {"solved": len(lengths),
+                           "length_mean": float(np.mean(lengths)) if lengths else None,
+                           "length_std": float(np.std(lengths)) if lengths else None,
+                           "first_solution_s": float(np.mean(firsts)) if firsts else None}
+    return report
+
+
+def first_solution(s_space, planner, seed, max_samples=20000):
+    random.seed(seed)
+    np.random.seed(seed)
+    if(planner == "rrt"):
+        rrt = RRT(s_space, EDGE_LIST, X_INIT, X_GOAL, max_samples, 1, 0.15)
+    else:
+        rrt = RRT_Connect(s_space, EDGE_LIST, X_INIT, X_GOAL, max_samples, 1)
+    begin = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        path = rrt.search()
+    # samples_taken is not comparable (RRT counts a sample again when its vertex is added),
+    # so the points drawn are compared.
+    return {"seconds": time.perf_counter() - begin, "samples": rrt.samples_drawn, "solved": path is not None}
+
+
+def connect_benchmark(n, runs, seed):
+    s_space = Search_Space(DIMENSIONS, make_obstacles(n, seed))
+    report = {"obstacles": n, "runs": runs}
+    for planner in ("rrt", "rrt_connect"):
+        results = [first_solution(s_space, planner, seed + run) for run in range(runs)]
+        report[planner] = {key: sum(r[key] for r in results) / runs for key in ("seconds", "samples")}
+        report[planner]["solved"] = sum(r["solved"] for r in results)
+    report["samples_ratio"] = report["rrt"]["samples"] / report["rrt_connect"]["samples"]
+    report["seconds_ratio"] = report["rrt"]["seconds"] / report["rrt_connect"]["seconds"]
+    return report
+
+
+def batch_benchmark(n, count, race, processes, seed, max_samples=20000):
+    s_space = Search_Space(DIMENSIONS, make_obstacles(n, seed))
+    np.random.seed(seed)
+    queries = [(s_space.sample_free(), s_space.sample_free()) for _ in range(count)]
+    begin = time.perf_counter()
+    serial = []
+    for q, (x_init, x_goal) in enumerate(queries):
+        random.seed(task_seed(seed, q, 0))
+        np.random.seed(task_seed(seed, q, 0))
+        with contextlib.redirect_stdout(io.StringIO()):
+            serial.append(RRT(s_space, EDGE_LIST, x_init, x_goal, max_samples, 1, 0.15).search())
+    serial_seconds = time.perf_counter() - begin
+    begin = time.perf_counter()
+    with Batch_Planner(s_space, EDGE_LIST, max_samples, 1, processes=processes, prc=0.15) as batch:
+        startup = time.perf_counter() - begin
+        begin = time.perf_counter()
+        results = batch.plan(queries, seed)
+        batch_seconds = time.perf_counter() - begin
+        assert [r["path"] for r in results] == serial
+        latency = {}
+        for runs in (1, race):
+            seconds = []
+            for q, query in enumerate(queries):
+                begin = time.perf_counter()
+                batch.plan([query], seed + q, runs)
+                seconds.append(time.perf_counter() - begin)
+            latency[runs] = {"p50_s": float(np.percentile(seconds, 50)), "p95_s": float(np.percentile(seconds, 95)),
+                             "max_s": max(seconds)}
+    return {"obstacles": n, "queries": count, "processes": processes or os.cpu_count(),
+            "serial_s": serial_seconds, "pool_startup_s": startup, "batch_s": batch_seconds,
+            "solved": sum(path is not None for path in serial),
+            "latency": {"1 seed": latency[1], "%d seeds" % race: latency[race]}}
+
+
+def sampler_benchmark(n, runs, goal_bias, seed, draws=5000):
+    s_space = Search_Space(DIMENSIONS, make_obstacles(n, seed))
+    report = {"obstacles": n, "runs": runs}
+    for name in ["one_at_a_time"] + list(SAMPLERS):
+        for bias in (0.0, goal_bias):
+            if(name == "one_at_a_time" and bias):
+                continue
+            results = []
+            for run in range(runs + 1):
+                np.random.seed(seed + run)
+                s_space.set_sampler(None if name == "one_at_a_time" else SAMPLERS[name](s_space, X_GOAL, bias))
+                if(run == runs):
+                    begin = time.perf_counter()
+                    for _ in range(draws):
+                        s_space.sample_free()
+                    sample_us = 1e6 * (time.perf_counter() - begin) / draws
+                else:
+                    results.append(first_solution(s_space, "rrt", seed + run))
+            s_space.set_sampler(None)
+            report["%s, goal bias %g" % (name, bias)] = {
+                "sample_us": sample_us, "solved": sum(r["solved"] for r in results),
+                **{key: sum(r[key] for r in results) / runs for key in ("samples", "seconds")}}
+    return report
+
+
+def sweep_run(d, obstacles, res, samples, seed):
+    """ Grow one tree in d dimensions; res None for the exact check. Runs in a fresh process."""
+    dimensions, x_init, x_goal = query(d)
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    s_space = (Search_Space if res is None else Sampled_Search_Space)(dimensions, obstacles)
+    np.random.seed(seed)
+    # In chunks: with few large boxes in many dimensions every point pairs with most boxes.
+    free = float(np.mean([s_space.obstacle_free_many(np.random.uniform(0, 100, (500, d))).mean() for _ in range(20)]))
+    random.seed(seed)
+    np.random.seed(seed)
+    totals = count_checks(s_space)
+    rrt = RRT(s_space, EDGE_LIST, x_init, x_goal, samples, 1 if res is None else res, 0, tree_class=Array_Tree)
+    begin = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        rrt.search()
+    elapsed = time.perf_counter() - begin
+    return {"dimensions": d, "obstacles": len(obstacles), "check": "exact" if res is None else "sampled res %g" % res,
+            "free_space": free, "samples_per_s": rrt.samples_taken / elapsed,
+            "checks_per_s": totals["checks"] / totals["check_seconds"] if totals["checks"] else None,
+            "vertices": rrt.trees[0].vertex_count,
+            "memory_mb": (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss) / 1024}
+
+
+def dimension_sweep(dimensions, counts, resolutions, samples, seed):
+    context = multiprocessing.get_context("spawn")
+    report = []
+    for d in dimensions:
+        for n in counts:
+            # Drawn once per map: in many dimensions placing thousands of boxes takes minutes.
+            obstacles = np.array(make_obstacles(n, seed, d), dtype=np.float64).reshape(-1, 2 * d)
+            edges = obstacles[:, d:] - obstacles[:, :d]
+            coverage = {"requested_obstacles": n, "coverage": float(np.prod(edges / 100, axis=1).sum()),
+                        "max_half_edge": float(edges.max() / 200) if len(edges) else 0.0}
+            for res in [None] + resolutions:
+                with context.Pool(1) as pool:
+                    report.append(dict(pool.apply(sweep_run, (d, obstacles, res, samples, seed)), **coverage))
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark RRT collision checking.")
+    parser.add_argument("--obstacles", default="50,5000", help="comma-separated obstacle counts")
+    parser.add_argument("--runs", type=int, default=5, help="planning runs per obstacle count")
+    parser.add_argument("--res", type=float, default=1, help="resolution of the sampled check")
+    parser.add_argument("--segments", type=int, default=2000, help="random segments to check")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tree-samples", type=int, help="compare the tree stores over this many samples")
+    parser.add_argument("--star", type=float, help="compare RRT, RRT* and informed RRT* for this many seconds")
+    parser.add_argument("--connect", action="store_true", help="compare RRT and RRT-Connect to a first solution")
+    parser.add_argument("--batch", type=int, help="plan this many random queries serially and on a process pool")
+    parser.add_argument("--race", type=int, default=4, help="seeds racing on each query with --batch")
+    parser.add_argument("--processes", type=int, help="worker processes with --batch, one per CPU by default")
+    parser.add_argument("--samplers", action="store_true", help="compare the sampler strategies")
+    parser.add_argument("--goal-bias", type=float, default=0.05, help="goal bias compared with --samplers")
+    parser.add_argument("--sweep", type=int, help="grow trees of this many samples over dimensions and maps")
+    parser.add_argument("--dimensions", default="2-7", help="range of dimensions swept with --sweep")
+    parser.add_argument("--sweep-res", default="0.5,1,2", help="resolutions of the sampled check with --sweep")
+    args = parser.parse_args()
+    if args.sweep:
+        low, _, high = args.dimensions.partition("-")
+        print(json.dumps(dimension_sweep(range(int(low), int(high or low) + 1),
+                                         [int(n) for n in args.obstacles.split(",")],
+                                         [float(r) for r in args.sweep_res.split(",")], args.sweep, args.seed),
+                         indent=2))
+        raise SystemExit
+    if args.samplers:
+        print(json.dumps([sampler_benchmark(int(n), args.runs, args.goal_bias, args.seed)
+                          for n in args.obstacles.split(",")], indent=2))
+        raise SystemExit
+    if args.batch:
+        print(json.dumps([batch_benchmark(int(n), args.batch, args.race, args.processes, args.seed)
+                          for n in args.obstacles.split(",")], indent=2))
+        raise SystemExit
+    if args.connect:
+        print(json.dumps([connect_benchmark(int(n), args.runs, args.seed) for n in args.obstacles.split(",")], indent=2))
+        raise SystemExit
+    if args.star:
+        print(json.dumps([star_benchmark(int(n), args.runs, args.star, args.seed)
+                          for n in args.obstacles.split(",")], indent=2))
+        raise SystemExit
+    if args.tree_samples:
+        print(json.dumps([tree_benchmark(int(n), args.tree_samples, args.seed)
+                          for n in args.obstacles.split(",")], indent=2))
+        raise SystemExit
+    print(json.dumps([benchmark(int(n), args.runs, args.res, args.segments, args.seed)
+                      for n in args.obstacles.split(",")], indent=2))
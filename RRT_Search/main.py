@@ -1,33 +1,39 @@
 # !/usr/bin/python
 
+import sys
+
 import numpy as np
 
 from rrt import RRT
 from search_space import Search_Space
-from obs_generator import generate_random_obstacles
+from obs_generator import generate_random_obstacles, coverage_edge_scale, cap_edge_scale
 from plotting import Plot
 
 
 if __name__ == "__main__":
     """main function to generate obstacles and search space and run rrt code.
+
+    python3 main.py [dimensions], 2 by default.
     """
-    dimensions = np.array([(0, 100), (0, 100)]) 
+    d = int(sys.argv[1]) if len(sys.argv) > 1 else 2
+    dimensions = np.array([(0, 100)] * d)
     # Obstacles = np.array([(20, 20, 40, 40), (20, 60, 40, 80), (60, 20, 80, 40), (60, 60, 80, 80)])
-    x_init = (0, 0) 
-    x_goal = (90, 80)
+    x_init = (0,) * d
+    x_goal = tuple([90, 80] * d)[:d]
     max_samples = 1024
     res = 1
     prc = 0.15
 
     n = 50
     s_space = Search_Space(dimensions)
-    Obstacles = generate_random_obstacles(s_space, x_init, x_goal, n)
+    n, edge_scale = cap_edge_scale(d, n, coverage_edge_scale(d, n))
+    Obstacles = generate_random_obstacles(s_space, x_init, x_goal, n, edge_scale=edge_scale)
     edge_list = np.array([(8, 4)])
 
     rrt = RRT(s_space, edge_list, x_init, x_goal, max_samples, res, prc)
     path = rrt.search()
 
-    plot = Plot("rrt_2d_with_50_obstacles")
+    plot = Plot("rrt_%dd_with_%d_obstacles" % (d, n), d)
     plot.plot_tree(rrt.trees)
     if(path):
         plot.plot_path(path)
@@ -1,22 +1,76 @@
-import uuid
+import math
 import random
 
 import numpy as np
 
-def generate_random_obstacles(s_space,start,end,n):
-    """ Generates N random obstacles(HyperRectangles) in the 2D grid.
+# Share of the space the 50 obstacles of main.py's 2D map cover (overlaps counted twice):
+# an edge is 2 * uniform(1, 10) percent of its dimension, 11 percent on average.
+MEAN_EDGE_FRACTION = 0.11
+DEFAULT_COVERAGE = 50 * MEAN_EDGE_FRACTION ** 2
+# Largest half-edge of an obstacle, as a share of its dimension, kept by cap_edge_scale.
+MAX_HALF_EDGE_FRACTION = 0.25
+
+def coverage_edge_scale(dimensions,n,coverage=DEFAULT_COVERAGE):
+    """ edge_scale with which n obstacles cover about coverage of the space.
+
+    In 2D, n = 50 gives 1.0 (main.py's map) and more obstacles are shrunk by sqrt(n / 50);
+    with more dimensions the obstacles grow, so the map stays as cluttered (cap_edge_scale
+    bounds their size).
+
+    Args:
+        dimensions (integer): number of dimensions of the search space.
+        n (integer): number of obstacles.
+        coverage (float): summed volume of the obstacles over the volume of the space.
+
+    Returns:
+        float: edge_scale argument of generate_random_obstacles.
+    """
+    return MEAN_EDGE_FRACTION * (n / coverage) ** (1.0 / dimensions)
+
+def cap_edge_scale(dimensions,n,edge_scale,max_half_edge=MAX_HALF_EDGE_FRACTION):
+    """ Obstacle count and edge_scale that keep every half-edge within max_half_edge.
+
+    At a fixed coverage the obstacles grow with the dimensions (coverage_edge_scale), up to
+    half the space in 7D, where a few boxes then block most paths. Instead the edges are
+    capped and there are more, smaller obstacles covering the same share of the space.
+
+    Args:
+        dimensions (integer): number of dimensions of the search space.
+        n (integer): number of obstacles.
+        edge_scale (float): edge_scale they would be drawn with.
+        max_half_edge (float): largest half-edge as a share of its dimension.
+
+    Returns:
+        tuple: (obstacle count, edge_scale) for generate_random_obstacles.
+    """
+    # The largest half-edge generate_random_obstacles draws is a tenth of the dimension.
+    least = 0.1 / max_half_edge
+    if(edge_scale >= least):
+        return n, edge_scale
+    return int(math.ceil(n * (least / edge_scale) ** dimensions)), least
+
+def generate_random_obstacles(s_space,start,end,n,edge_scale=1.0,max_attempts=None):
+    """ Generates N random obstacles(HyperRectangles) in a search space of any dimension.
+
+    Obstacles overlapping an earlier one or covering start or end are drawn again, up to
+    max_attempts draws in total.
 
     Args:
-        s_space (search space object): _description_
-        start (integer): current position.
-        end (integer): goal position.
+        s_space (search space object): search space the obstacles are added to.
+        start (tuple): current position.
+        end (tuple): goal position.
         n (integer): number of obstacles to be generated.
+        edge_scale (float): divides the edge lengths, so dense maps can hold many obstacles.
+        max_attempts (integer): most obstacles drawn, 100 * n by default.
 
     Returns:
         obstacles(list): list of obstacles.
     """
     obstacles = []
-    for i in range(n):
+    attempts = 0
+    max_attempts = 100 * n if max_attempts is None else max_attempts
+    while(len(obstacles) < n and attempts < max_attempts):
+        attempts += 1
         center = np.empty(len(s_space.dimension_lengths),np.float32)
         s_collision = True
         f_collision = True
@@ -27,8 +81,8 @@ def generate_random_obstacles(s_space,start,end,n):
             diff = y_dim - x_dim
             min_edge_length = diff/10.0
             max_edge_length = diff/100.0
-            edge_length = random.uniform(min_edge_length,max_edge_length)
-            center[j] = random.uniform(x_dim + edge_length,y_dim + edge_length)
+            edge_length = random.uniform(min_edge_length,max_edge_length) / edge_scale
+            center[j] = random.uniform(x_dim + edge_length,y_dim - edge_length)
             edge_lengths.append(edge_length)
 
             if(abs(start[j]-center[j])>edge_length):
@@ -45,10 +99,11 @@ def generate_random_obstacles(s_space,start,end,n):
         if(len(list(s_space.obs.intersection(obstacle)))>0  or s_collision or f_collision):
             continue
         obstacles.append(obstacle)
-        s_space.obs.add(uuid.uuid4(),tuple(obstacle),tuple(obstacle))    
+        s_space.add_obstacle(obstacle)
 
     return obstacles
 
 def obstacle_generator(obstacles):
-    for obstacle in obstacles:
-        yield (uuid.uuid4(),obstacle,obstacle)
+    # rtree ids must be integers; the id of an obstacle is its position in the list.
+    for i, obstacle in enumerate(obstacles):
+        yield (i,tuple(obstacle),tuple(obstacle))
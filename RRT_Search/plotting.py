@@ -2,10 +2,17 @@ import plotly as ply
 from plotly import graph_objs as go
 
 class Plot(object):
-    def __init__(self,filename) -> None:
+    def __init__(self,filename,dimensions=2) -> None:
+        """ Plot of a search: 2D as is, 3D or more in 3D over the first three axes.
+
+        Args:
+            filename (str): name of the html file written to ./output/visualizations.
+            dimensions (int): number of dimensions of the search space.
+        """
+        self.dimensions = dimensions
         self.data = []
         self.file_name = './output/visualizations/' + filename + '.html'
-        self.layout = {'title': 'Plot',
+        self.layout = {'title': 'Plot' if dimensions <= 3 else 'Plot (first three of %d axes)' % dimensions,
                        'showlegend': False,
                        'shapes':[]
                        }
@@ -13,76 +20,58 @@ class Plot(object):
             'data':self.data,
             'layout': self.layout
         }
-    
+
+    def trace(self,points,**style):
+        """ Scatter trace through points, in 3D when the search space has 3 dimensions or more."""
+        axes = {'x': [p[0] if p is not None else None for p in points],
+                'y': [p[1] if p is not None else None for p in points]}
+        if(self.dimensions == 2):
+            return go.Scatter(**axes, **style)
+        axes['z'] = [p[2] if p is not None else None for p in points]
+        return go.Scatter3d(**axes, **style)
+
     def plot_tree(self,trees):
+        # One trace for all the edges, separated by gaps.
+        points = []
         for tree in trees:
             for start,end in tree.edges.items():
                 if end is not None:
-                    trace = go.Scatter(
-                        x=[start[0], end[0]],
-                        y=[start[1], end[1]],
-                        line=dict(
-                            color='darkblue'
-                        ),
-                        mode="lines"
-                    )
-                    self.data.append(trace)
-    
+                    points += [start, end, None]
+        self.data.append(self.trace(points, line=dict(color='darkblue'), mode="lines"))
+
     def plot_obstacles(self,obs):
         print(obs)
+        d = self.dimensions
         for i in range(len(obs)):
-            self.layout['shapes'].append({
-                        'type': 'rect',
-                        'x0': obs[i][0],
-                        'y0': obs[i][1],
-                        'x1': obs[i][2],
-                        'y1': obs[i][3],
-                        'line': {
-                            'color': 'black',
-                            'width': 5,
-                        },
-                        'fillcolor': 'black',
-                        'opacity': 0.60
-                    })
+            if(d == 2):
+                self.layout['shapes'].append({
+                            'type': 'rect',
+                            'x0': obs[i][0],
+                            'y0': obs[i][1],
+                            'x1': obs[i][2],
+                            'y1': obs[i][3],
+                            'line': {
+                                'color': 'black',
+                                'width': 5,
+                            },
+                            'fillcolor': 'black',
+                            'opacity': 0.60
+                        })
+            else:
+                # The 8 corners of the box over the first three axes, drawn as their hull.
+                corners = [(obs[i][a * d], obs[i][1 + b * d], obs[i][2 + c * d])
+                           for a in (0, 1) for b in (0, 1) for c in (0, 1)]
+                self.data.append(go.Mesh3d(x=[p[0] for p in corners], y=[p[1] for p in corners],
+                                           z=[p[2] for p in corners], alphahull=0, color='black',
+                                           opacity=0.60))
 
-    
-    def plot_path(self,path):
-        x, y = [], []
-        for i in path:
-            x.append(i[0])
-            y.append(i[1])
-        trace = go.Scatter(
-                x=x,
-                y=y,
-                line= dict(color="red",width=5),
-                mode="lines"
-        )
-        self.data.append(trace)
-    
-    def plot(self,x_init,x_end):
-        trace = go.Scatter(
-                x=[x_init[0]],
-                y=[x_init[1]],
-                line=dict(
-                    color="orange",
-                    width=10
-                ),
-                mode="markers"
-            )
-
-        self.data.append(trace)
 
-        trace = go.Scatter(
-                x=[x_end[0]],
-                y=[x_end[1]],
-                line=dict(
-                    color="green",
-                    width=10
-                ),
-                mode="markers"
-            )
+    def plot_path(self,path):
+        self.data.append(self.trace(path, line=dict(color="red",width=5), mode="lines"))
 
-        self.data.append(trace)
+    def plot(self,x_init,x_end):
+        self.data.append(self.trace([x_init], line=dict(color="orange",width=10), mode="markers"))
+        self.data.append(self.trace([x_end], line=dict(color="green",width=10), mode="markers"))
 
     def draw(self, auto_open=True):
-        ply.offline.plot(self.fig, filename=self.file_name, auto_open=auto_open)
\ No newline at end of file
+        ply.offline.plot(self.fig, filename=self.file_name, auto_open=auto_open)
@@ -17,6 +17,22 @@ class Tree(object):
         self.vertex_count = 0
         self.edges = {}
 
+    def add_vertex(self, v):
+        self.vertex.insert(0, v + v, v)
+        self.vertex_count += 1
+
+    def add_edge(self, child, parent):
+        self.edges[child] = parent
+
+    def nearest(self, x):
+        return next(self.vertex.nearest(x,num_results=1,objects='raw'))
+
+    def contains(self, x):
+        return self.vertex.count(x) != 0
+
+    def parent(self, x):
+        return self.edges[x]
+
 
 def euclidean_distance(a,b):
     """ Gets Euclidean Distance between two points.
@@ -60,10 +76,26 @@ def steer(start,end,dist):
 
 
 class RRT(object):
-    def __init__(self, s_space, edge_list, x_init, x_goal, max_samples, res, prc=0.01) -> None:
+    def __init__(self, s_space, edge_list, x_init, x_goal, max_samples, res, prc=0.01, tree_class=Tree) -> None:
+        """RRT planner.
+
+        Args:
+            s_space (Search_Space): search space object.
+            edge_list (np.ndarray): (step length, samples per round) pairs.
+            x_init (tuple): start state.
+            x_goal (tuple): goal state.
+            max_samples (int): samples after which the search stops.
+            res (float): resolution of the collision checks.
+            prc (float): probability of checking for a solution after a sample.
+            tree_class (class): tree store, Tree (rtree and dictionary) or
+                array_tree.Array_Tree (NumPy arrays).
+        """
         self.s_space = s_space
+        self.tree_class = tree_class
         self.edge_list = edge_list
         self.samples_taken = 0
+        # Points drawn from sample_free, whether or not they gave a vertex.
+        self.samples_drawn = 0
         self.max_samples = max_samples
         self.resolution = res
         self.prc = prc
@@ -95,18 +127,21 @@ class RRT(object):
                         return solution[1]
     
     def add_tree(self):
-        self.trees.append(Tree(self.s_space))
+        self.trees.append(self.tree_class(self.s_space))
 
     def add_vertex(self, tree, v):
-        self.trees[tree].vertex.insert(0, v + v, v)
-        self.trees[tree].vertex_count += 1  
+        self.trees[tree].add_vertex(v)
         self.samples_taken += 1
     
     def add_edge(self,tree,child,parent):
-        self.trees[tree].edges[child] = parent
+        self.trees[tree].add_edge(child, parent)
 
     def get_nearest(self,tree,x):
-        return next(self.trees[tree].vertex.nearest(x,num_results=1,objects='raw'))
+        return self.trees[tree].nearest(x)
+
+    def sample_free(self,tree):
+        """ Draw the free point a tree grows towards; planners built on RRT override it."""
+        return self.s_space.sample_free()
 
     def get_new_and_near(self,tree,edge):
         """ get nearest point from the search space and generate a new point in the search space 
@@ -119,12 +154,13 @@ class RRT(object):
         Returns:
             x_new,x_nearest: new point and nearest point to the goal state
         """
-        x_rand = self.s_space.sample_free()
+        x_rand = self.sample_free(tree)
+        self.samples_drawn += 1
         x_nearest = self.get_nearest(tree,x_rand)
         x_new = self.bounded(steer(x_nearest,x_rand,edge[0]))
         # Check whether the new point does not belong to already formed vertices and 
         # it is in the collision free space.
-        if((self.trees[0].vertex.count(x_new)!=0) or (not self.s_space.obstacle_free(x_new))):
+        if(self.trees[tree].contains(x_new) or (not self.s_space.obstacle_free(x_new))):
             return None,None
         self.samples_taken+=1
         return x_new,x_nearest
@@ -143,7 +179,7 @@ class RRT(object):
         return tuple(point) # check whether tuple is within the boundary limit.
 
     def connect_to_point(self,tree,x_a,x_b):
-        if(self.trees[tree].vertex.count(x_b) == 0 and self.s_space.collision_free(x_a, x_b, self.resolution)):
+        if(not self.trees[tree].contains(x_b) and self.s_space.collision_free(x_a, x_b, self.resolution)):
                 self.add_vertex(tree, x_b)
                 self.add_edge(tree, x_b, x_a)
                 return True
@@ -159,7 +195,7 @@ class RRT(object):
             boolean: whether goal can be reached or not.
         """
         x_nearest = self.get_nearest(tree,self.x_goal)
-        if(self.x_goal in self.trees[tree].edges and x_nearest == self.trees[tree].edges[self.x_goal]):
+        if(x_nearest == self.x_goal):
             return True
         if(self.s_space.collision_free(x_nearest,self.x_goal,self.resolution)):
             return True
@@ -174,15 +210,18 @@ class RRT(object):
         if(self.can_connect_to_goal(0)):
             print("Can connect to goal")
             x_nearest = self.get_nearest(0,self.x_goal)
-            self.trees[0].edges[self.x_goal] = x_nearest
+            tree = self.trees[0]
+            if(x_nearest != self.x_goal):
+                tree.add_vertex(self.x_goal)
+                tree.add_edge(self.x_goal, x_nearest)
             path = [self.x_goal]
             current = self.x_goal
             if(self.x_init==self.x_goal):
                 return path
 
-            while(self.trees[0].edges[current]!=self.x_init):
-                path.append(self.trees[0].edges[current])
-                current = self.trees[0].edges[current]
+            while(tree.parent(current)!=self.x_init):
+                path.append(tree.parent(current))
+                current = tree.parent(current)
             path.append(self.x_init)
             path.reverse()
             return path
@@ -0,0 +1,97 @@
+from rrt import RRT, Tree, euclidean_distance, steer
+
+
+class RRT_Connect(RRT):
+    def __init__(self, s_space, edge_list, x_init, x_goal, max_samples, res, tree_class=Tree) -> None:
+        """ RRT-Connect planner: one tree grows from x_init and one from x_goal.
+
+        The trees take turns: one extends towards a random sample like RRT, then the other
+        greedily steps towards the new vertex until it reaches it or hits an obstacle.
+        When it reaches it, the trees are joined there.
+
+        Args:
+            s_space (Search_Space): search space object.
+            edge_list (np.ndarray): (step length, samples per round) pairs.
+            x_init (tuple): start state.
+            x_goal (tuple): goal state.
+            max_samples (int): samples after which the search stops; a sample counts once
+                when its new point is free and not yet in the tree, even if the edge to it
+                then collides. The steps connect() adds do not count.
+            res (float): resolution of the collision checks.
+            tree_class (class): tree store, as for RRT.
+        """
+        super().__init__(s_space, edge_list, x_init, x_goal, max_samples, res, 0, tree_class=tree_class)
+        # Vertex in both trees once they are joined.
+        self.connection = None
+
+    def search(self):
+        """ RRT-Connect Search Function.
+        Returns:
+            list : path to reach the goal, None if none was found within max_samples.
+        """
+        self.add_vertex(0, self.x_init)
+        self.add_edge(0, self.x_init, None)
+        self.add_tree()
+        self.add_vertex(1, self.x_goal)
+        self.add_edge(1, self.x_goal, None)
+        if(self.x_init == self.x_goal or self.connect(1, self.x_init, self.edge_list[0][0])):
+            self.connection = self.x_init
+            return self.get_path()
+        a, b = 0, 1
+        while(self.samples_taken < self.max_samples):
+            for edge in self.edge_list:
+                for i in range(edge[1]):
+                    if(self.samples_taken >= self.max_samples):
+                        return None
+                    x_new, x_nearest = self.get_new_and_near(a, edge)
+                    if(x_new is not None and self.connect_to_point(a, x_nearest, x_new) and
+                       self.connect(b, x_new, edge[0])):
+                        self.connection = x_new
+                        return self.get_path()
+                    a, b = b, a
+        return None
+
+    def add_vertex(self, tree, v):
+        # get_new_and_near already counted the sample.
+        self.trees[tree].add_vertex(v)
+
+    def connect(self, tree, x, step):
+        """ Greedily grow a tree towards x, step by step.
+
+        Args:
+            tree (int): index of the tree to grow.
+            x (tuple): point to reach.
+            step (float): length of each step.
+
+        Returns:
+            boolean: True when the tree reached x.
+        """
+        x_near = self.get_nearest(tree, x)
+        while(x_near != x):
+            if(euclidean_distance(x_near, x) <= step):
+                x_next = x
+            else:
+                x_next = self.bounded(steer(x_near, x, step))
+            if(not self.connect_to_point(tree, x_near, x_next)):
+                return False
+            x_near = x_next
+        return True
+
+    def walk(self, tree, x):
+        """ Vertices from x up to the root of a tree."""
+        path = [x]
+        while(self.trees[tree].parent(path[-1]) is not None):
+            path.append(self.trees[tree].parent(path[-1]))
+        return path
+
+    def get_path(self):
+        """ Join the branch of the start tree and that of the goal tree at the connection.
+
+        Returns:
+            path(list): path from start to end state, None before the trees are joined.
+        """
+        if(self.connection is None):
+            return None
+        path = self.walk(0, self.connection)
+        path.reverse()
+        return path + self.walk(1, self.connection)[1:]
@@ -0,0 +1,254 @@
+import math
+import time
+
+import numpy as np
+
+from array_tree import Array_Tree
+from rrt import RRT, euclidean_distance, steer
+
+
+def unit_ball_volume(d):
+    return math.pi ** (d / 2) / math.gamma(d / 2 + 1)
+
+
+def rotation_to_world(x_init, x_goal):
+    """ Rotation taking the first axis to the direction from x_init to x_goal.
+
+    Args:
+        x_init (tuple): start state.
+        x_goal (tuple): goal state.
+
+    Returns:
+        np.ndarray: (d, d) rotation matrix.
+    """
+    a1 = (np.asarray(x_goal, dtype=np.float64) - np.asarray(x_init, dtype=np.float64))
+    a1 = a1 / np.linalg.norm(a1)
+    e1 = np.zeros(len(a1))
+    e1[0] = 1.0
+    u, _, vt = np.linalg.svd(np.outer(a1, e1))
+    middle = np.ones(len(a1))
+    middle[-1] = np.linalg.det(u) * np.linalg.det(vt)
+    return u @ np.diag(middle) @ vt
+
+
+class Star_Tree(Array_Tree):
+    def __init__(self, s_space, capacity=1024) -> None:
+        """ Array_Tree that also keeps the path cost and the children of every vertex.
+
+        Children are linked lists (first child, next and previous sibling), so a vertex
+        can move to another parent in constant time and a cost change reaches its subtree
+        without scanning the tree.
+
+        Args:
+            s_space (Search_Space): search space object.
+            capacity (int): vertices allocated up front; the arrays double when full.
+        """
+        super().__init__(s_space, capacity)
+        self.costs = np.zeros(capacity)
+        self.first_child = np.full(capacity, -1, dtype=np.int64)
+        self.next_sibling = np.full(capacity, -1, dtype=np.int64)
+        self.prev_sibling = np.full(capacity, -1, dtype=np.int64)
+
+    def _grow(self):
+        super()._grow()
+        capacity = len(self.coords)
+        costs = np.zeros(capacity)
+        costs[:self.vertex_count] = self.costs[:self.vertex_count]
+        self.costs = costs
+        for name in ("first_child", "next_sibling", "prev_sibling"):
+            links = np.full(capacity, -1, dtype=np.int64)
+            links[:self.vertex_count] = getattr(self, name)[:self.vertex_count]
+            setattr(self, name, links)
+
+    def add_vertex(self, v):
+        i = super().add_vertex(v)
+        self.costs[i] = 0.0
+        self.first_child[i] = self.next_sibling[i] = self.prev_sibling[i] = -1
+        return i
+
+    def add_edge(self, child, parent):
+        i = self.index(child)
+        if(parent is None):
+            self.attach(i, -1, 0.0)
+        else:
+            p = self.index(parent)
+            self.attach(i, p, self.costs[p] + euclidean_distance(self.coords[i], self.coords[p]))
+
+    def attach(self, i, p, cost):
+        """ Make p the parent of vertex i (-1 for none), reached at cost; updates its subtree."""
+        old = self.parents[i]
+        if(old >= 0):
+            prev, nxt = self.prev_sibling[i], self.next_sibling[i]
+            if(prev >= 0):
+                self.next_sibling[prev] = nxt
+            else:
+                self.first_child[old] = nxt
+            if(nxt >= 0):
+                self.prev_sibling[nxt] = prev
+        self.parents[i] = p
+        self.prev_sibling[i] = -1
+        self.next_sibling[i] = -1
+        if(p >= 0):
+            head = self.first_child[p]
+            self.next_sibling[i] = head
+            if(head >= 0):
+                self.prev_sibling[head] = i
+            self.first_child[p] = i
+        delta = cost - self.costs[i]
+        self.costs[i] = cost
+        if(delta != 0):
+            stack = [self.first_child[i]]
+            while stack:
+                v = stack.pop()
+                while(v >= 0):
+                    self.costs[v] += delta
+                    stack.append(self.first_child[v])
+                    v = self.next_sibling[v]
+
+
+class RRT_Star(RRT):
+    def __init__(self, s_space, edge_list, x_init, x_goal, max_samples, res, time_budget=None, informed=True,
+                 gamma=None) -> None:
+        """ RRT* planner, optionally informed, on top of RRT.
+
+        Every new vertex takes the cheapest collision-free parent among its near
+        neighbours, then becomes the parent of those it gives a cheaper path. The search
+        keeps improving the best path until max_samples samples were drawn or time_budget
+        seconds have passed. Once a path exists, informed sampling draws only from the
+        ellipsoid of the points that could lie on a shorter path. When the straight edge
+        from x_init to x_goal is free, it is returned without sampling.
+
+        Args:
+            s_space (Search_Space): search space object.
+            edge_list (np.ndarray): (step length, samples per round) pairs.
+            x_init (tuple): start state.
+            x_goal (tuple): goal state.
+            max_samples (int): samples after which the search stops.
+            res (float): resolution of the collision checks.
+            time_budget (float): seconds after which the search stops, None for no limit.
+            informed (bool): sample from the informed ellipsoid once a path exists.
+            gamma (float): near-neighbour radius constant; by default the RRT* bound for
+                the volume of the search space.
+        """
+        super().__init__(s_space, edge_list, x_init, x_goal, max_samples, res, 0, tree_class=Star_Tree)
+        self.time_budget = time_budget
+        self.informed = informed
+        d = s_space.dimensions
+        lengths = s_space.dimension_lengths
+        volume = float(np.prod(lengths[:, 1] - lengths[:, 0]))
+        if(gamma is None):
+            gamma = 2 * (1 + 1 / d) ** (1 / d) * (volume / unit_ball_volume(d)) ** (1 / d)
+        self.gamma = gamma
+        self.c_min = float(euclidean_distance(x_init, x_goal))
+        self.center = (np.asarray(x_init, dtype=np.float64) + np.asarray(x_goal, dtype=np.float64)) / 2
+        self.rotation = rotation_to_world(x_init, x_goal) if self.c_min > 0 else None
+        self.best_cost = math.inf
+        self.best_parent = -1
+        # Vertices with a free edge to the goal and the length of that edge.
+        self.goal_parents = []
+        self.goal_distances = []
+        # (samples, seconds, cost) whenever the best path got shorter.
+        self.history = []
+        self.started = None
+
+    def search(self):
+        """ RRT* Search Function.
+        Returns:
+            list : best path found to reach the goal, None if there is none.
+        """
+        self.started = time.perf_counter()
+        deadline = None if self.time_budget is None else self.started + self.time_budget
+        self.trees[0].add_vertex(self.x_init)
+        # A free straight edge from the start is the shortest path there is.
+        if(self.s_space.collision_free(self.x_init, self.x_goal, self.resolution)):
+            self.goal_parents.append(0)
+            self.goal_distances.append(self.c_min)
+            self.update_best()
+            return self.get_path()
+        while True:
+            for edge in self.edge_list:
+                for i in range(edge[1]):
+                    if(self.samples_taken >= self.max_samples or
+                       (deadline is not None and time.perf_counter() >= deadline)):
+                        return self.get_path()
+                    self.samples_taken += 1
+                    self.extend(0, edge[0])
+
+    def sample_free(self, tree):
+        if(not self.informed or self.best_cost == math.inf or self.rotation is None):
+            return super().sample_free(tree)
+        d = self.s_space.dimensions
+        radii = np.full(d, math.sqrt(max(self.best_cost ** 2 - self.c_min ** 2, 0.0)) / 2)
+        radii[0] = self.best_cost / 2
+        lengths = self.s_space.dimension_lengths
+        while True:
+            ball = np.random.standard_normal(d)
+            ball *= np.random.random() ** (1 / d) / np.linalg.norm(ball)
+            x = self.rotation @ (radii * ball) + self.center
+            if((x >= lengths[:, 0]).all() and (x <= lengths[:, 1]).all() and self.s_space.obstacle_free(tuple(x))):
+                return tuple(x)
+
+    def near_radius(self, n):
+        d = self.s_space.dimensions
+        return self.gamma * (math.log(n + 1) / (n + 1)) ** (1 / d)
+
+    def extend(self, tree, step):
+        """ Add one vertex towards a new sample, choosing its parent and rewiring around it."""
+        t = self.trees[tree]
+        x_rand = self.sample_free(tree)
+        self.samples_drawn += 1
+        nearest, _ = t.nearest_index(x_rand)
+        x_new = self.bounded(steer(tuple(t.coords[nearest]), x_rand, step))
+        if(t.contains(x_new) or not self.s_space.obstacle_free(x_new)):
+            return None
+        near, distance = t.near(x_new, min(step, self.near_radius(t.vertex_count)))
+        if(nearest not in near):
+            near = np.append(near, nearest)
+            distance = np.append(distance, ((t.coords[nearest] - x_new) ** 2).sum())
+        distance = np.sqrt(distance)
+        free = self.s_space.collision_free_many(x_new, t.coords[near])
+        if(not free.any()):
+            return None
+        via = np.where(free, t.costs[near] + distance, np.inf)
+        parent = int(via.argmin())
+        i = t.add_vertex(x_new)
+        t.attach(i, near[parent], via[parent])
+        # Rewire: the neighbours reached more cheaply through the new vertex move to it.
+        for k in np.flatnonzero(free).tolist():
+            if(k != parent and t.costs[i] + distance[k] < t.costs[near[k]]):
+                t.attach(near[k], i, t.costs[i] + distance[k])
+        to_goal = float(euclidean_distance(x_new, self.x_goal))
+        if(to_goal <= step and self.s_space.collision_free(x_new, self.x_goal, self.resolution)):
+            self.goal_parents.append(i)
+            self.goal_distances.append(to_goal)
+        self.update_best()
+        return i
+
+    def update_best(self):
+        if(not self.goal_parents):
+            return
+        costs = self.trees[0].costs[self.goal_parents] + self.goal_distances
+        k = int(costs.argmin())
+        self.best_parent = self.goal_parents[k]
+        if(costs[k] < self.best_cost):
+            self.history.append((self.samples_taken, time.perf_counter() - self.started, float(costs[k])))
+        self.best_cost = float(costs[k])
+
+    def get_path(self):
+        """ Best path found so far.
+
+        Returns:
+            path(list): path from start to end state, None if there is none.
+        """
+        if(self.best_parent < 0):
+            return None
+        t = self.trees[0]
+        path = []
+        i = self.best_parent
+        while(i >= 0):
+            path.append(tuple(t.coords[i]))
+            i = t.parents[i]
+        path.reverse()
+        if(path[-1] != tuple(self.x_goal)):
+            path.append(self.x_goal)
+        return path
@@ -0,0 +1,166 @@
+import numpy as np
+
+try:
+    from scipy.stats import qmc
+except ImportError:  # Only the Sobol sampler needs scipy.
+    qmc = None
+
+# Free samples drawn per block.
+BLOCK_SIZE = 256
+PRIMES = [2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41, 43, 47, 53, 59, 61, 67, 71]
+
+
+def radical_inverse(n, base):
+    """ Van der Corput radical inverse of every integer of n in the given base."""
+    n = np.array(n, dtype=np.int64)
+    inverse = np.zeros(len(n))
+    scale = 1.0
+    while(n.any()):
+        scale /= base
+        inverse += scale * (n % base)
+        n //= base
+    return inverse
+
+
+class Sampler(object):
+    def __init__(self, s_space, goal=None, goal_bias=0.0, block_size=BLOCK_SIZE) -> None:
+        """ Draws the free samples of Search_Space.sample_free in blocks.
+
+        A block of candidate points is generated and tested against the obstacles in one
+        NumPy pass (Search_Space.obstacle_free_many); the free ones are handed out one by
+        one. Subclasses choose the candidates.
+
+        Args:
+            s_space (Search_Space): search space object.
+            goal (tuple): goal state, returned instead of a sample with probability goal_bias.
+            goal_bias (float): probability of sampling the goal.
+            block_size (int): candidate points generated per block.
+        """
+        self.s_space = s_space
+        self.goal = goal
+        self.goal_bias = goal_bias if goal is not None else 0.0
+        self.block_size = block_size
+        self.low = np.asarray(s_space.dimension_lengths[:, 0], dtype=np.float64)
+        self.high = np.asarray(s_space.dimension_lengths[:, 1], dtype=np.float64)
+        self._free = []
+
+    def options(self):
+        """ Keyword arguments that build the same kind of sampler, apart from s_space and goal."""
+        return {"goal_bias": self.goal_bias, "block_size": self.block_size}
+
+    def uniform(self, k):
+        return np.random.uniform(self.low, self.high, (k, self.s_space.dimensions))
+
+    def inside(self, points):
+        return ((points >= self.low) & (points <= self.high)).all(axis=1)
+
+    def draw(self):
+        """ Free points of one block, as a (k, d) array."""
+        points = self.uniform(self.block_size)
+        return points[self.s_space.obstacle_free_many(points)]
+
+    def sample_free(self):
+        if(self.goal_bias and np.random.random() < self.goal_bias):
+            return self.goal
+        while(not self._free):
+            # Reversed, so that pop() hands them out in the order they were drawn.
+            self._free = [tuple(x) for x in self.draw()[::-1].tolist()]
+        return self._free.pop()
+
+
+class Uniform_Sampler(Sampler):
+    """ Uniform samples over the search space."""
+
+
+class Halton_Sampler(Sampler):
+    def __init__(self, s_space, goal=None, goal_bias=0.0, block_size=BLOCK_SIZE) -> None:
+        """ Low-discrepancy samples: the Halton sequence with a random shift (modulo 1).
+
+        The shift is drawn from np.random, so a seeded run gives the same sequence.
+        """
+        super().__init__(s_space, goal, goal_bias, block_size)
+        if(s_space.dimensions > len(PRIMES)):
+            raise Exception("Halton sampling supports at most %d dimensions" % len(PRIMES))
+        self.shift = np.random.random(s_space.dimensions)
+        self.count = 0
+
+    def draw(self):
+        n = np.arange(self.count + 1, self.count + self.block_size + 1)
+        self.count += self.block_size
+        unit = np.stack([radical_inverse(n, b) for b in PRIMES[:self.s_space.dimensions]], axis=1)
+        points = self.low + ((unit + self.shift) % 1.0) * (self.high - self.low)
+        return points[self.s_space.obstacle_free_many(points)]
+
+
+class Sobol_Sampler(Sampler):
+    def __init__(self, s_space, goal=None, goal_bias=0.0, block_size=BLOCK_SIZE) -> None:
+        """ Low-discrepancy samples: the scrambled Sobol sequence of scipy.stats.qmc.
+
+        The scrambling is seeded from np.random, so a seeded run gives the same sequence.
+        Blocks of a power of two points keep the balance of the sequence.
+        """
+        super().__init__(s_space, goal, goal_bias, block_size)
+        if(qmc is None):
+            raise Exception("Sobol sampling needs scipy")
+        self.sobol = qmc.Sobol(s_space.dimensions, scramble=True, seed=np.random.randint(2 ** 31))
+
+    def draw(self):
+        points = self.low + self.sobol.random(self.block_size) * (self.high - self.low)
+        return points[self.s_space.obstacle_free_many(points)]
+
+
+class Gaussian_Sampler(Sampler):
+    def __init__(self, s_space, goal=None, goal_bias=0.0, block_size=BLOCK_SIZE, sigma=None) -> None:
+        """ Samples near obstacle boundaries (Gaussian sampling).
+
+        A uniform point and a second one at a normal offset of deviation sigma are drawn;
+        the free one is kept when exactly one of them is free. A block that keeps none
+        (e.g. without obstacles) gives its free uniform points instead.
+
+        Args:
+            sigma (float): deviation of the offset, the median obstacle edge by default.
+        """
+        super().__init__(s_space, goal, goal_bias, block_size)
+        self.sigma = sigma
+
+    def options(self):
+        return dict(super().options(), sigma=self.sigma)
+
+    def deviation(self):
+        if(self.sigma is None):
+            boxes = self.s_space.boxes
+            d = self.s_space.dimensions
+            edges = boxes[:, d:] - boxes[:, :d]
+            self.sigma = float(np.median(edges)) if len(edges) else float((self.high - self.low).min()) / 100
+        return self.sigma
+
+    def pairs(self):
+        a = self.uniform(self.block_size)
+        b = a + np.random.normal(0.0, self.deviation(), a.shape)
+        free_a = self.s_space.obstacle_free_many(a)
+        free_b = self.s_space.obstacle_free_many(b) & self.inside(b)
+        return a, b, free_a, free_b
+
+    def draw(self):
+        a, b, free_a, free_b = self.pairs()
+        points = np.concatenate([a[free_a & ~free_b], b[free_b & ~free_a]])
+        return points if len(points) else a[free_a]
+
+
+class Bridge_Sampler(Gaussian_Sampler):
+    """ Samples in narrow passages (bridge test): the midpoint of two points at a normal
+    offset is kept when it is free and both points are in collision. A block that keeps
+    none gives its free uniform points instead."""
+
+    def draw(self):
+        a, b, free_a, free_b = self.pairs()
+        middle = (a + b) / 2
+        blocked = ~free_a & ~free_b & self.inside(b)
+        middle = middle[blocked][self.s_space.obstacle_free_many(middle[blocked])]
+        return middle if len(middle) else a[free_a]
+
+
+SAMPLERS = {"uniform": Uniform_Sampler, "halton": Halton_Sampler, "gaussian": Gaussian_Sampler,
+            "bridge": Bridge_Sampler}
+if(qmc is not None):
+    SAMPLERS["sobol"] = Sobol_Sampler
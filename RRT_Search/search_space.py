@@ -2,7 +2,57 @@ import numpy as np
 from rtree import index
 
 from obs_generator import obstacle_generator
-from rrt import get_points
+
+# Long segments are cut into pieces about PIECE_WIDTHS obstacle widths long, at most
+# MAX_PIECES of them, to gather the obstacles they may touch.
+PIECE_WIDTHS = 4
+MAX_PIECES = 64
+
+
+def segment_hits_boxes(start, end, low, high):
+    """ Exact segment against axis-aligned boxes test (slab method), vectorized over the boxes.
+
+    The segment is start + t * (end - start) for t in [0, 1]. Along every axis it is inside
+    the slab between the box faces for an interval of t; it hits the box when the intervals
+    of all axes overlap within [0, 1]. Boxes are closed, as in the rtree queries.
+
+    The arrays broadcast over their leading axes, e.g. ends of shape (k, 1, d) against
+    boxes of shape (n, d) test k segments against n boxes.
+
+    Args:
+        start (np.ndarray): start point of the segment.
+        end (np.ndarray): end point of the segment.
+        low (np.ndarray): (n, d) array of the min corners of the boxes.
+        high (np.ndarray): (n, d) array of the max corners of the boxes.
+
+    Returns:
+        np.ndarray: boolean array, True for every box the segment touches.
+    """
+    direction = end - start
+    with np.errstate(divide="ignore", invalid="ignore"):
+        inverse = 1.0 / direction
+        t_low = (low - start) * inverse
+        t_high = (high - start) * inverse
+    near = np.minimum(t_low, t_high)
+    far = np.maximum(t_low, t_high)
+    # Along an axis the segment does not move on, it is inside the slab for all t or for none.
+    parallel = direction == 0
+    if parallel.any():
+        inside = (low <= start) & (start <= high)
+        near = np.where(parallel, np.where(inside, -np.inf, np.inf), near)
+        far = np.where(parallel, np.where(inside, np.inf, -np.inf), far)
+    enter = np.maximum(near.max(axis=-1), 0.0)
+    leave = np.minimum(far.min(axis=-1), 1.0)
+    return enter <= leave
+
+
+def sweep_pairs(i, j):
+    """ (query, sweep position) pairs for query q covering sweep positions i[q] to j[q] - 1."""
+    counts = j - i
+    query = np.repeat(np.arange(len(i)), counts)
+    ids = np.arange(counts.sum()) + np.repeat(i - np.cumsum(counts) + counts, counts)
+    return query, ids
+
 
 class Search_Space(object):
 
@@ -20,6 +70,11 @@ class Search_Space(object):
         if(any(len(i) != 2 for i in dimension_lengths) or any(i[0] >= i[1] for i in dimension_lengths)):
             raise Exception("Dimensions should have start and end only and Start must be less than End")
         self.dimension_lengths = dimension_lengths
+        # Obstacle boxes as rows of a growable array; the rtree id of a box is its row.
+        self.num_obstacles = 0
+        self._boxes = np.empty((16, 2 * self.dimensions))
+        self._sweep = None
+        self.sampler = None
         p = index.Property()
         p.dimension = self.dimensions
         if(Obs_list is None):
@@ -30,21 +85,159 @@ class Search_Space(object):
             if(any(obs_dim[i] >= obs_dim[i+ len(obs_dim)//2] for obs_dim in Obs_list for i in range(len(obs_dim)//2))):
                 raise Exception("Obstacle start must be less than obstacle end")
             self.obs = index.Index(obstacle_generator(Obs_list),interleaved=True,properties=p)
+            # A float64 array is kept as it is (e.g. boxes in shared memory), anything else copied.
+            self._boxes = np.asarray(Obs_list, dtype=np.float64).reshape(-1, 2 * self.dimensions)
+            self.num_obstacles = len(self._boxes)
+
+    @property
+    def boxes(self):
+        """(n, 2 * d) array of the obstacles as (min corner, max corner)."""
+        return self._boxes[:self.num_obstacles]
+
+    def add_obstacle(self,obstacle):
+        """ Add an obstacle box to the rtree and the box array.
+
+        Args:
+            obstacle (np.ndarray): min corner followed by max corner.
+        """
+        if(self.num_obstacles == len(self._boxes)):
+            self._boxes = np.vstack([self._boxes, np.empty_like(self._boxes)])
+        self._boxes[self.num_obstacles] = obstacle
+        self.obs.insert(self.num_obstacles, tuple(obstacle))
+        self.num_obstacles += 1
+        self._sweep = None
+
+    def sweep(self):
+        """ Obstacles sorted by their min corner along the first axis, built on first use.
+
+        Returns:
+            tuple: sorted first-axis min corners, min corners, max corners and the widest
+            extent of a box along the first axis.
+        """
+        if(self._sweep is None):
+            boxes = self.boxes[np.argsort(self.boxes[:, 0], kind="stable")]
+            low = np.ascontiguousarray(boxes[:, :self.dimensions])
+            high = np.ascontiguousarray(boxes[:, self.dimensions:])
+            width = float((high[:, 0] - low[:, 0]).max()) if len(boxes) else 0.0
+            self._sweep = (np.ascontiguousarray(low[:, 0]), low, high, width)
+        return self._sweep
+
+    def candidates(self,low,high):
+        """ Min and max corners of the obstacles overlapping any of the boxes from low to high.
+
+        A box overlapping a query box starts at most one box width before it along the first
+        axis, so the candidates of each query box are one slice of the sweep order.
+
+        Args:
+            low (np.ndarray): (p, d) array of the min corners of the query boxes.
+            high (np.ndarray): (p, d) array of the max corners of the query boxes.
+        """
+        first, lows, highs, width = self.sweep()
+        i = np.searchsorted(first, low[:, 0] - width, "left")
+        j = np.searchsorted(first, high[:, 0], "right")
+        if(len(low) == 1):
+            lows, highs = lows[i[0]:j[0]], highs[i[0]:j[0]]
+            overlap = ((lows <= high[0]) & (highs >= low[0])).all(axis=1)
+            return lows[overlap], highs[overlap]
+        query, ids = sweep_pairs(i, j)
+        overlap = ((lows[ids] <= high[query]) & (highs[ids] >= low[query])).all(axis=1)
+        ids = np.unique(ids[overlap])
+        return lows[ids], highs[ids]
 
     def obstacle_free(self,x):
         return self.obs.count(x)==0
 
+    def obstacle_free_many(self,points):
+        """ obstacle_free for every row of a (k, d) array of points, in one NumPy pass.
+
+        Returns:
+            np.ndarray: boolean array, True for every point inside no obstacle.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, self.dimensions)
+        free = np.ones(len(points), dtype=bool)
+        first, lows, highs, width = self.sweep()
+        if(not len(first)):
+            return free
+        query, ids = sweep_pairs(np.searchsorted(first, points[:, 0] - width, "left"),
+                                 np.searchsorted(first, points[:, 0], "right"))
+        inside = ((lows[ids] <= points[query]) & (points[query] <= highs[ids])).all(axis=1)
+        free[query[inside]] = False
+        return free
+
+    def set_sampler(self,sampler):
+        """ Draw free samples from a sampler.Sampler instead of one at a time (None to undo)."""
+        self.sampler = sampler
+
     def sample_free(self):
+        if(self.sampler is not None):
+            return self.sampler.sample_free()
         while(True):
             sample = self.sample()
             if(self.obstacle_free(sample)):
                 return sample
 
-    def collision_free(self,start,end,r):
-        points = get_points(start,end,r)
-        collision_free = all(map(self.obstacle_free, points))
-        return collision_free
-    
+    def collision_free(self,start,end,r=None):
+        """ Check that the segment from start to end touches no obstacle.
+
+        The test is exact, so the result does not depend on the resolution r (kept for
+        callers that pass it). Only the obstacles overlapping the bounding box of the
+        segment (or of its pieces) are tested.
+
+        Args:
+            start (tuple): start point.
+            end (tuple): end point.
+            r (float): resolution of the former point-by-point check, unused.
+
+        Returns:
+            boolean: True when the segment is free.
+        """
+        start = np.asarray(start, dtype=np.float64)
+        end = np.asarray(end, dtype=np.float64)
+        # The bounding box of a long segment covers far more obstacles than the segment can
+        # touch, so long segments are cut into pieces a few box widths long. The pieces are
+        # checked from the start in groups of doubling size, so that a segment hitting an
+        # obstacle early (the common case in cluttered maps) stops after the first groups.
+        width = self.sweep()[3]
+        pieces = 1 if width <= 0 else min(MAX_PIECES, int(np.abs(end - start).max() // (PIECE_WIDTHS * width)) + 1)
+        if(pieces == 1):
+            cuts = np.stack([start, end])
+        else:
+            cuts = start + (np.arange(pieces + 1) / pieces)[:, None] * (end - start)
+        low, high = np.minimum(cuts[:-1], cuts[1:]), np.maximum(cuts[:-1], cuts[1:])
+        begin, size = 0, 1
+        while(begin < pieces):
+            stop = min(pieces, begin + size)
+            lows, highs = self.candidates(low[begin:stop], high[begin:stop])
+            if(len(lows) and segment_hits_boxes(start, end, lows, highs).any()):
+                return False
+            begin, size = stop, 2 * size
+        return True
+
+    def collision_free_many(self,start,ends):
+        """ Check the segments from one start point to several end points at once.
+
+        The obstacles overlapping the bounding box of all the segments are tested against
+        every segment in one NumPy pass; meant for short segments such as the edges to the
+        near neighbours of a new RRT* vertex.
+
+        Args:
+            start (tuple): common start point.
+            ends (np.ndarray): (k, d) array of end points.
+
+        Returns:
+            np.ndarray: boolean array, True for every free segment.
+        """
+        start = np.asarray(start, dtype=np.float64)
+        ends = np.asarray(ends, dtype=np.float64).reshape(-1, self.dimensions)
+        if(not len(ends)):
+            return np.ones(0, dtype=bool)
+        low = np.minimum(start, ends.min(axis=0))
+        high = np.maximum(start, ends.max(axis=0))
+        lows, highs = self.candidates(low[None], high[None])
+        if(not len(lows)):
+            return np.ones(len(ends), dtype=bool)
+        return ~segment_hits_boxes(start, ends[:, None, :], lows, highs).any(axis=1)
+
     def sample(self):
         x = np.random.uniform(self.dimension_lengths[:,0],self.dimension_lengths[:,1])
         return tuple(x)
\ No newline at end of file
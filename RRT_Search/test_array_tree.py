@@ -0,0 +1,33 @@
+# !/usr/bin/env python3
+# test_array_tree.py : tree store on NumPy arrays
+
+import numpy as np
+import pytest
+
+from array_tree import Array_Tree
+from search_space import Search_Space
+
+
+def test_empty_tree_has_no_nearest_vertex():
+    tree = Array_Tree(Search_Space(np.array([(0, 100), (0, 100)])))
+    with pytest.raises(ValueError):
+        tree.nearest((5.0, 5.0))
+    with pytest.raises(ValueError):
+        tree.nearest_index((5.0, 5.0))
+    best, distance = tree.nearest_many([(5.0, 5.0)])
+    assert best.tolist() == [-1] and distance.tolist() == [np.inf]
+    tree.add_vertex((1.0, 2.0))
+    assert tree.nearest((5.0, 5.0)) == (1.0, 2.0)
+
+
+def test_nearest_matches_brute_force():
+    rng = np.random.default_rng(20)
+    tree = Array_Tree(Search_Space(np.array([(0, 100)] * 3)), capacity=4)
+    points = rng.uniform(0, 100, (3000, 3))
+    for p in points:
+        tree.add_vertex(tuple(p))
+    queries = rng.uniform(0, 100, (200, 3))
+    expected = ((points[None] - queries[:, None]) ** 2).sum(axis=2).argmin(axis=1)
+    assert [tree.nearest_index(q)[0] for q in queries] == expected.tolist()
+    assert tree.nearest_many(queries)[0].tolist() == expected.tolist()
+    assert tree.nearest(queries[0]) == tuple(points[expected[0]])
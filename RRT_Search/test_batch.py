@@ -0,0 +1,78 @@
+# !/usr/bin/env python3
+# test_batch.py : reproducible batches and races on a process pool
+
+import contextlib
+import io
+import random
+
+import numpy as np
+import pytest
+
+from batch import Batch_Planner, plan_many, task_seed
+from benchmark import EDGE_LIST, make_obstacles
+from rrt import RRT
+from sampler import Halton_Sampler
+from search_space import Search_Space
+
+DIMENSIONS = np.array([(0, 100), (0, 100)])
+SEED = 4
+
+
+@pytest.fixture(scope="module")
+def s_space():
+    return Search_Space(DIMENSIONS, make_obstacles(50, SEED))
+
+
+@pytest.fixture(scope="module")
+def queries(s_space):
+    np.random.seed(SEED)
+    return [(s_space.sample_free(), s_space.sample_free()) for _ in range(6)]
+
+
+def test_batches_are_reproducible(s_space, queries):
+    paths = {}
+    for processes in (1, 3):
+        results = plan_many(s_space, queries, EDGE_LIST, 5000, 1, seed=SEED, processes=processes, prc=0.15)
+        paths[processes] = [r["path"] for r in results]
+    assert paths[1] == paths[3] and any(path is not None for path in paths[1])
+    # The same as planning each query in this process with its task seed.
+    for q, (x_init, x_goal) in enumerate(queries):
+        random.seed(task_seed(SEED, q, 0))
+        np.random.seed(task_seed(SEED, q, 0))
+        with contextlib.redirect_stdout(io.StringIO()):
+            assert RRT(s_space, EDGE_LIST, x_init, x_goal, 5000, 1, 0.15).search() == paths[1][q]
+
+
+def test_race_reports_the_winning_seed(s_space, queries):
+    with Batch_Planner(s_space, EDGE_LIST, 5000, 1, processes=3, prc=0.15) as batch:
+        results = batch.plan(queries[:3], seed=SEED, race=3)
+        again = batch.plan(queries[:3], seed=SEED, race=3)
+    for q, (result, (x_init, x_goal)) in enumerate(zip(results + again, queries[:3] * 2)):
+        assert result["query"] == q % 3 and result["path"] is not None
+        assert result["path"][0] == x_init and result["path"][-1] == x_goal
+        attempt = [task_seed(SEED, q % 3, attempt) for attempt in range(3)].index(result["seed"])
+        # The winning seed reproduces the path.
+        random.seed(result["seed"])
+        np.random.seed(result["seed"])
+        with contextlib.redirect_stdout(io.StringIO()):
+            assert RRT(s_space, EDGE_LIST, x_init, x_goal, 5000, 1, 0.15).search() == result["path"], attempt
+
+
+def test_workers_use_the_sampler_of_the_search_space(queries):
+    s_space = Search_Space(DIMENSIONS, make_obstacles(50, SEED))
+    uniform = [r["path"] for r in plan_many(s_space, queries[:4], EDGE_LIST, 5000, 1, seed=SEED, processes=2,
+                                            prc=0.15)]
+    # Its goal is replaced by the goal of each query.
+    s_space.set_sampler(Halton_Sampler(s_space, (50, 50), 0.05))
+    paths = {}
+    for processes in (1, 2):
+        results = plan_many(s_space, queries[:4], EDGE_LIST, 5000, 1, seed=SEED, processes=processes, prc=0.15)
+        paths[processes] = [r["path"] for r in results]
+    assert paths[1] == paths[2] and paths[1] != uniform
+    # A fresh sampler per query, biased towards its goal, seeded like the run.
+    for q, (x_init, x_goal) in enumerate(queries[:4]):
+        random.seed(task_seed(SEED, q, 0))
+        np.random.seed(task_seed(SEED, q, 0))
+        s_space.set_sampler(Halton_Sampler(s_space, x_goal, 0.05))
+        with contextlib.redirect_stdout(io.StringIO()):
+            assert RRT(s_space, EDGE_LIST, x_init, x_goal, 5000, 1, 0.15).search() == paths[1][q]
@@ -0,0 +1,26 @@
+# !/usr/bin/env python3
+# test_obs_generator.py : random obstacle maps in any number of dimensions
+
+import numpy as np
+import pytest
+
+from obs_generator import MAX_HALF_EDGE_FRACTION, cap_edge_scale, coverage_edge_scale
+
+
+@pytest.mark.parametrize("d", range(2, 8))
+@pytest.mark.parametrize("n", [50, 500, 5000])
+def test_capped_edges_keep_the_coverage(d, n):
+    scale = coverage_edge_scale(d, n)
+    count, capped = cap_edge_scale(d, n, scale)
+    # The largest half-edge drawn is a tenth of the dimension over the scale.
+    assert 0.1 / capped <= MAX_HALF_EDGE_FRACTION + 1e-12
+    assert capped >= scale and count >= n
+    # Summed volume goes with count / scale ** d.
+    assert count / capped ** d == pytest.approx(n / scale ** d, rel=0.01)
+    if(0.1 / scale <= MAX_HALF_EDGE_FRACTION):
+        assert (count, capped) == (n, scale)
+
+
+def test_main_map_is_unchanged():
+    assert cap_edge_scale(2, 50, coverage_edge_scale(2, 50)) == (50, pytest.approx(1.0))
+    assert np.isclose(coverage_edge_scale(2, 50), 1.0)
@@ -0,0 +1,41 @@
+# !/usr/bin/env python3
+# test_rrt_connect.py : RRT-Connect paths and sample budget
+
+import random
+
+import numpy as np
+import pytest
+
+from benchmark import EDGE_LIST, X_GOAL, X_INIT, make_obstacles
+from rrt_connect import RRT_Connect
+from search_space import Search_Space
+
+DIMENSIONS = np.array([(0, 100), (0, 100)])
+
+
+def seeded(seed):
+    random.seed(seed)
+    np.random.seed(seed)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_path_joins_start_and_goal(seed):
+    s_space = Search_Space(DIMENSIONS, make_obstacles(50, seed))
+    seeded(seed)
+    rrt = RRT_Connect(s_space, EDGE_LIST, X_INIT, X_GOAL, 20000, 1)
+    path = rrt.search()
+    assert path is not None and path[0] == X_INIT and path[-1] == X_GOAL
+    assert all(s_space.collision_free(a, b) for a, b in zip(path, path[1:]))
+    assert rrt.samples_taken <= 20000
+
+
+@pytest.mark.parametrize("max_samples", [1, 7, 300])
+def test_sample_budget(max_samples):
+    # A wall across the space: no path, so the search runs until the budget is spent.
+    s_space = Search_Space(DIMENSIONS, [(40, 0, 60, 100)])
+    seeded(3)
+    rrt = RRT_Connect(s_space, np.array([(8, 4), (2, 3)]), X_INIT, X_GOAL, max_samples, 1)
+    assert rrt.search() is None
+    # The budget is checked before every sample, not once per round of the edge list.
+    assert rrt.samples_taken == max_samples
+    assert rrt.samples_drawn >= max_samples
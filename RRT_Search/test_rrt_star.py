@@ -0,0 +1,108 @@
+# !/usr/bin/env python3
+# test_rrt_star.py : RRT* cost propagation, rewiring and informed sampling
+
+import math
+import random
+
+import numpy as np
+import pytest
+
+from benchmark import EDGE_LIST, X_GOAL, X_INIT, make_obstacles
+from rrt_star import RRT_Star, Star_Tree
+from search_space import Search_Space
+
+DIMENSIONS = np.array([(0, 100), (0, 100)])
+
+
+@pytest.fixture(scope="module")
+def s_space():
+    return Search_Space(DIMENSIONS, make_obstacles(50, 21))
+
+
+@pytest.fixture(scope="module", params=[False, True], ids=["rrt_star", "informed"])
+def planner(request, s_space):
+    random.seed(5)
+    np.random.seed(5)
+    rrt = RRT_Star(s_space, EDGE_LIST, X_INIT, X_GOAL, 3000, 1, informed=request.param)
+    # Count the vertices moved to another parent, i.e. the rewirings.
+    t = rrt.trees[0]
+    attach, rrt.rewired = t.attach, 0
+
+    def counted(i, p, cost):
+        rrt.rewired += t.parents[i] >= 0
+        attach(i, p, cost)
+    t.attach = counted
+    rrt.path = rrt.search()
+    return rrt
+
+
+def children(tree, i):
+    v, found = tree.first_child[i], []
+    while(v >= 0):
+        found.append(int(v))
+        v = tree.next_sibling[v]
+    return found
+
+
+def test_costs_follow_the_parents(planner):
+    t = planner.trees[0]
+    n = t.vertex_count
+    assert planner.rewired > 0
+    parents = t.parents[:n]
+    assert parents[0] == -1 and (parents[1:] >= 0).all() and t.costs[0] == 0
+    edge = np.linalg.norm(t.coords[1:n] - t.coords[parents[1:]], axis=1)
+    np.testing.assert_allclose(t.costs[1:n], t.costs[parents[1:]] + edge, rtol=1e-9)
+    # The sibling lists hold exactly the children given by the parent array.
+    for i in range(n):
+        assert sorted(children(t, i)) == np.flatnonzero(parents == i).tolist()
+
+
+def test_path_is_free_and_as_long_as_the_best_cost(planner, s_space):
+    path = planner.path
+    assert path is not None and path[0] == X_INIT and path[-1] == X_GOAL
+    assert all(s_space.collision_free(a, b) for a, b in zip(path, path[1:]))
+    length = sum(math.dist(a, b) for a, b in zip(path, path[1:]))
+    assert length == pytest.approx(planner.best_cost)
+    # Rewiring and later samples only ever shorten the best path.
+    costs = [cost for _, _, cost in planner.history]
+    assert costs == sorted(costs, reverse=True) and costs[-1] == pytest.approx(planner.best_cost)
+    assert planner.best_cost >= planner.c_min
+    assert planner.samples_drawn == planner.samples_taken
+
+
+def test_attach_moves_a_subtree():
+    t = Star_Tree(Search_Space(DIMENSIONS), capacity=2)
+    for v in ((0.0, 0.0), (3.0, 4.0), (3.0, 8.0), (0.0, 8.0), (6.0, 8.0)):
+        t.add_vertex(v)
+    t.add_edge((0.0, 0.0), None)
+    t.add_edge((3.0, 4.0), (0.0, 0.0))
+    t.add_edge((3.0, 8.0), (3.0, 4.0))
+    t.add_edge((6.0, 8.0), (3.0, 8.0))
+    t.add_edge((0.0, 8.0), (0.0, 0.0))
+    assert t.costs[:5].tolist() == [0.0, 5.0, 9.0, 8.0, 12.0]
+    # Rewire (3, 8) to (0, 8): its child follows at the new cost.
+    t.attach(2, 3, 11.0)
+    assert t.costs[:5].tolist() == [0.0, 5.0, 11.0, 8.0, 14.0]
+    assert children(t, 1) == [] and children(t, 3) == [2] and children(t, 2) == [4]
+
+
+def test_informed_samples_fall_inside_the_ellipse():
+    np.random.seed(8)
+    rrt = RRT_Star(Search_Space(DIMENSIONS), EDGE_LIST, (10, 20), (80, 60), 100, 1)
+    rrt.best_cost = 1.2 * rrt.c_min
+    samples = np.array([rrt.sample_free(0) for _ in range(2000)])
+    foci = np.linalg.norm(samples - (10, 20), axis=1) + np.linalg.norm(samples - (80, 60), axis=1)
+    assert (foci <= rrt.best_cost + 1e-9).all()
+    # They spread over the ellipse rather than clustering near its axis.
+    assert foci.max() > 0.98 * rrt.best_cost and foci.min() < 1.01 * rrt.c_min
+    rrt.informed = False
+    uniform = np.array([rrt.sample_free(0) for _ in range(2000)])
+    assert (np.linalg.norm(uniform - (10, 20), axis=1) + np.linalg.norm(uniform - (80, 60), axis=1)
+            > rrt.best_cost).any()
+
+
+def test_goal_in_sight_of_the_start():
+    s_space = Search_Space(DIMENSIONS, [(40, 0, 60, 30)])
+    rrt = RRT_Star(s_space, EDGE_LIST, (10, 50), (90, 60), 1000, 1)
+    assert rrt.search() == [(10, 50), (90, 60)]
+    assert rrt.best_cost == pytest.approx(rrt.c_min) and rrt.samples_taken == 0
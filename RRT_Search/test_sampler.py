@@ -0,0 +1,52 @@
+# !/usr/bin/env python3
+# test_sampler.py : block samplers of free points
+
+import numpy as np
+import pytest
+
+from benchmark import make_obstacles
+from sampler import SAMPLERS, Sobol_Sampler
+from search_space import Search_Space
+
+DIMENSIONS = np.array([(0, 100)] * 3)
+
+
+@pytest.fixture(scope="module")
+def s_space():
+    return Search_Space(DIMENSIONS, make_obstacles(30, 6, d=3))
+
+
+@pytest.mark.parametrize("name", sorted(SAMPLERS))
+def test_samples_are_free_and_reproducible(s_space, name):
+    drawn = []
+    for _ in range(2):
+        np.random.seed(11)
+        sampler = SAMPLERS[name](s_space)
+        drawn.append(np.array([sampler.sample_free() for _ in range(600)]))
+    assert (drawn[0] == drawn[1]).all()
+    assert ((drawn[0] >= DIMENSIONS[:, 0]) & (drawn[0] <= DIMENSIONS[:, 1])).all()
+    assert s_space.obstacle_free_many(drawn[0]).all()
+
+
+def test_goal_bias():
+    np.random.seed(2)
+    sampler = SAMPLERS["uniform"](Search_Space(DIMENSIONS), goal=(1, 2, 3), goal_bias=0.25)
+    goals = sum(sampler.sample_free() == (1, 2, 3) for _ in range(4000))
+    assert 800 < goals < 1200
+
+
+def test_sobol_covers_the_space_evenly():
+    pytest.importorskip("scipy")
+    s_space = Search_Space(DIMENSIONS)
+    np.random.seed(3)
+    sobol = np.array(Sobol_Sampler(s_space).draw())
+    np.random.seed(3)
+    uniform = np.array(SAMPLERS["uniform"](s_space).draw())
+    assert len(sobol) == len(uniform) == 256
+
+    def worst_cell(points):
+        # Points in each of the 4 x 4 x 4 cells, 4 expected; the largest deviation.
+        cells = ((points - DIMENSIONS[:, 0]) / (DIMENSIONS[:, 1] - DIMENSIONS[:, 0]) * 4).astype(int).clip(0, 3)
+        counts = np.bincount(cells @ [16, 4, 1], minlength=64)
+        return np.abs(counts - 4).max()
+    assert worst_cell(sobol) < worst_cell(uniform)
@@ -0,0 +1,79 @@
+# !/usr/bin/env python3
+# test_search_space.py : exact segment against boxes collision checks
+
+import numpy as np
+import pytest
+
+from search_space import MAX_PIECES, PIECE_WIDTHS, Search_Space, segment_hits_boxes
+
+BOX = np.array([(10.0, 10.0, 20.0, 20.0)])
+
+
+def space(boxes, d=2):
+    return Search_Space(np.array([(0, 100)] * d), boxes)
+
+
+def sampled_free(s_space, start, end, points=4000):
+    """ The segment is free when none of its densely sampled points is inside an obstacle."""
+    t = np.linspace(0.0, 1.0, points)[:, None]
+    return bool(s_space.obstacle_free_many(np.asarray(start) + t * np.subtract(end, start)).all())
+
+
+@pytest.mark.parametrize("start, end, free", [
+    ((0, 5), (30, 5), True),       # parallel to the box, below it
+    ((0, 10), (30, 10), False),    # along the bottom face
+    ((20, 0), (20, 30), False),    # along the right face
+    ((0, 15), (30, 15), False),    # straight through
+    ((15, 0), (15, 9.99), True),   # stops just short of the box
+    ((15, 0), (15, 10), False),    # ends on the face
+    ((0, 20), (20, 0), False),     # touches a corner only
+    ((0, 19.9), (19.9, 0), True),  # passes just outside the corner
+])
+def test_parallel_and_touching_segments(start, end, free):
+    s_space = space(BOX)
+    assert s_space.collision_free(start, end) is free
+    assert bool(segment_hits_boxes(np.array(start, float), np.array(end, float), BOX[:, :2], BOX[:, 2:])[0]) is not free
+
+
+def test_zero_length_segments():
+    s_space = space(BOX)
+    for point, free in (((15, 15), False), ((10, 20), False), ((5, 5), True), ((20.01, 15), True)):
+        assert s_space.collision_free(point, point) is free
+        assert s_space.collision_free(point, point) == s_space.obstacle_free_many([point])[0]
+
+
+def test_long_segments_are_split_into_pieces():
+    # Small boxes, so a segment across the map is cut into many pieces.
+    rng = np.random.default_rng(3)
+    low = rng.uniform(0, 98, (400, 2))
+    boxes = np.hstack([low, low + rng.uniform(0.2, 1.0, (400, 2))])
+    s_space = space(boxes)
+    width = s_space.sweep()[3]
+    assert int(100 // (PIECE_WIDTHS * width)) + 1 > 2
+    ends = rng.uniform(0, 100, (200, 2, 2))
+    pieces = [min(MAX_PIECES, int(np.abs(b - a).max() // (PIECE_WIDTHS * width)) + 1) for a, b in ends]
+    assert max(pieces) > 1
+    for a, b in ends:
+        assert s_space.collision_free(a, b) == (not segment_hits_boxes(a, b, boxes[:, :2], boxes[:, 2:]).any())
+
+
+@pytest.mark.parametrize("d", [2, 3])
+def test_agrees_with_dense_sampling(d):
+    rng = np.random.default_rng(19 + d)
+    low = rng.uniform(0, 90, (60, d))
+    boxes = np.hstack([low, low + rng.uniform(2, 10, (60, d))])
+    s_space = space(boxes, d)
+    segments = rng.uniform(0, 100, (300, 2, d))
+    checked = [s_space.collision_free(a, b) for a, b in segments]
+    assert checked == [sampled_free(s_space, a, b) for a, b in segments]
+    assert 0 < sum(checked) < len(checked)
+    # The resolution of the former point-by-point check makes no difference.
+    assert checked == [s_space.collision_free(a, b, r) for (a, b), r in zip(segments, [0.1, 1, 5] * 100)]
+
+
+def test_collision_free_many_matches_collision_free():
+    rng = np.random.default_rng(7)
+    low = rng.uniform(0, 90, (40, 2))
+    s_space = space(np.hstack([low, low + rng.uniform(2, 10, (40, 2))]))
+    start, ends = rng.uniform(0, 100, 2), rng.uniform(0, 100, (50, 2))
+    assert s_space.collision_free_many(start, ends).tolist() == [s_space.collision_free(start, end) for end in ends]